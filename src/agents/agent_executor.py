@@ -1,23 +1,31 @@
 """
 Agent executor - Runs agents with LLM providers
 """
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
 import asyncio
-from datetime import datetime
-
-# Optional imports for production mode
-try:
-    import openai
-except ImportError:
-    openai = None
-
-try:
-    from azure.identity import DefaultAzureCredential
-except ImportError:
-    DefaultAzureCredential = None
+import hashlib
+import json
+import time
+import uuid
 
 from src.utils.config_loader import ConfigLoader
-from src.agents.agent_types import AgentFactory
+from src.utils.async_runner import run_sync
+from src.agents.agent_types import AgentFactory, BaseAgent
+from src.agents.workflow import Workflow, WorkflowEngine, AgentRunner
+from src.agents.node_cache import NodeCache
+from src.agents.checkpoint import CheckpointStore
+from src.agents.team import Team, TeamBudget, TeamMember
+from src.agents.implementations.team_manager_agent import TeamManagerAgent
+from src.llm.client_pool import ClientPool
+from src.llm import providers
+from src.llm.response_cache import ResponseCache
+from src.llm.semantic_cache import SemanticCache
+from src.llm.single_flight import SingleFlight
+from src.llm.token_counter import TokenCounter
+from src.llm.context_window import ContextWindowManager
+from src.llm.rate_limiter import RateLimiter
+from src.llm.resilience import Resilience
+from src.llm.router import ModelRouter
 
 class AgentExecutor:
     """Executes agents with configured LLM providers"""
@@ -25,45 +33,67 @@ class AgentExecutor:
     def __init__(self, project: Dict[str, Any]):
         self.project = project
         self.config = ConfigLoader.load_config()
-        self.agents = {}
+        self._agent_data: Optional[Dict[str, Dict[str, Any]]] = None
+        self._agents: Dict[str, BaseAgent] = {}
+        self._workflow: Optional[Workflow] = None
+        self._delegates: Optional[Dict[str, List[str]]] = None
+        self._context_managers: Dict[str, ContextWindowManager] = {}
+        
+        # Open provider connections ahead of the first request
+        ClientPool.warm_up()
+        
+        # Load local models now, so the first request does not pay for the cold load
+        if ConfigLoader.get('llm_providers.ollama.preload', False):
+            providers.preload_models([
+                agent_data.get('llm_model') or (agent_data.get('llm_config') or {}).get('model', 'gpt-4')
+                for agent_data in project.get('agents', [])
+            ])
+    
+    def get_agent(self, agent_id: str) -> Optional[BaseAgent]:
+        """Get an agent, building it on first use"""
+        
+        agent = self._agents.get(agent_id)
+        if agent is not None:
+            return agent
+        
+        if self._agent_data is None:
+            self._agent_data = {agent_data.get('id'): agent_data for agent_data in self.project.get('agents', [])}
+        
+        agent_data = self._agent_data.get(agent_id)
+        if agent_data is None:
+            return None
         
-        # Initialize agents
-        for agent_data in project.get('agents', []):
-            try:
-                agent = AgentFactory.from_dict(agent_data)
-                self.agents[agent.id] = agent
-            except Exception as e:
-                print(f"Error loading agent {agent_data.get('id')}: {e}")
+        try:
+            # Shared with every other executor that has the same agent configuration
+            agent = AgentFactory.get_or_create(agent_data)
+        except Exception as e:
+            print(f"Error loading agent {agent_id}: {e}")
+            return None
+        
+        self._agents[agent_id] = agent
+        return agent
     
     def run_agent(self, agent_id: str, message: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Run an agent synchronously"""
+        return run_sync(self.run_agent_async(agent_id, message, context))
+    
+    async def run_agent_async(self, agent_id: str, message: str, context: Optional[Dict[str, Any]] = None, budget: Optional[TeamBudget] = None) -> Dict[str, Any]:
+        """Run an agent asynchronously; a team manager delegates to its team within the budget"""
         
-        if agent_id not in self.agents:
+        agent = self.get_agent(agent_id)
+        if agent is None:
             return {
                 'success': False,
                 'error': f"Agent {agent_id} not found"
             }
         
-        agent = self.agents[agent_id]
-        
         try:
-            # Get LLM provider
-            llm_response = self._call_llm(
-                model=agent.llm_model,
-                messages=[
-                    {"role": "system", "content": agent.system_prompt},
-                    {"role": "user", "content": message}
-                ],
-                temperature=agent.temperature,
-                max_tokens=agent.max_tokens
-            )
+            team = self.get_team(agent_id, budget) if isinstance(agent, TeamManagerAgent) else None
+            if team is not None:
+                return await agent.execute(message, context, llm=self._call_llm_async, team=team)
             
-            return {
-                'success': True,
-                'response': llm_response['content'],
-                'tokens_used': llm_response['tokens'],
-                'model': agent.llm_model
-            }
+            result = await agent.execute(message, context, llm=self._call_llm_async)
+            return result
         
         except Exception as e:
             return {
@@ -71,116 +101,462 @@ class AgentExecutor:
                 'error': str(e)
             }
     
-    async def run_agent_async(self, agent_id: str, message: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Run an agent asynchronously"""
+    async def execute_stream(self, agent_id: str, message: str, context: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Run an agent, yielding 'delta' events and a final 'done' event with usage"""
         
-        if agent_id not in self.agents:
-            return {
-                'success': False,
-                'error': f"Agent {agent_id} not found"
-            }
+        agent = self.get_agent(agent_id)
+        if agent is None:
+            yield {'type': 'error', 'error': f"Agent {agent_id} not found"}
+            return
         
-        agent = self.agents[agent_id]
+        start_time = time.perf_counter()
+        first_token_time = None
         
         try:
-            result = await agent.execute(message, context)
-            return result
+            team = self.get_team(agent_id) if isinstance(agent, TeamManagerAgent) else None
+            if team is not None:
+                async for event in self._stream_team(agent, team, message, context, start_time):
+                    yield event
+                return
+            
+            async for event in agent.execute_stream(message, context, llm_stream=self._stream_llm_async):
+                if event['type'] == 'delta' and first_token_time is None:
+                    first_token_time = time.perf_counter() - start_time
+                
+                if event['type'] == 'done':
+                    event = {
+                        **event,
+                        'agent_id': agent.id,
+                        'model': agent.llm_model,
+                        'ttft': first_token_time,
+                        'duration': time.perf_counter() - start_time
+                    }
+                
+                yield event
         
         except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
+            yield {'type': 'error', 'error': str(e)}
+    
+    async def _stream_team(self, agent: TeamManagerAgent, team: Team, message: str, context: Optional[Dict[str, Any]], start_time: float) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a manager's plan and each member's result as it lands, then the synthesized answer"""
+        
+        async for event in agent.delegate(message, team, context, llm=self._call_llm_async):
+            if event['type'] != 'done':
+                yield event
+                continue
+            
+            result = event['result']
+            if not result['success']:
+                yield {'type': 'error', 'error': result['error']}
+                return
+            
+            yield {'type': 'delta', 'content': result['response']}
+            yield {
+                'type': 'done',
+                'tokens': result['tokens_used'],
+                'usage': result.get('usage'),
+                'finish_reason': result.get('finish_reason'),
+                'delegations': result['delegations'],
+                'budget': result['budget'],
+                'agent_id': agent.id,
+                'model': agent.llm_model,
+                'ttft': time.perf_counter() - start_time,
+                'duration': time.perf_counter() - start_time
             }
     
-    def _call_llm(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+    def get_team(self, agent_id: str, budget: Optional[TeamBudget] = None) -> Optional[Team]:
+        """Get the team an agent delegates to, from the project's delegation connections"""
+        
+        if self._delegates is None:
+            self._delegates = Workflow.delegates_of(self.project)
+        
+        members = []
+        for member_id in self._delegates.get(agent_id, []):
+            agent = self.get_agent(member_id)
+            if agent is not None:
+                role = (self._agent_data.get(member_id) or {}).get('role') or agent.system_prompt
+                members.append(TeamMember(id=member_id, name=agent.name, role=role))
+        
+        if not members:
+            return None
+        
+        return Team(members, self._run_team_member, budget)
+    
+    async def _run_team_member(self, member_id: str, task: str, budget: TeamBudget) -> Dict[str, Any]:
+        """Run a team member; a member that leads its own team shares the same budget"""
+        return await self.run_agent_async(member_id, task, budget=budget)
+    
+    def _call_llm(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int, agent: Optional[BaseAgent] = None) -> Dict[str, Any]:
         """Call LLM provider"""
+        return run_sync(self._call_llm_async(model, messages, temperature, max_tokens, agent))
+    
+    async def _call_llm_async(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int, agent: Optional[BaseAgent] = None) -> Dict[str, Any]:
+        """Call LLM provider without blocking the event loop"""
         
-        # Determine provider from model name
-        if 'gpt' in model.lower():
-            return self._call_openai(model, messages, temperature, max_tokens)
-        else:
-            raise ValueError(f"Unsupported model: {model}")
-    
-    def _call_openai(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
-        """Call OpenAI or Azure OpenAI"""
-        
-        # Check if in demo mode
-        api_key = ConfigLoader.get_env("OPENAI_API_KEY")
-        if api_key == "demo-mode" or ConfigLoader.get_env("APP_ENV") == "demo":
-            # Demo mode - return simulated response
-            import random
-            user_message = messages[-1]['content'] if messages else ""
-            system_prompt = next((m['content'] for m in messages if m['role'] == 'system'), "")
+        # Keep history within budget, then fail or trim before the network round trip
+        messages = await self._fit_context(model, messages, max_tokens, agent)
+        max_tokens = TokenCounter.enforce_budget(model, messages, max_tokens)
+        
+        cached, cache_state = await self._lookup_cached(model, messages, temperature, max_tokens, agent)
+        if cached is not None:
+            return cached
+        
+        async def fetch() -> Dict[str, Any]:
+            result = await providers.complete(model, messages, temperature, max_tokens)
+            self._store_cached(cache_state, result)
+            return result
+        
+        if not ConfigLoader.get('execution.coalesce_requests', True):
+            return await fetch()
+        
+        # Identical concurrent requests share one upstream call
+        return await SingleFlight.get_instance().do(cache_state['request_key'], fetch)
+    
+    async def _stream_llm_async(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int, agent: Optional[BaseAgent] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream from LLM provider"""
+        
+        messages = await self._fit_context(model, messages, max_tokens, agent)
+        max_tokens = TokenCounter.enforce_budget(model, messages, max_tokens)
+        
+        cached, cache_state = await self._lookup_cached(model, messages, temperature, max_tokens, agent)
+        if cached is not None:
+            yield {'type': 'delta', 'content': cached['content']}
+            yield {
+                'type': 'done',
+                'tokens': cached['tokens'],
+                'usage': cached.get('usage'),
+                'finish_reason': cached.get('finish_reason'),
+                'cached': True
+            }
+            return
+        
+        async def fetch() -> AsyncIterator[Dict[str, Any]]:
+            content = []
             
-            # Generate contextual demo response
-            demo_responses = [
-                f"Thank you for your question about '{user_message[:50]}...'. Based on my understanding, here's what I can help you with:\n\n1. I've analyzed your request carefully\n2. I can provide detailed information on this topic\n3. Let me guide you through the solution step by step\n\nThis is a demo response showing how the agent would interact with you. In production, this would be powered by {model}.",
+            async for event in providers.stream(model, messages, temperature, max_tokens):
+                if event['type'] == 'delta':
+                    content.append(event['content'])
+                elif event['type'] == 'done':
+                    if not event.get('usage'):
+                        # Not every provider reports usage on streams
+                        usage = TokenCounter.usage(model, messages, ''.join(content))
+                        event = {**event, 'tokens': usage['total_tokens'], 'usage': usage}
+                    
+                    self._store_cached(cache_state, {
+                        'content': ''.join(content),
+                        'tokens': event['tokens'],
+                        'usage': event.get('usage'),
+                        'finish_reason': event.get('finish_reason')
+                    })
                 
-                f"I understand you're asking about: '{user_message[:50]}...'\n\nHere's my analysis:\n- This is an interesting question that requires careful consideration\n- Based on the context, I recommend the following approach\n- Let's break this down into manageable steps\n\nNote: This is a demonstration response. The actual agent would use {model} to provide real-time, intelligent responses.",
-                
-                f"Great question! Regarding '{user_message[:50]}...', I can help with that.\n\nKey points to consider:\n• Understanding the requirements\n• Evaluating different approaches\n• Implementing the best solution\n• Testing and validation\n\nThis demo showcases the agent's capabilities. In production mode, responses would be generated by {model} with real-time intelligence."
-            ]
-            
-            response_content = random.choice(demo_responses)
-            estimated_tokens = len(response_content.split()) * 1.3
-            
-            return {
-                'content': response_content,
-                'tokens': int(estimated_tokens),
-                'finish_reason': 'stop'
-            }
+                yield event
+        
+        if ConfigLoader.get('execution.coalesce_requests', True):
+            # Every concurrent identical stream receives the same token deltas
+            events = SingleFlight.get_instance().stream(cache_state['request_key'], fetch)
+        else:
+            events = fetch()
         
-        # Check if using Azure OpenAI
-        azure_endpoint = ConfigLoader.get_env("AZURE_OPENAI_ENDPOINT")
-        azure_api_key = ConfigLoader.get_env("AZURE_OPENAI_API_KEY")
+        async for event in events:
+            yield event
+    
+    async def _fit_context(self, model: str, messages: List[Dict[str, str]], max_tokens: int, agent: Optional[BaseAgent]) -> List[Dict[str, str]]:
+        """Trim or summarize conversation history with the agent's context strategy"""
         
-        if azure_endpoint and azure_api_key and azure_endpoint != "demo-mode":
-            # Azure OpenAI
-            client = openai.AzureOpenAI(
-                azure_endpoint=azure_endpoint,
-                api_key=azure_api_key,
-                api_version=ConfigLoader.get_env("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
+        strategy = agent.metadata.get('context_strategy') if agent and agent.metadata else None
+        strategy = strategy or ConfigLoader.get('context_window.strategy', 'sliding_window')
+        
+        manager = self._context_managers.get(strategy)
+        if manager is None:
+            manager = ContextWindowManager(strategy)
+            self._context_managers[strategy] = manager
+        
+        async def summarize(new_messages: List[Dict[str, str]], previous_summary: str) -> str:
+            result = await self._call_llm_async(
+                model,
+                ContextWindowManager.summary_messages(new_messages, previous_summary),
+                0,
+                manager.summary_max_tokens
             )
-            
-            deployment_name = ConfigLoader.get_env("AZURE_OPENAI_DEPLOYMENT_NAME", model)
-            
-            response = client.chat.completions.create(
-                model=deployment_name,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens
+            return result['content']
+        
+        return await manager.fit(model, messages, max_tokens, summarize)
+    
+    async def _lookup_cached(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int, agent: Optional[BaseAgent]) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """Look a request up in the exact-match and semantic caches
+        
+        Returns (cached response or None, state for _store_cached).
+        """
+        
+        request_key = ResponseCache.make_key(model, messages, temperature, max_tokens)
+        state = {'model': model, 'messages': messages, 'request_key': request_key}
+        metadata = agent.metadata if agent else None
+        
+        if ResponseCache.should_cache(self._cache_policy(agent), temperature):
+            state['exact_key'] = request_key
+            cached = await ResponseCache.get_instance().aget(state['exact_key'])
+            if cached is not None:
+                return {**cached, 'cached': True}, state
+        
+        if agent and SemanticCache.is_enabled(metadata):
+            state['agent_key'] = agent.id
+            cached, state['embedding'] = await SemanticCache.get_instance().lookup(
+                agent.id, model, messages, metadata.get('semantic_cache_threshold')
             )
-        else:
-            # Standard OpenAI
-            if not api_key:
-                raise ValueError("No OpenAI API key configured")
+            if cached is not None:
+                return {**cached, 'cached': True}, state
+        
+        return None, state
+    
+    def _store_cached(self, state: Dict[str, Any], result: Dict[str, Any]):
+        """Store a fresh response in the caches that missed"""
+        
+        if 'exact_key' in state:
+            ResponseCache.get_instance().set(state['exact_key'], result)
+        
+        if state.get('embedding') is not None:
+            SemanticCache.get_instance().add(state['agent_key'], state['model'], state['messages'], state['embedding'], result)
+    
+    def _cache_policy(self, agent: Optional[BaseAgent]) -> Optional[str]:
+        """Get the agent's response cache policy, if it sets one"""
+        return agent.metadata.get('cache_policy') if agent and agent.metadata else None
+    
+    @staticmethod
+    def get_cache_stats() -> Dict[str, Any]:
+        """Get response cache hit, miss and eviction counters"""
+        return ResponseCache.get_instance().get_stats()
+    
+    @staticmethod
+    def get_semantic_cache_stats() -> Dict[str, Any]:
+        """Get semantic cache hit rates per agent"""
+        return SemanticCache.get_instance().get_stats()
+    
+    @staticmethod
+    def get_coalescing_stats() -> Dict[str, Any]:
+        """Get counters for requests that shared an in-flight upstream call"""
+        return SingleFlight.get_instance().get_stats()
+    
+    @staticmethod
+    def get_rate_limit_stats() -> Dict[str, Any]:
+        """Get RPM/TPM utilization per deployment"""
+        return RateLimiter.get_instance().get_stats()
+    
+    @staticmethod
+    def get_resilience_stats() -> Dict[str, Any]:
+        """Get retry counters and circuit breaker state per deployment"""
+        return Resilience.get_instance().get_stats()
+    
+    @staticmethod
+    def get_routing_stats() -> Dict[str, Any]:
+        """Get EWMA latency, error rate and outstanding requests per deployment"""
+        return ModelRouter.get_instance().get_stats()
+    
+    async def run_multi_agent_async(
+        self,
+        agent_ids: List[str],
+        message: str,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Run multiple agents concurrently with a bounded fan-out"""
+        
+        if max_concurrency is None:
+            max_concurrency = ConfigLoader.get('execution.max_concurrency', 5)
+        if timeout is None:
+            timeout = ConfigLoader.get('execution.agent_timeout', 60)
+        
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def run_one(agent_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                start_time = time.perf_counter()
+                
+                try:
+                    result = await asyncio.wait_for(self.run_agent_async(agent_id, message), timeout)
+                except asyncio.TimeoutError:
+                    # A slow agent must not take the rest of the team down with it
+                    result = {
+                        'success': False,
+                        'error': f"Agent {agent_id} timed out after {timeout}s",
+                        'timed_out': True
+                    }
+                
+                agent = self.get_agent(agent_id)
+                
+                return {
+                    'agent_id': agent_id,
+                    'agent_name': agent.name if agent else 'Unknown',
+                    'result': result,
+                    'duration': time.perf_counter() - start_time
+                }
+        
+        return list(await asyncio.gather(*(run_one(agent_id) for agent_id in agent_ids)))
+    
+    def run_multi_agent(
+        self,
+        agent_ids: List[str],
+        message: str,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Run multiple agents in parallel"""
+        return run_sync(self.run_multi_agent_async(agent_ids, message, max_concurrency, timeout))
+    
+    def get_workflow(self) -> Workflow:
+        """Get the project's agents and connections compiled into a DAG"""
+        if self._workflow is None:
+            self._workflow = Workflow.compile(self.project)
+        return self._workflow
+    
+    def run_workflow(self, message: str, max_concurrency: Optional[int] = None, timeout: Optional[float] = None, memoize: Optional[bool] = None, run_id: Optional[str] = None) -> Dict[str, Any]:
+        """Run the whole project workflow synchronously"""
+        return run_sync(self.run_workflow_async(message, max_concurrency, timeout, memoize, run_id))
+    
+    async def run_workflow_async(self, message: str, max_concurrency: Optional[int] = None, timeout: Optional[float] = None, memoize: Optional[bool] = None, run_id: Optional[str] = None) -> Dict[str, Any]:
+        """Run the whole project workflow, with independent branches running concurrently"""
+        return await self._final_result(self.stream_workflow(message, max_concurrency, timeout, memoize, run_id))
+    
+    async def stream_workflow(self, message: str, max_concurrency: Optional[int] = None, timeout: Optional[float] = None, memoize: Optional[bool] = None, run_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Run the whole project workflow, yielding an event as each node starts and finishes"""
+        
+        store = CheckpointStore.get_instance()
+        run_id = run_id or uuid.uuid4().hex
+        if store is not None:
+            store.start_run(run_id, message, self.project.get('id'))
+        
+        async for event in self._checkpointed_run(run_id, message, None, max_concurrency, timeout, memoize):
+            yield event
+    
+    def resume_workflow(self, run_id: str, max_concurrency: Optional[int] = None, timeout: Optional[float] = None, memoize: Optional[bool] = None) -> Dict[str, Any]:
+        """Resume an interrupted workflow run synchronously"""
+        return run_sync(self.resume_workflow_async(run_id, max_concurrency, timeout, memoize))
+    
+    async def resume_workflow_async(self, run_id: str, max_concurrency: Optional[int] = None, timeout: Optional[float] = None, memoize: Optional[bool] = None) -> Dict[str, Any]:
+        """Resume a workflow run, skipping the nodes it already completed"""
+        return await self._final_result(self.stream_resumed_workflow(run_id, max_concurrency, timeout, memoize))
+    
+    async def stream_resumed_workflow(self, run_id: str, max_concurrency: Optional[int] = None, timeout: Optional[float] = None, memoize: Optional[bool] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Resume a workflow run, yielding node_restored events for checkpointed nodes and the usual events for the rest"""
+        
+        store = CheckpointStore.get_instance()
+        run = await asyncio.to_thread(store.load_run, run_id) if store is not None else None
+        if run is None:
+            yield {'type': 'error', 'error': f"Workflow run {run_id} not found"}
+            return
+        
+        # A node is only reused if neither it nor its team has been edited since
+        workflow = self.get_workflow()
+        restored = {
+            node_id: node for node_id, node in run['nodes'].items()
+            if node_id in workflow.nodes and node['config_hash'] == self._team_hash(node_id)
+        }
+        
+        store.resume_run(run_id)
+        async for event in self._checkpointed_run(run_id, run['message'], restored, max_concurrency, timeout, memoize):
+            yield event
+    
+    async def _checkpointed_run(
+        self,
+        run_id: str,
+        message: str,
+        restored: Optional[Dict[str, Dict[str, Any]]],
+        max_concurrency: Optional[int],
+        timeout: Optional[float],
+        memoize: Optional[bool]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run the workflow engine, checkpointing each node as it completes"""
+        
+        store = CheckpointStore.get_instance()
+        engine = WorkflowEngine(self.get_workflow(), self._workflow_runner(memoize), max_concurrency, timeout)
+        finished = False
+        
+        try:
+            async for event in engine.stream(message, restored):
+                if event['type'] == 'node_completed' and store is not None:
+                    # Queued for the background writer; the run does not wait on disk
+                    store.save_node(run_id, event['node_id'], {
+                        'status': event['status'],
+                        'config_hash': self._team_hash(event['node_id']),
+                        'input': event['input'],
+                        'output': event['output'],
+                        'result': {'success': event['status'] == 'completed', 'tokens_used': event['tokens'], 'error': event['error']},
+                        'tokens': event['tokens'],
+                        'duration': event['duration']
+                    })
+                
+                if event['type'] == 'done':
+                    event['result']['run_id'] = run_id
+                    if store is not None:
+                        store.finish_run(run_id, 'completed' if event['result']['success'] else 'failed', event['result'])
+                    finished = True
+                
+                yield event
+        finally:
+            if store is not None and not finished:
+                store.finish_run(run_id, 'interrupted')
+    
+    @staticmethod
+    async def _final_result(events: AsyncIterator[Dict[str, Any]]) -> Dict[str, Any]:
+        """Drain a workflow event stream and return its result"""
+        
+        async for event in events:
+            if event['type'] == 'error':
+                return {'success': False, 'error': event['error']}
+            if event['type'] == 'done':
+                return event['result']
+    
+    @staticmethod
+    def list_workflow_runs(limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get recent checkpointed workflow runs; interrupted and failed ones can be resumed"""
+        store = CheckpointStore.get_instance()
+        return store.list_runs(limit, status) if store is not None else []
+    
+    def _workflow_runner(self, memoize: Optional[bool]) -> AgentRunner:
+        """Get the node runner for a workflow run, reusing memoized node outputs when enabled"""
+        
+        if memoize is None:
+            memoize = ConfigLoader.get('workflow.memoize', True)
+        if not memoize:
+            return self.run_agent_async
+        
+        node_cache = NodeCache.get_instance()
+        
+        async def run_node(agent_id: str, message: str) -> Dict[str, Any]:
+            agent = self.get_agent(agent_id)
+            if agent is None:
+                return await self.run_agent_async(agent_id, message)
             
-            client = openai.OpenAI(api_key=api_key)
+            # An edited agent gets a new config hash; its downstream nodes get a new input
+            key = NodeCache.make_key(self._team_hash(agent_id), message)
+            cached = node_cache.get(key)
+            if cached is not None:
+                return {**cached, 'cached': True}
             
-            response = client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
+            result = await self.run_agent_async(agent_id, message)
+            if result.get('success'):
+                node_cache.set(key, result)
+            
+            return result
         
-        return {
-            'content': response.choices[0].message.content,
-            'tokens': response.usage.total_tokens,
-            'finish_reason': response.choices[0].finish_reason
-        }
+        return run_node
     
-    def run_multi_agent(self, agent_ids: List[str], message: str) -> List[Dict[str, Any]]:
-        """Run multiple agents in parallel"""
+    def _team_hash(self, agent_id: str) -> str:
+        """Config hash of an agent together with everyone it delegates to"""
         
-        results = []
+        agent = self.get_agent(agent_id)
+        if agent is None:
+            # Unbuildable (e.g. unknown type): hash what the project says, so fixing it invalidates the checkpoint
+            agent_data = (self._agent_data or {}).get(agent_id)
+            return hashlib.sha256(json.dumps(agent_data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
         
-        for agent_id in agent_ids:
-            result = self.run_agent(agent_id, message)
-            results.append({
-                'agent_id': agent_id,
-                'agent_name': self.agents[agent_id].name if agent_id in self.agents else 'Unknown',
-                'result': result
-            })
+        team = self.get_team(agent_id) if isinstance(agent, TeamManagerAgent) else None
+        if team is None:
+            return agent.config.content_hash
         
-        return results
+        hashes = [agent.config.content_hash] + [self._team_hash(member.id) for member in team.members]
+        return hashlib.sha256(':'.join(hashes).encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def get_node_cache_stats() -> Dict[str, Any]:
+        """Get memoized workflow node hit, miss and eviction counters"""
+        return NodeCache.get_instance().get_stats()
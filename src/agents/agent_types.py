@@ -1,118 +1,321 @@
 """
 Agent types and factory for creating different agent types
 """
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Callable, Awaitable, AsyncIterator, Mapping, Tuple, Type, Union
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from enum import Enum
+from importlib.metadata import entry_points
+from types import MappingProxyType
+import hashlib
+import importlib
+import json
+import sys
+import threading
+
+from src.utils.config_loader import ConfigLoader
+from src.llm import providers
+
+# Async LLM call: (model, messages, temperature, max_tokens, agent) -> {'content', 'tokens', 'finish_reason'}
+LLMCallable = Callable[..., Awaitable[Dict[str, Any]]]
+
+# Streaming LLM call: same arguments, yields 'delta' events then one 'done' event
+LLMStreamCallable = Callable[..., AsyncIterator[Dict[str, Any]]]
 
 class AgentType(Enum):
-    """Available agent types"""
+    """Built-in agent types"""
     ASSISTANT = "assistant"
     RESEARCHER = "researcher"
     CODER = "coder"
     DATA_ANALYST = "data_analyst"
     TEAM_MANAGER = "team_manager"
 
-@dataclass
+# Built-in implementations, imported once when the registry is first used
+BUILTIN_AGENTS = {
+    AgentType.ASSISTANT.value: "src.agents.implementations.assistant_agent:AssistantAgent",
+    AgentType.RESEARCHER.value: "src.agents.implementations.researcher_agent:ResearcherAgent",
+    AgentType.CODER.value: "src.agents.implementations.coder_agent:CoderAgent",
+    AgentType.DATA_ANALYST.value: "src.agents.implementations.data_analyst_agent:DataAnalystAgent",
+    AgentType.TEAM_MANAGER.value: "src.agents.implementations.team_manager_agent:TeamManagerAgent"
+}
+
+# Installed packages add agent types with entry points in this group, e.g. in pyproject.toml:
+# [project.entry-points."ai_agent_canvas.agents"]
+# reviewer = "my_package.agents:ReviewerAgent"
+AGENT_ENTRY_POINT_GROUP = "ai_agent_canvas.agents"
+
+def parse_agent_type(value: Union[AgentType, str]) -> Union[AgentType, str]:
+    """Built-in types become AgentType members; third-party types stay strings"""
+    
+    if isinstance(value, AgentType):
+        return value
+    
+    return AgentType(value) if value in AgentType._value2member_map_ else value
+
+def agent_type_value(agent_type: Union[AgentType, str]) -> str:
+    """Get the registry key of an agent type"""
+    return agent_type.value if isinstance(agent_type, AgentType) else agent_type
+
+@dataclass(frozen=True, slots=True, eq=False)
 class AgentConfig:
-    """Configuration for an agent"""
+    """Immutable configuration for an agent, shared by every instance built from it"""
     id: str
     name: str
-    type: AgentType
+    type: Union[AgentType, str]
     system_prompt: str
     llm_model: str
     temperature: float = 0.7
     max_tokens: int = 1000
-    tools: List[str] = None
+    tools: Tuple[str, ...] = ()
     vector_db: Optional[str] = None
-    metadata: Dict[str, Any] = None
+    metadata: Mapping[str, Any] = field(default_factory=dict)
+    content_hash: str = field(init=False, repr=False)
+    _dict: Dict[str, Any] = field(init=False, repr=False)
     
     def __post_init__(self):
-        if self.tools is None:
-            self.tools = []
-        if self.metadata is None:
-            self.metadata = {}
+        # Normalize once; interned strings are shared between agents built from the same template
+        set_field = object.__setattr__
+        set_field(self, 'id', sys.intern(self.id))
+        set_field(self, 'name', sys.intern(self.name))
+        set_field(self, 'type', parse_agent_type(self.type))
+        set_field(self, 'system_prompt', sys.intern(self.system_prompt or ''))
+        set_field(self, 'llm_model', sys.intern(self.llm_model))
+        set_field(self, 'temperature', float(self.temperature))
+        set_field(self, 'max_tokens', int(self.max_tokens))
+        set_field(self, 'tools', tuple(sys.intern(tool) for tool in self.tools or ()))
+        set_field(self, 'vector_db', sys.intern(self.vector_db) if self.vector_db else None)
+        set_field(self, 'metadata', MappingProxyType(dict(self.metadata or {})))
+        
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'type': agent_type_value(self.type),
+            'system_prompt': self.system_prompt,
+            'llm_model': self.llm_model,
+            'temperature': self.temperature,
+            'max_tokens': self.max_tokens,
+            'tools': list(self.tools),
+            'vector_db': self.vector_db,
+            'metadata': dict(self.metadata)
+        }
+        set_field(self, '_dict', data)
+        set_field(self, 'content_hash', hashlib.sha256(
+            json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest())
+    
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, AgentConfig) and other.content_hash == self.content_hash
+    
+    def __hash__(self) -> int:
+        return hash(self.content_hash)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the configuration as a dictionary; built once and shared, so treat it as read-only"""
+        return self._dict
 
 class AgentFactory:
-    """Factory for creating agents"""
+    """Creates agents from a registry of agent types, filled once on first use"""
     
-    @staticmethod
-    def create_agent(config: AgentConfig) -> 'BaseAgent':
-        """Create an agent based on configuration"""
+    _registry: Dict[str, Type['BaseAgent']] = {}
+    _loaded = False
+    _instances: 'OrderedDict[str, BaseAgent]' = OrderedDict()
+    _lock = threading.RLock()
+    
+    @classmethod
+    def register(cls, agent_type: str, agent_class: Optional[Type['BaseAgent']] = None) -> Any:
+        """Register an agent class for a type; also usable as a class decorator"""
         
-        if config.type == AgentType.ASSISTANT:
-            from src.agents.implementations.assistant_agent import AssistantAgent
-            return AssistantAgent(config)
+        def decorator(agent_class: Type['BaseAgent']) -> Type['BaseAgent']:
+            with cls._lock:
+                cls._registry[agent_type] = agent_class
+            return agent_class
         
-        elif config.type == AgentType.RESEARCHER:
-            from src.agents.implementations.researcher_agent import ResearcherAgent
-            return ResearcherAgent(config)
+        return decorator(agent_class) if agent_class is not None else decorator
+    
+    @classmethod
+    def get_registry(cls) -> Dict[str, Type['BaseAgent']]:
+        """Get agent classes by type: the built-in ones plus any installed through entry points"""
         
-        elif config.type == AgentType.CODER:
-            from src.agents.implementations.coder_agent import CoderAgent
-            return CoderAgent(config)
+        if not cls._loaded:
+            with cls._lock:
+                if not cls._loaded:
+                    cls._load_builtin_agents()
+                    cls._load_entry_point_agents()
+                    cls._loaded = True
         
-        elif config.type == AgentType.DATA_ANALYST:
-            from src.agents.implementations.data_analyst_agent import DataAnalystAgent
-            return DataAnalystAgent(config)
+        return cls._registry
+    
+    @classmethod
+    def available_types(cls) -> List[str]:
+        """Get every registered agent type"""
+        return sorted(cls.get_registry())
+    
+    @classmethod
+    def create_agent(cls, config: AgentConfig) -> 'BaseAgent':
+        """Create an agent based on configuration"""
         
-        elif config.type == AgentType.TEAM_MANAGER:
-            from src.agents.implementations.team_manager_agent import TeamManagerAgent
-            return TeamManagerAgent(config)
+        agent_class = cls.get_registry().get(agent_type_value(config.type))
+        if agent_class is None:
+            raise ValueError(f"Unknown agent type: {agent_type_value(config.type)}")
         
-        else:
-            raise ValueError(f"Unknown agent type: {config.type}")
+        return agent_class(config)
     
     @staticmethod
-    def from_dict(data: Dict[str, Any]) -> 'BaseAgent':
-        """Create agent from dictionary"""
+    def config_from_dict(data: Dict[str, Any]) -> AgentConfig:
+        """Build an agent configuration from a project dictionary"""
         
-        config = AgentConfig(
+        # Template projects nest model settings under llm_config
+        llm_config = data.get('llm_config') or {}
+        
+        return AgentConfig(
             id=data['id'],
             name=data['name'],
-            type=AgentType(data['type']),
+            type=parse_agent_type(data['type']),
             system_prompt=data.get('system_prompt', ''),
-            llm_model=data.get('llm_model', 'gpt-4'),
-            temperature=data.get('temperature', 0.7),
-            max_tokens=data.get('max_tokens', 1000),
-            tools=data.get('tools', []),
+            llm_model=data.get('llm_model') or llm_config.get('model', 'gpt-4'),
+            temperature=data.get('temperature', llm_config.get('temperature', 0.7)),
+            max_tokens=data.get('max_tokens', llm_config.get('max_tokens', 1000)),
+            tools=tuple(data.get('tools') or ()),
             vector_db=data.get('vector_db'),
             metadata=data.get('metadata', {})
         )
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BaseAgent':
+        """Create agent from dictionary"""
+        return cls.create_agent(cls.config_from_dict(data))
+    
+    @classmethod
+    def get_or_create(cls, data: Dict[str, Any]) -> 'BaseAgent':
+        """Get the shared agent for a configuration, creating it on first use
+        
+        Agents hold no per-run state, so every executor with the same agent
+        configuration reuses one instance.
+        """
+        
+        config = cls.config_from_dict(data)
+        key = config.content_hash
         
-        return AgentFactory.create_agent(config)
+        with cls._lock:
+            agent = cls._instances.get(key)
+            if agent is not None:
+                cls._instances.move_to_end(key)
+                return agent
+        
+        agent = cls.create_agent(config)
+        
+        with cls._lock:
+            agent = cls._instances.setdefault(key, agent)
+            cls._instances.move_to_end(key)
+            
+            max_instances = ConfigLoader.get('execution.agent_cache_size', 1024)
+            while len(cls._instances) > max_instances:
+                cls._instances.popitem(last=False)
+        
+        return agent
+    
+    @classmethod
+    def _load_builtin_agents(cls):
+        """Import the built-in agent implementations"""
+        
+        for agent_type, path in BUILTIN_AGENTS.items():
+            module_name, class_name = path.split(':')
+            cls._registry[agent_type] = getattr(importlib.import_module(module_name), class_name)
+    
+    @classmethod
+    def _load_entry_point_agents(cls):
+        """Register agent classes that installed packages expose in the agent entry point group"""
+        
+        for entry_point in entry_points(group=AGENT_ENTRY_POINT_GROUP):
+            if entry_point.name in BUILTIN_AGENTS:
+                print(f"Error loading agent type {entry_point.name}: built-in agent types cannot be replaced")
+                continue
+            
+            try:
+                cls._registry[entry_point.name] = entry_point.load()
+            except Exception as e:
+                print(f"Error loading agent type {entry_point.name}: {e}")
+
+class ConfigAttribute:
+    """Read-only agent attribute delegated to the agent's shared config"""
+    
+    def __set_name__(self, owner: type, name: str):
+        self.name = name
+    
+    def __get__(self, agent: Optional['BaseAgent'], owner: Optional[type] = None) -> Any:
+        return self if agent is None else getattr(agent.config, self.name)
 
 class BaseAgent:
     """Base class for all agents"""
     
+    id = ConfigAttribute()
+    name = ConfigAttribute()
+    type = ConfigAttribute()
+    system_prompt = ConfigAttribute()
+    llm_model = ConfigAttribute()
+    temperature = ConfigAttribute()
+    max_tokens = ConfigAttribute()
+    tools = ConfigAttribute()
+    vector_db = ConfigAttribute()
+    metadata = ConfigAttribute()
+    
     def __init__(self, config: AgentConfig):
         self.config = config
-        self.id = config.id
-        self.name = config.name
-        self.type = config.type
-        self.system_prompt = config.system_prompt
-        self.llm_model = config.llm_model
-        self.temperature = config.temperature
-        self.max_tokens = config.max_tokens
-        self.tools = config.tools
-        self.vector_db = config.vector_db
-        self.metadata = config.metadata
-    
-    async def execute(self, message: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    
+    async def execute(self, message: str, context: Optional[Dict[str, Any]] = None, llm: Optional[LLMCallable] = None) -> Dict[str, Any]:
         """Execute agent with a message"""
         raise NotImplementedError("Subclasses must implement execute method")
     
+    async def execute_stream(self, message: str, context: Optional[Dict[str, Any]] = None, llm_stream: Optional[LLMStreamCallable] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Execute agent with a message, yielding token deltas as they arrive"""
+        
+        messages = self.build_messages(message, context)
+        
+        if llm_stream is None:
+            events = providers.stream(self.llm_model, messages, self.temperature, self.max_tokens)
+        else:
+            events = llm_stream(
+                model=self.llm_model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                agent=self
+            )
+        
+        async for event in events:
+            yield event
+    
+    def build_messages(self, message: str, context: Optional[Dict[str, Any]] = None) -> List[Dict[str, str]]:
+        """Build the chat messages for a user message, including conversation history"""
+        
+        messages = [
+            {"role": "system", "content": self.system_prompt}
+        ]
+        
+        if context and 'history' in context:
+            messages.extend(context['history'])
+        
+        messages.append({"role": "user", "content": message})
+        
+        return messages
+    
+    async def call_llm(self, messages: List[Dict[str, str]], llm: Optional[LLMCallable] = None, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Call the LLM, through the executor's pipeline when one is given"""
+        
+        max_tokens = min(self.max_tokens, max_tokens) if max_tokens is not None else self.max_tokens
+        
+        if llm is None:
+            return await providers.complete(self.llm_model, messages, self.temperature, max_tokens)
+        
+        # The executor pipeline also gets the agent for per-agent policies
+        return await llm(
+            model=self.llm_model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=max_tokens,
+            agent=self
+        )
+    
     def get_config(self) -> Dict[str, Any]:
         """Get agent configuration as dictionary"""
-        return {
-            'id': self.id,
-            'name': self.name,
-            'type': self.type.value,
-            'system_prompt': self.system_prompt,
-            'llm_model': self.llm_model,
-            'temperature': self.temperature,
-            'max_tokens': self.max_tokens,
-            'tools': self.tools,
-            'vector_db': self.vector_db,
-            'metadata': self.metadata
-        }
+        return self.config.to_dict()
@@ -0,0 +1,209 @@
+"""
+Checkpoint store - Persisted workflow run state so an interrupted run can be resumed
+"""
+from typing import Dict, Any, List, Optional
+from pathlib import Path
+import atexit
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+from src.utils.config_loader import ConfigLoader
+
+class CheckpointStore:
+    """SQLite store of workflow runs and their node results, keyed by run id
+    
+    Writes are queued and committed in batches by a background thread, so saving a
+    checkpoint never waits on disk in the workflow's critical path.
+    """
+    
+    _instance: Optional['CheckpointStore'] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, path: str, batch_size: int = 50, flush_interval: float = 0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {'writes': 0, 'batches': 0, 'errors': 0}
+        
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # API and job worker processes share the file: WAL lets readers run beside the
+        # writer, and the timeout waits out another process's commit instead of failing
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, project_id TEXT, message TEXT NOT NULL, "
+            "status TEXT NOT NULL, result TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS run_nodes (run_id TEXT NOT NULL, node_id TEXT NOT NULL, status TEXT NOT NULL, "
+            "config_hash TEXT, input TEXT, output TEXT, result TEXT, tokens INTEGER, duration REAL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (run_id, node_id))"
+        )
+        self._db.commit()
+        
+        self._writer = threading.Thread(target=self._write_loop, name="checkpoint-writer", daemon=True)
+        self._writer.start()
+        
+        # The writer is a daemon thread; give queued checkpoints a chance to land on exit
+        atexit.register(self.flush, 2.0)
+    
+    @classmethod
+    def get_instance(cls) -> Optional['CheckpointStore']:
+        """Get the process-wide store configured from config.yaml, or None when checkpoints are disabled"""
+        
+        settings = ConfigLoader.get('workflow.checkpoints', {})
+        if not settings.get('enabled', True):
+            return None
+        
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    try:
+                        cls._instance = cls(
+                            path=settings.get('path', './data/workflow_runs.sqlite'),
+                            batch_size=settings.get('batch_size', 50),
+                            flush_interval=settings.get('flush_interval', 0.5)
+                        )
+                    except Exception as e:
+                        print(f"Error opening checkpoint store: {e}")
+                        return None
+        
+        return cls._instance
+    
+    def start_run(self, run_id: str, message: str, project_id: Optional[str] = None):
+        """Record a new run"""
+        now = time.time()
+        self._queue.put((
+            "INSERT OR REPLACE INTO runs (run_id, project_id, message, status, result, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'running', NULL, ?, ?)",
+            (run_id, project_id, message, now, now)
+        ))
+    
+    def resume_run(self, run_id: str):
+        """Mark a run as running again"""
+        self._queue.put(("UPDATE runs SET status = 'running', updated_at = ? WHERE run_id = ?", (time.time(), run_id)))
+    
+    def save_node(self, run_id: str, node_id: str, node: Dict[str, Any]):
+        """Record a node's input, output, token usage and status"""
+        self._queue.put((
+            "INSERT OR REPLACE INTO run_nodes (run_id, node_id, status, config_hash, input, output, result, tokens, duration, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run_id, node_id, node['status'], node.get('config_hash'), node.get('input'), node.get('output'),
+                json.dumps(node.get('result') or {}, default=str), node.get('tokens') or 0, node.get('duration'), time.time()
+            )
+        ))
+    
+    def finish_run(self, run_id: str, status: str, result: Optional[Dict[str, Any]] = None):
+        """Record how a run ended"""
+        self._queue.put((
+            "UPDATE runs SET status = ?, result = ?, updated_at = ? WHERE run_id = ?",
+            (status, json.dumps(result, default=str) if result is not None else None, time.time(), run_id)
+        ))
+    
+    def load_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Get a run and its checkpointed nodes"""
+        
+        self.flush()
+        
+        with self._lock:
+            row = self._db.execute(
+                "SELECT run_id, project_id, message, status, result, created_at, updated_at FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            node_rows = self._db.execute(
+                "SELECT node_id, status, config_hash, input, output, result, tokens, duration FROM run_nodes WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        
+        run = self._run_dict(row)
+        run['nodes'] = {
+            node_id: {
+                'status': status,
+                'config_hash': config_hash,
+                'input': node_input,
+                'output': output,
+                'result': json.loads(result) if result else {},
+                'tokens': tokens,
+                'duration': duration
+            }
+            for node_id, status, config_hash, node_input, output, result, tokens, duration in node_rows
+        }
+        
+        return run
+    
+    def list_runs(self, limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get the most recent runs, newest first"""
+        
+        self.flush()
+        
+        query = "SELECT run_id, project_id, message, status, result, created_at, updated_at FROM runs"
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        
+        with self._lock:
+            rows = self._db.execute(f"{query} ORDER BY created_at DESC LIMIT ?", params + (limit,)).fetchall()
+        
+        return [self._run_dict(row) for row in rows]
+    
+    def flush(self, timeout: Optional[float] = None):
+        """Wait until every queued write has been committed"""
+        
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.01)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get write and batch counters"""
+        return {**self._stats, 'pending': self._queue.qsize(), 'path': self.path}
+    
+    def _write_loop(self):
+        """Commit queued writes in batches of up to batch_size"""
+        
+        while True:
+            batch = [self._queue.get()]
+            
+            # Let writes arriving together share one commit
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            
+            try:
+                with self._lock:
+                    with self._db:
+                        for statement, params in batch:
+                            self._db.execute(statement, params)
+                self._stats['writes'] += len(batch)
+                self._stats['batches'] += 1
+            except Exception as e:
+                self._stats['errors'] += 1
+                print(f"Error writing workflow checkpoints: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    @staticmethod
+    def _run_dict(row: tuple) -> Dict[str, Any]:
+        run_id, project_id, message, status, result, created_at, updated_at = row
+        return {
+            'run_id': run_id,
+            'project_id': project_id,
+            'message': message,
+            'status': status,
+            'result': json.loads(result) if result else None,
+            'created_at': created_at,
+            'updated_at': updated_at
+        }
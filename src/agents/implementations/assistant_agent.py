@@ -2,29 +2,26 @@
 Assistant Agent Implementation
 """
 from typing import Dict, Any, Optional
-from src.agents.agent_types import BaseAgent
+from src.agents.agent_types import BaseAgent, LLMCallable
 
 class AssistantAgent(BaseAgent):
     """General-purpose assistant agent"""
     
-    async def execute(self, message: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def execute(self, message: str, context: Optional[Dict[str, Any]] = None, llm: Optional[LLMCallable] = None) -> Dict[str, Any]:
         """Execute the assistant agent"""
         
         # Build conversation history
-        messages = [
-            {"role": "system", "content": self.system_prompt}
-        ]
+        messages = self.build_messages(message, context)
         
-        if context and 'history' in context:
-            messages.extend(context['history'])
+        llm_response = await self.call_llm(messages, llm)
         
-        messages.append({"role": "user", "content": message})
-        
-        # Call LLM (this would use the AgentExecutor in practice)
-        # For now, return a structured response
         return {
             'success': True,
-            'response': f"Assistant agent '{self.name}' processing: {message}",
+            'response': llm_response['content'],
             'agent_id': self.id,
-            'agent_name': self.name
+            'agent_name': self.name,
+            'tokens_used': llm_response['tokens'],
+            'usage': llm_response.get('usage'),
+            'model': self.llm_model,
+            'finish_reason': llm_response.get('finish_reason')
         }
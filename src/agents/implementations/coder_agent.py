@@ -1,28 +1,37 @@
 """
 Coder Agent Implementation
 """
-from typing import Dict, Any, Optional
-from src.agents.agent_types import BaseAgent
+from typing import Dict, Any, Optional, List
+import re
+from src.agents.agent_types import BaseAgent, LLMCallable
+
+CODE_BLOCK_PATTERN = re.compile(r"```(\w*)\n(.*?)```", re.DOTALL)
 
 class CoderAgent(BaseAgent):
     """Code generation and analysis agent"""
     
-    async def execute(self, message: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def execute(self, message: str, context: Optional[Dict[str, Any]] = None, llm: Optional[LLMCallable] = None) -> Dict[str, Any]:
         """Execute the coder agent"""
         
-        messages = [
-            {"role": "system", "content": self.system_prompt}
-        ]
-        
-        if context and 'history' in context:
-            messages.extend(context['history'])
+        messages = self.build_messages(message, context)
         
-        messages.append({"role": "user", "content": message})
+        llm_response = await self.call_llm(messages, llm)
         
         return {
             'success': True,
-            'response': f"Coder agent '{self.name}' generating code for: {message}",
+            'response': llm_response['content'],
             'agent_id': self.id,
             'agent_name': self.name,
-            'code_blocks': []  # Would include generated code
+            'tokens_used': llm_response['tokens'],
+            'usage': llm_response.get('usage'),
+            'model': self.llm_model,
+            'finish_reason': llm_response.get('finish_reason'),
+            'code_blocks': self._extract_code_blocks(llm_response['content'])
         }
+    
+    def _extract_code_blocks(self, content: str) -> List[Dict[str, str]]:
+        """Extract fenced code blocks from the response"""
+        return [
+            {'language': language or 'text', 'code': code}
+            for language, code in CODE_BLOCK_PATTERN.findall(content or '')
+        ]
@@ -2,27 +2,26 @@
 Data Analyst Agent Implementation
 """
 from typing import Dict, Any, Optional
-from src.agents.agent_types import BaseAgent
+from src.agents.agent_types import BaseAgent, LLMCallable
 
 class DataAnalystAgent(BaseAgent):
     """Data analysis and visualization agent"""
     
-    async def execute(self, message: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def execute(self, message: str, context: Optional[Dict[str, Any]] = None, llm: Optional[LLMCallable] = None) -> Dict[str, Any]:
         """Execute the data analyst agent"""
         
-        messages = [
-            {"role": "system", "content": self.system_prompt}
-        ]
+        messages = self.build_messages(message, context)
         
-        if context and 'history' in context:
-            messages.extend(context['history'])
-        
-        messages.append({"role": "user", "content": message})
+        llm_response = await self.call_llm(messages, llm)
         
         return {
             'success': True,
-            'response': f"Data analyst agent '{self.name}' analyzing: {message}",
+            'response': llm_response['content'],
             'agent_id': self.id,
             'agent_name': self.name,
+            'tokens_used': llm_response['tokens'],
+            'usage': llm_response.get('usage'),
+            'model': self.llm_model,
+            'finish_reason': llm_response.get('finish_reason'),
             'visualizations': []  # Would include chart data
         }
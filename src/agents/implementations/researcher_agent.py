@@ -1,28 +1,34 @@
 """
 Researcher Agent Implementation
 """
-from typing import Dict, Any, Optional
-from src.agents.agent_types import BaseAgent
+from typing import Dict, Any, Optional, List
+import re
+from src.agents.agent_types import BaseAgent, LLMCallable
+
+URL_PATTERN = re.compile(r"https?://[^\s)\]>]+")
 
 class ResearcherAgent(BaseAgent):
     """Research and information gathering agent"""
     
-    async def execute(self, message: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def execute(self, message: str, context: Optional[Dict[str, Any]] = None, llm: Optional[LLMCallable] = None) -> Dict[str, Any]:
         """Execute the researcher agent"""
         
-        messages = [
-            {"role": "system", "content": self.system_prompt}
-        ]
-        
-        if context and 'history' in context:
-            messages.extend(context['history'])
+        messages = self.build_messages(message, context)
         
-        messages.append({"role": "user", "content": message})
+        llm_response = await self.call_llm(messages, llm)
         
         return {
             'success': True,
-            'response': f"Researcher agent '{self.name}' researching: {message}",
+            'response': llm_response['content'],
             'agent_id': self.id,
             'agent_name': self.name,
-            'sources': []  # Would include research sources
+            'tokens_used': llm_response['tokens'],
+            'usage': llm_response.get('usage'),
+            'model': self.llm_model,
+            'finish_reason': llm_response.get('finish_reason'),
+            'sources': self._extract_sources(llm_response['content'])
         }
+    
+    def _extract_sources(self, content: str) -> List[str]:
+        """Extract cited URLs from the response"""
+        return list(dict.fromkeys(URL_PATTERN.findall(content or '')))
@@ -1,39 +1,240 @@
 """
 Team Manager Agent Implementation
 """
-from typing import Dict, Any, Optional, List
-from src.agents.agent_types import BaseAgent
+from typing import Dict, Any, Optional, List, AsyncIterator
+import asyncio
+import json
+import re
+import time
+from src.agents.agent_types import BaseAgent, LLMCallable
+from src.agents.team import Team
+
+PLAN_PROMPT = """Split this request into subtasks for your team:
+
+{message}
+
+Team members:
+{members}
+
+Reply with a JSON list only, one object per subtask, for example:
+[{{"member": "<member id>", "task": "<what this member should do>"}}]"""
+
+SYNTHESIS_PROMPT = """Request:
+{message}
+
+Your team's results:
+
+{results}
+
+Combine these results into one final answer to the request."""
+
+JSON_LIST_PATTERN = re.compile(r"\[.*\]", re.DOTALL)
 
 class TeamManagerAgent(BaseAgent):
     """Team coordination and task delegation agent"""
     
-    def __init__(self, config):
-        super().__init__(config)
-        self.team_agents: List[BaseAgent] = []
-    
-    def add_team_member(self, agent: BaseAgent):
-        """Add an agent to the team"""
-        self.team_agents.append(agent)
-    
-    async def execute(self, message: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def execute(self, message: str, context: Optional[Dict[str, Any]] = None, llm: Optional[LLMCallable] = None, team: Optional[Team] = None) -> Dict[str, Any]:
         """Execute the team manager agent"""
         
-        # Manager decides task distribution
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": f"Coordinate the team to handle: {message}"}
-        ]
+        if team and team.members:
+            result = None
+            async for event in self.delegate(message, team, context, llm):
+                if event['type'] == 'done':
+                    result = event['result']
+            return result
         
-        # In a real implementation, this would:
-        # 1. Analyze the task
-        # 2. Delegate to appropriate team members
-        # 3. Collect and synthesize results
+        # Without a team the manager answers on its own
+        messages = self.build_messages(f"Coordinate the team to handle: {message}", context)
+        llm_response = await self.call_llm(messages, llm)
         
         return {
             'success': True,
-            'response': f"Team manager '{self.name}' coordinating team for: {message}",
+            'response': llm_response['content'],
+            'agent_id': self.id,
+            'agent_name': self.name,
+            'tokens_used': llm_response['tokens'],
+            'usage': llm_response.get('usage'),
+            'model': self.llm_model,
+            'finish_reason': llm_response.get('finish_reason'),
+            'delegations': [],
+            'team_size': 0
+        }
+    
+    async def delegate(self, message: str, team: Team, context: Optional[Dict[str, Any]] = None, llm: Optional[LLMCallable] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Plan subtasks, run them concurrently on the team and synthesize the answer
+        
+        Yields a 'plan' event, 'delegation_started' / 'delegation_completed' events as
+        members start and finish, and a final 'done' event with the result.
+        """
+        
+        budget = team.budget
+        start_time = time.perf_counter()
+        own_tokens = 0
+        
+        # A sub-manager reached after the shared budget ran out must not plan either
+        if budget.exhausted:
+            yield {'type': 'done', 'result': self._budget_exhausted(team, start_time, "Team budget exhausted", skipped=True)}
+            return
+        
+        # 1. Plan
+        members = "\n".join(f"- {member.id}: {member.name}" + (f" - {member.role}" if member.role else '') for member in team.members)
+        try:
+            plan_response = await asyncio.wait_for(
+                self.call_llm(
+                    self.build_messages(PLAN_PROMPT.format(message=message, members=members), context),
+                    llm,
+                    max_tokens=budget.remaining_tokens
+                ),
+                budget.remaining_time
+            )
+        except asyncio.TimeoutError:
+            yield {'type': 'done', 'result': self._budget_exhausted(team, start_time, "Team time budget exceeded", timed_out=True)}
+            return
+        budget.charge(plan_response['tokens'])
+        own_tokens += plan_response['tokens']
+        
+        subtasks = self._parse_plan(plan_response['content'], message, team)
+        yield {'type': 'plan', 'agent_id': self.id, 'subtasks': subtasks}
+        
+        # 2. Dispatch every subtask at once, bounded by the team's concurrency
+        semaphore = asyncio.Semaphore(max(1, team.max_concurrency))
+        
+        async def run_subtask(subtask: Dict[str, str]) -> Dict[str, Any]:
+            async with semaphore:
+                if budget.exhausted:
+                    return {'success': False, 'error': "Team budget exhausted", 'skipped': True}
+                try:
+                    return await asyncio.wait_for(team.run(subtask['member'], subtask['task']), budget.remaining_time)
+                except asyncio.TimeoutError:
+                    return {'success': False, 'error': "Team time budget exceeded", 'timed_out': True}
+                except Exception as e:
+                    return {'success': False, 'error': str(e)}
+        
+        running = {}
+        for index, subtask in enumerate(subtasks):
+            running[asyncio.ensure_future(run_subtask(subtask))] = (index, time.perf_counter())
+            yield {'type': 'delegation_started', 'agent_id': self.id, **subtask}
+        
+        delegations: List[Optional[Dict[str, Any]]] = [None] * len(subtasks)
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index, started = running.pop(task)
+                    result = task.result()
+                    
+                    # A sub-manager that delegated has already charged the shared budget;
+                    # one without a team answered alone and has not
+                    if 'budget' not in result:
+                        budget.charge(result.get('tokens_used', 0))
+                    
+                    delegation = {
+                        **subtasks[index],
+                        'status': self._status(result),
+                        'output': result.get('response') if result.get('success') else None,
+                        'error': result.get('error'),
+                        'tokens': result.get('tokens_used', 0),
+                        'duration': time.perf_counter() - started
+                    }
+                    if result.get('delegations'):
+                        delegation['delegations'] = result['delegations']
+                    
+                    delegations[index] = delegation
+                    yield {'type': 'delegation_completed', 'agent_id': self.id, **delegation}
+        finally:
+            for task in running:
+                task.cancel()
+        
+        # 3. Synthesize, or hand back the raw results once the budget is spent
+        completed = [delegation for delegation in delegations if delegation['status'] == 'completed']
+        results = "\n\n".join(f"--- {delegation['member_name']} ---\n{delegation['output']}" for delegation in completed)
+        
+        synthesis = None
+        if completed and not budget.exhausted:
+            try:
+                synthesis = await asyncio.wait_for(
+                    self.call_llm(
+                        self.build_messages(SYNTHESIS_PROMPT.format(message=message, results=results), context),
+                        llm,
+                        max_tokens=budget.remaining_tokens
+                    ),
+                    budget.remaining_time
+                )
+                budget.charge(synthesis['tokens'])
+                own_tokens += synthesis['tokens']
+            except asyncio.TimeoutError:
+                synthesis = None
+        
+        yield {'type': 'done', 'result': {
+            'success': bool(completed),
+            'response': synthesis['content'] if synthesis else results,
+            'error': None if completed else "No team member completed its subtask",
+            'agent_id': self.id,
+            'agent_name': self.name,
+            'tokens_used': own_tokens + sum(delegation['tokens'] or 0 for delegation in delegations),
+            'usage': synthesis.get('usage') if synthesis else None,
+            'model': self.llm_model,
+            'finish_reason': synthesis.get('finish_reason') if synthesis else None,
+            'synthesized': synthesis is not None,
+            'delegations': delegations,
+            'team_size': len(team.members),
+            'budget': budget.to_dict(),
+            'duration': time.perf_counter() - start_time
+        }}
+    
+    def _budget_exhausted(self, team: Team, start_time: float, error: str, **flags: bool) -> Dict[str, Any]:
+        """Result of a delegation that stopped before any member ran"""
+        return {
+            'success': False,
+            'response': '',
+            'error': error,
+            **flags,
             'agent_id': self.id,
             'agent_name': self.name,
-            'delegations': [],  # Would include delegated tasks
-            'team_size': len(self.team_agents)
+            'tokens_used': 0,
+            'model': self.llm_model,
+            'synthesized': False,
+            'delegations': [],
+            'team_size': len(team.members),
+            'budget': team.budget.to_dict(),
+            'duration': time.perf_counter() - start_time
         }
+    
+    def _parse_plan(self, content: str, message: str, team: Team) -> List[Dict[str, str]]:
+        """Read the planned subtasks; without a usable plan every member gets the whole request"""
+        
+        subtasks = {}
+        match = JSON_LIST_PATTERN.search(content or '')
+        
+        try:
+            plan = json.loads(match.group(0)) if match else []
+        except ValueError:
+            plan = []
+        
+        for item in plan if isinstance(plan, list) else []:
+            if not isinstance(item, dict):
+                continue
+            member = team.get_member(item.get('member') or item.get('agent') or '')
+            task = item.get('task')
+            if member is None or not task:
+                continue
+            # Several subtasks for one member are sent as one message
+            subtasks[member.id] = f"{subtasks[member.id]}\n\n{task}" if member.id in subtasks else str(task)
+        
+        if not subtasks:
+            subtasks = {member.id: message for member in team.members}
+        
+        return [
+            {'member': member.id, 'member_name': member.name, 'task': subtasks[member.id]}
+            for member in team.members if member.id in subtasks
+        ]
+    
+    @staticmethod
+    def _status(result: Dict[str, Any]) -> str:
+        if result.get('success'):
+            return 'completed'
+        if result.get('skipped'):
+            return 'skipped'
+        if result.get('timed_out'):
+            return 'timed_out'
+        return 'failed'
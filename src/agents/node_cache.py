@@ -0,0 +1,97 @@
+"""
+Node cache - Memoized workflow node results keyed by (agent config hash, input hash)
+"""
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+from src.utils.config_loader import ConfigLoader
+
+class NodeCache:
+    """LRU + TTL cache of successful workflow node results
+    
+    A node's input contains its upstream outputs, so after one agent changes
+    only that agent and the nodes downstream of it miss the cache on a re-run.
+    """
+    
+    _instance: Optional['NodeCache'] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'sets': 0}
+    
+    @classmethod
+    def get_instance(cls) -> 'NodeCache':
+        """Get the process-wide node cache configured from config.yaml"""
+        
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    settings = ConfigLoader.get('workflow.node_cache', {})
+                    cls._instance = cls(
+                        max_entries=settings.get('max_entries', 1000),
+                        ttl=settings.get('ttl', 3600)
+                    )
+        
+        return cls._instance
+    
+    @staticmethod
+    def make_key(config_hash: str, node_input: str) -> str:
+        """Build the cache key for an agent configuration and its input"""
+        input_hash = hashlib.sha256(node_input.encode('utf-8')).hexdigest()
+        return f"{config_hash}:{input_hash}"
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached node result, or None on a miss"""
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            
+            result, stored_at = entry
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return result
+    
+    def set(self, key: str, result: Dict[str, Any]):
+        """Store a node result"""
+        
+        with self._lock:
+            self._entries[key] = (result, time.time())
+            self._entries.move_to_end(key)
+            self._stats['sets'] += 1
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+    
+    def clear(self):
+        """Drop every cached node result"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit, miss and eviction counters"""
+        
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'size': len(self._entries),
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0
+            }
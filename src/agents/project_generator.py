@@ -1,7 +1,7 @@
 """
 Project generator - Generate project from prompts
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 import json
 
@@ -39,13 +39,25 @@ class ProjectGenerator:
             project['agents'] = self._generate_single_agent(name, description, tools)
         
         elif agent_type == "Multi-Agent Team":
-            project['agents'] = self._generate_multi_agent_team(name, description, complexity, tools)
+            project['agents'], project['connections'] = self._generate_multi_agent_team(name, description, complexity, tools)
         
         elif agent_type == "Hierarchical Team":
-            project['agents'] = self._generate_hierarchical_team(name, description, complexity, tools)
+            project['agents'], project['connections'] = self._generate_hierarchical_team(name, description, complexity, tools)
         
         return project
     
+    @staticmethod
+    def _delegation(manager_id: str, member_id: str) -> Dict[str, Any]:
+        """Connection that puts an agent on a manager's team"""
+        return {
+            'id': f"conn_{manager_id}_{member_id}",
+            'from': manager_id,
+            'to': member_id,
+            'type': 'delegation',
+            'condition': None,
+            'label': "Delegation Flow"
+        }
+    
     def _generate_single_agent(self, name: str, description: str, tools: List[str]) -> List[Dict[str, Any]]:
         """Generate a single agent configuration"""
         
@@ -64,10 +76,11 @@ class ProjectGenerator:
         
         return [agent]
     
-    def _generate_multi_agent_team(self, name: str, description: str, complexity: str, tools: List[str]) -> List[Dict[str, Any]]:
-        """Generate a multi-agent team configuration"""
+    def _generate_multi_agent_team(self, name: str, description: str, complexity: str, tools: List[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Generate a multi-agent team configuration: a coordinator delegating to specialists"""
         
         agents = []
+        connections = []
         
         # Coordinator agent
         agents.append({
@@ -108,13 +121,15 @@ class ProjectGenerator:
                 'vector_db': 'chromadb' if i == 0 else None,
                 'position': {'x': 200 + (i * 150), 'y': 300}
             })
+            connections.append(self._delegation('agent_coordinator', f'agent_specialist_{i}'))
         
-        return agents
+        return agents, connections
     
-    def _generate_hierarchical_team(self, name: str, description: str, complexity: str, tools: List[str]) -> List[Dict[str, Any]]:
-        """Generate a hierarchical team configuration"""
+    def _generate_hierarchical_team(self, name: str, description: str, complexity: str, tools: List[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Generate a hierarchical team configuration: manager -> team leads -> workers"""
         
         agents = []
+        connections = []
         
         # Top-level manager
         agents.append({
@@ -130,17 +145,17 @@ class ProjectGenerator:
             'position': {'x': 400, 'y': 50}
         })
         
-        # Team leads
+        # Team leads manage their own workers, so they are team managers too
         team_leads = [
-            {'name': 'Research Lead', 'type': 'researcher', 'prompt': 'You lead the research team.'},
-            {'name': 'Development Lead', 'type': 'coder', 'prompt': 'You lead the development team.'}
+            {'name': 'Research Lead', 'prompt': 'You lead the research team. You delegate research tasks to your workers.'},
+            {'name': 'Development Lead', 'prompt': 'You lead the development team. You delegate development tasks to your workers.'}
         ]
         
         for i, lead in enumerate(team_leads):
             agents.append({
                 'id': f'agent_lead_{i}',
                 'name': lead['name'],
-                'type': lead['type'],
+                'type': 'team_manager',
                 'system_prompt': lead['prompt'],
                 'llm_model': 'gpt-4',
                 'temperature': 0.6,
@@ -149,6 +164,7 @@ class ProjectGenerator:
                 'vector_db': 'chromadb' if i == 0 else None,
                 'position': {'x': 250 + (i * 300), 'y': 200}
             })
+            connections.append(self._delegation('agent_manager', f'agent_lead_{i}'))
             
             # Subordinates for each lead
             for j in range(2):
@@ -164,5 +180,6 @@ class ProjectGenerator:
                     'vector_db': None,
                     'position': {'x': 200 + (i * 300) + (j * 100), 'y': 350}
                 })
+                connections.append(self._delegation(f'agent_lead_{i}', f'agent_worker_{i}_{j}'))
         
-        return agents
+        return agents, connections
@@ -0,0 +1,78 @@
+"""
+Team - A delegating agent's direct reports and the budget its whole team shares
+"""
+from typing import Dict, Any, List, Optional, Awaitable, Callable
+from dataclasses import dataclass
+import time
+
+from src.utils.config_loader import ConfigLoader
+
+class TeamBudget:
+    """Token and wall-clock budget shared by every level of a team"""
+    
+    def __init__(self, max_tokens: Optional[int] = None, timeout: Optional[float] = None):
+        self.max_tokens = max_tokens if max_tokens is not None else ConfigLoader.get('team.max_tokens', 20000)
+        self.timeout = timeout if timeout is not None else ConfigLoader.get('team.timeout', 50)
+        self.deadline = time.monotonic() + self.timeout
+        self.tokens_used = 0
+    
+    def charge(self, tokens: int):
+        """Record tokens spent by a manager or a worker"""
+        self.tokens_used += tokens or 0
+    
+    @property
+    def remaining_tokens(self) -> int:
+        return max(0, self.max_tokens - self.tokens_used)
+    
+    @property
+    def remaining_time(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+    
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining_tokens <= 0 or self.remaining_time <= 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'max_tokens': self.max_tokens,
+            'tokens_used': self.tokens_used,
+            'timeout': self.timeout,
+            'elapsed': self.timeout - self.remaining_time,
+            'exhausted': self.exhausted
+        }
+
+@dataclass
+class TeamMember:
+    """An agent a manager can delegate to"""
+    id: str
+    name: str
+    role: str = ''
+
+# Runs one member on a subtask: (member_id, task, budget) -> executor result dict
+MemberRunner = Callable[[str, str, TeamBudget], Awaitable[Dict[str, Any]]]
+
+class Team:
+    """A manager's direct reports, how to run them and the budget they draw from"""
+    
+    def __init__(self, members: List[TeamMember], run_member: MemberRunner, budget: Optional[TeamBudget] = None, max_concurrency: Optional[int] = None):
+        self.members = members
+        self.run_member = run_member
+        self.budget = budget or TeamBudget()
+        self.max_concurrency = max_concurrency or ConfigLoader.get('team.max_concurrency', 5)
+    
+    def get_member(self, member_id: str) -> Optional[TeamMember]:
+        """Find a member by id or, failing that, by name"""
+        
+        for member in self.members:
+            if member.id == member_id:
+                return member
+        
+        for member in self.members:
+            if member.name.lower() == str(member_id).lower():
+                return member
+        
+        return None
+    
+    async def run(self, member_id: str, task: str) -> Dict[str, Any]:
+        """Run a member on a subtask within the team budget"""
+        return await self.run_member(member_id, task, self.budget)
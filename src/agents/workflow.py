@@ -0,0 +1,377 @@
+"""
+Workflow engine - Runs a project's agents and connections as a DAG
+"""
+from typing import Dict, Any, List, Optional, AsyncIterator, Awaitable, Callable, Tuple
+from dataclasses import dataclass, field
+import asyncio
+import re
+import time
+
+from src.utils.config_loader import ConfigLoader
+
+# Runs one agent: (agent_id, message) -> executor result dict
+AgentRunner = Callable[[str, str], Awaitable[Dict[str, Any]]]
+
+CONNECTION_TYPES = ['sequential', 'parallel', 'conditional', 'delegation']
+
+class WorkflowError(ValueError):
+    """Raised when agents and connections do not form a runnable DAG"""
+    pass
+
+@dataclass
+class WorkflowEdge:
+    """Connection between two agents"""
+    source: str
+    target: str
+    type: str = 'sequential'
+    condition: Optional[str] = None
+    follows: Optional[str] = None  # for a parallel target: taken whenever the edge to this node is
+
+@dataclass
+class WorkflowNode:
+    """One agent in the workflow and the edges that feed it"""
+    id: str
+    name: str
+    role: str = ''
+    inputs: List[WorkflowEdge] = field(default_factory=list)
+    outputs: List[WorkflowEdge] = field(default_factory=list)
+    
+    @property
+    def routes(self) -> List[WorkflowEdge]:
+        """Conditional edges without a condition: the agent's own answer picks one of them"""
+        return [edge for edge in self.outputs if edge.type == 'conditional' and not edge.condition and not edge.follows]
+
+class Workflow:
+    """A project's agents and connections compiled into a DAG
+    
+    - sequential: the target runs after the source, on the source's output
+    - parallel: the target runs alongside the source, on the same input
+    - conditional: like sequential, but only if the edge's condition matches the
+      source's output; without a condition the source picks one target by name
+    - delegation: the target is on the source manager's team and runs only when
+      the manager delegates to it, so it is not a node of the DAG itself
+    """
+    
+    def __init__(self, nodes: Dict[str, WorkflowNode], order: List[str], delegates: Optional[Dict[str, List[str]]] = None):
+        self.nodes = nodes
+        self.order = order
+        self.delegates = delegates or {}
+    
+    @classmethod
+    def compile(cls, project: Dict[str, Any]) -> 'Workflow':
+        """Build the DAG from project agents and connections"""
+        
+        delegates = cls.delegates_of(project)
+        members = {member for team in delegates.values() for member in team}
+        
+        nodes = {
+            agent['id']: WorkflowNode(id=agent['id'], name=agent.get('name', agent['id']), role=agent.get('role', ''))
+            for agent in project.get('agents', [])
+            if agent['id'] not in members
+        }
+        
+        edges = []
+        for connection in project.get('connections', []):
+            # Templates use from/to, the canvas also source/target
+            source = connection.get('from') or connection.get('source')
+            target = connection.get('to') or connection.get('target')
+            edge_type = connection.get('type') or 'sequential'
+            
+            if edge_type == 'delegation':
+                continue
+            if source in members or target in members:
+                raise WorkflowError(f"Connection {source} -> {target} references an agent that only runs as a delegate")
+            if source not in nodes or target not in nodes:
+                raise WorkflowError(f"Connection {source} -> {target} references an unknown agent")
+            if edge_type not in CONNECTION_TYPES:
+                raise WorkflowError(f"Unknown connection type: {edge_type}")
+            
+            edges.append(WorkflowEdge(source, target, edge_type, connection.get('condition')))
+        
+        # A parallel target shares its source's inputs instead of waiting for it
+        parallel_sources = {edge.target: edge.source for edge in edges if edge.type == 'parallel'}
+        for edge in edges:
+            if edge.type != 'parallel':
+                nodes[edge.source].outputs.append(edge)
+                nodes[edge.target].inputs.append(edge)
+        
+        for target in parallel_sources:
+            source, seen = parallel_sources[target], {target}
+            while source in parallel_sources and source not in seen:
+                seen.add(source)
+                source = parallel_sources[source]
+            
+            for edge in list(nodes[source].inputs):
+                shared = WorkflowEdge(edge.source, target, edge.type, edge.condition, follows=edge.target)
+                nodes[edge.source].outputs.append(shared)
+                nodes[target].inputs.append(shared)
+        
+        return cls(nodes, cls._topological_order(nodes), delegates)
+    
+    @staticmethod
+    def delegates_of(project: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Map each manager to the agents it delegates to; fails on unknown agents and cycles"""
+        
+        agent_ids = {agent['id'] for agent in project.get('agents', [])}
+        delegates: Dict[str, List[str]] = {}
+        
+        for connection in project.get('connections', []):
+            if connection.get('type') != 'delegation':
+                continue
+            
+            source = connection.get('from') or connection.get('source')
+            target = connection.get('to') or connection.get('target')
+            if source not in agent_ids or target not in agent_ids:
+                raise WorkflowError(f"Connection {source} -> {target} references an unknown agent")
+            
+            if target not in delegates.setdefault(source, []):
+                delegates[source].append(target)
+        
+        # A manager must never end up delegating to itself, however indirectly
+        def check(manager: str, path: Tuple[str, ...]):
+            for member in delegates.get(manager, []):
+                if member in path:
+                    raise WorkflowError(f"Delegations form a cycle through: {', '.join(path + (member,))}")
+                check(member, path + (member,))
+        
+        for manager in delegates:
+            check(manager, (manager,))
+        
+        return delegates
+    
+    @staticmethod
+    def _topological_order(nodes: Dict[str, WorkflowNode]) -> List[str]:
+        """Order nodes so every node comes after its inputs; fails on cycles"""
+        
+        in_degree = {node_id: len(node.inputs) for node_id, node in nodes.items()}
+        ready = [node_id for node_id, degree in in_degree.items() if degree == 0]
+        order = []
+        
+        while ready:
+            node_id = ready.pop(0)
+            order.append(node_id)
+            for edge in nodes[node_id].outputs:
+                in_degree[edge.target] -= 1
+                if in_degree[edge.target] == 0:
+                    ready.append(edge.target)
+        
+        if len(order) != len(nodes):
+            cycle = sorted(node_id for node_id, degree in in_degree.items() if degree > 0)
+            raise WorkflowError(f"Connections form a cycle through: {', '.join(cycle)}")
+        
+        return order
+
+class WorkflowEngine:
+    """Executes a workflow, running every node whose inputs are ready concurrently"""
+    
+    def __init__(self, workflow: Workflow, run_agent: AgentRunner, max_concurrency: Optional[int] = None, timeout: Optional[float] = None):
+        self.workflow = workflow
+        self.run_agent = run_agent
+        self.max_concurrency = max_concurrency or ConfigLoader.get('execution.max_concurrency', 5)
+        self.timeout = timeout or ConfigLoader.get('execution.agent_timeout', 60)
+    
+    async def run(self, message: str, restored: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Run the workflow to completion and return the final result"""
+        
+        result = None
+        async for event in self.stream(message, restored):
+            if event['type'] == 'done':
+                result = event['result']
+        
+        return result
+    
+    async def stream(self, message: str, restored: Optional[Dict[str, Dict[str, Any]]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Run the workflow, yielding node_started / node_completed / node_skipped events and a final done event
+        
+        restored holds checkpointed node states from an earlier attempt at the same run;
+        a completed node whose input is unchanged is reused (node_restored) instead of run.
+        """
+        
+        nodes = self.workflow.nodes
+        restored = restored or {}
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        start_time = time.perf_counter()
+        
+        states: Dict[str, Dict[str, Any]] = {node_id: {'status': 'pending'} for node_id in nodes}
+        taken: Dict[Tuple[str, str], bool] = {}
+        running: Dict[asyncio.Task, str] = {}
+        
+        async def execute(node_id: str, node_input: str) -> Dict[str, Any]:
+            async with semaphore:
+                states[node_id]['started_at'] = time.perf_counter() - start_time
+                try:
+                    return await asyncio.wait_for(self.run_agent(node_id, node_input), self.timeout)
+                except asyncio.TimeoutError:
+                    return {'success': False, 'error': f"Agent {node_id} timed out after {self.timeout}s", 'timed_out': True}
+                except Exception as e:
+                    return {'success': False, 'error': str(e)}
+        
+        try:
+            while True:
+                # Start or skip every node whose inputs have all resolved
+                for node_id in self.workflow.order:
+                    state = states[node_id]
+                    node = nodes[node_id]
+                    if state['status'] != 'pending':
+                        continue
+                    if any(states[edge.source]['status'] in ('pending', 'running') for edge in node.inputs):
+                        continue
+                    
+                    active = [edge for edge in node.inputs if taken.get((edge.source, edge.target))]
+                    if node.inputs and not active:
+                        state['status'] = 'skipped'
+                        yield {'type': 'node_skipped', 'node_id': node_id}
+                        continue
+                    
+                    node_input = self._node_input(message, node, active, states)
+                    checkpoint = restored.get(node_id)
+                    if checkpoint and checkpoint.get('status') == 'completed' and checkpoint.get('input') == node_input:
+                        state.update({
+                            'status': 'completed',
+                            'input': node_input,
+                            'output': checkpoint.get('output') or '',
+                            'duration': checkpoint.get('duration'),
+                            'result': {**checkpoint.get('result', {}), 'restored': True}
+                        })
+                        for edge in self._taken_edges(node, state['output']):
+                            taken[(edge.source, edge.target)] = True
+                        yield {'type': 'node_restored', 'node_id': node_id, 'agent_name': node.name, 'output': state['output']}
+                        continue
+                    
+                    state['status'] = 'running'
+                    state['input'] = node_input
+                    running[asyncio.ensure_future(execute(node_id, state['input']))] = node_id
+                    yield {'type': 'node_started', 'node_id': node_id, 'agent_name': node.name}
+                
+                if not running:
+                    break
+                
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                
+                for task in done:
+                    node_id = running.pop(task)
+                    result = task.result()
+                    state = states[node_id]
+                    state['finished_at'] = time.perf_counter() - start_time
+                    state['duration'] = state['finished_at'] - state['started_at']
+                    state['result'] = result
+                    state['status'] = 'completed' if result.get('success') else 'failed'
+                    
+                    if state['status'] == 'completed':
+                        state['output'] = result.get('response', '')
+                        for edge in self._taken_edges(nodes[node_id], state['output']):
+                            taken[(edge.source, edge.target)] = True
+                    
+                    yield {
+                        'type': 'node_completed',
+                        'node_id': node_id,
+                        'agent_name': nodes[node_id].name,
+                        'status': state['status'],
+                        'input': state['input'],
+                        'output': state.get('output'),
+                        'error': result.get('error'),
+                        'duration': state['duration'],
+                        'tokens': result.get('tokens_used', 0),
+                        'cached': result.get('cached', False)
+                    }
+        finally:
+            for task in running:
+                task.cancel()
+        
+        yield {'type': 'done', 'result': self._result(states, time.perf_counter() - start_time)}
+    
+    def _node_input(self, message: str, node: WorkflowNode, active: List[WorkflowEdge], states: Dict[str, Dict[str, Any]]) -> str:
+        """Build a node's message: the original request plus the outputs of its upstream agents"""
+        
+        parts = [message]
+        for edge in active:
+            source = self.workflow.nodes[edge.source]
+            parts.append(f"--- {source.name} ---\n{states[edge.source]['output']}")
+        
+        routes = node.routes
+        if routes:
+            options = "\n".join(
+                f"- {self.workflow.nodes[edge.target].name} ({edge.target})"
+                + (f": {self.workflow.nodes[edge.target].role}" if self.workflow.nodes[edge.target].role else '')
+                for edge in routes
+            )
+            parts.append(f"End your answer with the name of the team member who should handle this next:\n{options}")
+        
+        return "\n\n".join(parts)
+    
+    def _taken_edges(self, node: WorkflowNode, output: str) -> List[WorkflowEdge]:
+        """Select the outgoing edges the node's output activates"""
+        
+        primary = [edge for edge in node.outputs if not edge.follows]
+        taken = [edge for edge in primary if edge.type != 'conditional']
+        taken.extend(edge for edge in primary if edge.condition and self._matches(edge.condition, output))
+        
+        routes = node.routes
+        if routes:
+            # The target named last in the answer wins; with no name the first route is the default
+            text = output.lower()
+            
+            def mentioned_at(edge: WorkflowEdge) -> int:
+                target = self.workflow.nodes[edge.target]
+                return max(text.rfind(target.name.lower()), text.rfind(target.id.lower()))
+            
+            chosen = max(routes, key=mentioned_at)
+            taken.append(chosen if mentioned_at(chosen) >= 0 else routes[0])
+        
+        # Parallel targets go wherever the node they run alongside goes
+        targets = {edge.target for edge in taken}
+        taken.extend(edge for edge in node.outputs if edge.follows in targets)
+        
+        return taken
+    
+    @staticmethod
+    def _matches(condition: str, output: str) -> bool:
+        """Evaluate an edge condition: 're:<pattern>' searches a regex, any other text is a case-insensitive substring"""
+        
+        if condition.startswith('re:'):
+            return re.search(condition[3:], output, re.IGNORECASE) is not None
+        
+        return condition.lower() in output.lower()
+    
+    def _result(self, states: Dict[str, Dict[str, Any]], duration: float) -> Dict[str, Any]:
+        """Summarize the run: final output from the sink nodes, per-node status and timing"""
+        
+        nodes = self.workflow.nodes
+        completed = [node_id for node_id in self.workflow.order if states[node_id]['status'] == 'completed']
+        sinks = [
+            node_id for node_id in completed
+            if not any(states[edge.target]['status'] == 'completed' for edge in nodes[node_id].outputs)
+        ]
+        
+        if len(sinks) == 1:
+            output = states[sinks[0]]['output']
+        else:
+            output = "\n\n".join(f"--- {nodes[node_id].name} ---\n{states[node_id]['output']}" for node_id in sinks)
+        
+        node_results = {}
+        for node_id in self.workflow.order:
+            state = states[node_id]
+            result = state.get('result', {})
+            node_results[node_id] = {
+                'agent_name': nodes[node_id].name,
+                'status': state['status'],
+                'input': state.get('input'),
+                'output': state.get('output'),
+                'error': result.get('error'),
+                'started_at': state.get('started_at'),
+                'duration': state.get('duration'),
+                'tokens': result.get('tokens_used', 0),
+                'cached': result.get('cached', False),
+                'restored': result.get('restored', False)
+            }
+        
+        return {
+            'success': bool(completed) and not any(state['status'] == 'failed' for state in states.values()),
+            'output': output,
+            'final_nodes': sinks,
+            'nodes': node_results,
+            'duration': duration,
+            'total_tokens': sum(node['tokens'] or 0 for node in node_results.values() if not node['cached'] and not node['restored']),
+            'cached_nodes': [node_id for node_id, node in node_results.items() if node['cached']],
+            'restored_nodes': [node_id for node_id, node in node_results.items() if node['restored']]
+        }
@@ -0,0 +1,139 @@
+"""
+Batch execution - Run many inputs through one agent or workflow with bounded concurrency
+"""
+from typing import Dict, Any, List, Optional, Iterable, AsyncIterator, Awaitable, Callable
+import asyncio
+import json
+import time
+
+from src.utils.config_loader import ConfigLoader
+
+# Runs one input: (input_data, context) -> agent or workflow result dict
+ItemRunner = Callable[[str, Optional[Dict[str, Any]]], Awaitable[Dict[str, Any]]]
+
+class BatchError(ValueError):
+    """Raised when a batch payload cannot be read"""
+    pass
+
+def parse_items(items: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Normalize batch items: a plain string, or an object with input_data (or input), optional id and context"""
+    
+    parsed = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            item = {'input_data': item}
+        if not isinstance(item, dict):
+            raise BatchError(f"Item {index} must be a string or an object")
+        
+        input_data = item.get('input_data', item.get('input'))
+        if not isinstance(input_data, str):
+            raise BatchError(f"Item {index} has no input_data")
+        
+        parsed.append({
+            'id': str(item.get('id', index)),
+            'index': index,
+            'input_data': input_data,
+            'context': item.get('context')
+        })
+    
+    max_items = ConfigLoader.get('batch.max_items', 10000)
+    if len(parsed) > max_items:
+        raise BatchError(f"Batch has {len(parsed)} items; the limit is {max_items}")
+    
+    return parsed
+
+def parse_ndjson(content: bytes) -> List[Dict[str, Any]]:
+    """Read batch items from NDJSON, one item per line"""
+    
+    lines = [line for line in content.decode('utf-8').splitlines() if line.strip()]
+    try:
+        return parse_items(json.loads(line) for line in lines)
+    except json.JSONDecodeError as e:
+        raise BatchError(f"Invalid NDJSON: {e}")
+
+async def run_batch(
+    run_item: ItemRunner,
+    items: List[Dict[str, Any]],
+    max_concurrency: Optional[int] = None,
+    item_timeout: Optional[float] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Run every item, yielding 'result' events in completion order and a final 'summary' event"""
+    
+    max_concurrency = max(1, min(max_concurrency or ConfigLoader.get('batch.max_concurrency', 16), len(items) or 1))
+    item_timeout = item_timeout or ConfigLoader.get('batch.item_timeout', 120)
+    
+    pending = iter(items)
+    results: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    start_time = time.perf_counter()
+    
+    async def run_one(item: Dict[str, Any]) -> Dict[str, Any]:
+        item_start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(run_item(item['input_data'], item['context']), item_timeout)
+        except asyncio.TimeoutError:
+            result = {'success': False, 'error': f"Timed out after {item_timeout}s"}
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        
+        return {
+            'type': 'result',
+            'id': item['id'],
+            'index': item['index'],
+            'success': bool(result.get('success')),
+            'output': result.get('response', result.get('output')),
+            'error': result.get('error'),
+            'tokens': result.get('tokens_used', result.get('total_tokens')) or 0,
+            'latency': time.perf_counter() - item_start
+        }
+    
+    # A fixed set of workers pulls items, so thousands of inputs never become thousands of tasks
+    async def worker():
+        for item in pending:
+            await results.put(await run_one(item))
+    
+    workers = [asyncio.ensure_future(worker()) for _ in range(max_concurrency)]
+    latencies = []
+    succeeded = tokens = 0
+    
+    try:
+        for _ in range(len(items)):
+            event = await results.get()
+            latencies.append(event['latency'])
+            succeeded += event['success']
+            tokens += event['tokens']
+            yield event
+    finally:
+        for task in workers:
+            task.cancel()
+    
+    duration = time.perf_counter() - start_time
+    yield {
+        'type': 'summary',
+        'total': len(items),
+        'succeeded': succeeded,
+        'failed': len(items) - succeeded,
+        'total_tokens': tokens,
+        'duration': duration,
+        'throughput': len(items) / duration if duration else 0.0,
+        'latency': latency_stats(latencies),
+        'max_concurrency': max_concurrency
+    }
+
+def latency_stats(latencies: List[float]) -> Dict[str, Optional[float]]:
+    """Mean and percentile latencies in seconds"""
+    
+    if not latencies:
+        return {'mean': None, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+    
+    ordered = sorted(latencies)
+    
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+    
+    return {
+        'mean': sum(ordered) / len(ordered),
+        'p50': percentile(0.50),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'max': ordered[-1]
+    }
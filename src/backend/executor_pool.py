@@ -0,0 +1,114 @@
+"""
+Executor pool - Warm agent executors shared across API requests
+"""
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+from src.utils.config_loader import ConfigLoader
+from src.agents.agent_executor import AgentExecutor
+from src.agents.agent_types import AgentType
+
+class ExecutorPool:
+    """LRU of executors keyed by a content hash of the project they run
+    
+    Requests carrying the same project or agent configuration reuse one executor, so its
+    agents, workflow and context managers are built once. Executors only hold lazily
+    built, request-independent state, so concurrent requests can share them.
+    """
+    
+    _instance: Optional['ExecutorPool'] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._executors: "OrderedDict[str, AgentExecutor]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+    
+    @classmethod
+    def get_instance(cls) -> 'ExecutorPool':
+        """Get the process-wide pool configured from config.yaml"""
+        
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(max_size=ConfigLoader.get('execution.executor_pool_size', 128))
+        
+        return cls._instance
+    
+    @staticmethod
+    def make_key(project: Dict[str, Any]) -> str:
+        """Content hash of what an executor runs: the project's agents and connections"""
+        runnable = {key: project.get(key) for key in ('id', 'agents', 'connections')}
+        payload = json.dumps(runnable, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, project: Dict[str, Any]) -> AgentExecutor:
+        """Get the executor for a project, building it on first use"""
+        
+        key = self.make_key(project)
+        
+        with self._lock:
+            executor = self._executors.get(key)
+            if executor is not None:
+                self._executors.move_to_end(key)
+                self._stats['hits'] += 1
+                return executor
+            
+            self._stats['misses'] += 1
+        
+        # Built outside the lock; if two requests race, the first one stored wins
+        executor = AgentExecutor(project)
+        
+        with self._lock:
+            executor = self._executors.setdefault(key, executor)
+            self._executors.move_to_end(key)
+            
+            while len(self._executors) > self.max_size:
+                self._executors.popitem(last=False)
+                self._stats['evictions'] += 1
+        
+        return executor
+    
+    def resolve(
+        self,
+        project: Optional[Dict[str, Any]] = None,
+        agent_config: Optional[Dict[str, Any]] = None,
+        agent_id: Optional[str] = None
+    ) -> Tuple[AgentExecutor, Optional[str]]:
+        """Get the executor for a project or a single agent config, and the agent to run
+        
+        The agent is None when a project's whole workflow should run.
+        """
+        if project is not None:
+            executor = self.get(project)
+        elif agent_config is not None:
+            agent_data = {"id": "agent", "name": "Agent", "type": AgentType.ASSISTANT.value, **agent_config}
+            executor = self.get({"agents": [agent_data]})
+            agent_id = agent_data["id"]
+        else:
+            raise ValueError("Request needs an agent_config or a project")
+        
+        if agent_id is not None and executor.get_agent(agent_id) is None:
+            raise ValueError(f"Invalid agent configuration for {agent_id}")
+        
+        return executor, agent_id
+    
+    def clear(self):
+        """Drop every pooled executor"""
+        with self._lock:
+            self._executors.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit, miss and eviction counters"""
+        
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'size': len(self._executors),
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0
+            }
@@ -0,0 +1,169 @@
+"""
+Health monitor - Concurrent, cached dependency probes for the backend health endpoints
+"""
+from typing import Dict, Any, Optional, Callable, Awaitable
+import asyncio
+import time
+
+import httpx
+
+# Optional imports for production mode
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+from src.utils.config_loader import ConfigLoader
+
+HEALTHY = "healthy"
+UNAVAILABLE = "unavailable"
+
+class HealthMonitor:
+    """Probes ChromaDB, Redis and Ollama concurrently and serves the last results from memory
+    
+    A background task refreshes the snapshot every refresh_interval seconds, so a health
+    request only reads a dict. Each probe has a hard timeout, so one dependency that hangs
+    cannot hold back the others or the snapshot.
+    """
+    
+    _instance: Optional['HealthMonitor'] = None
+    
+    def __init__(self, timeout: float = 1.0, ttl: float = 10.0, refresh_interval: float = 10.0):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self._services: Dict[str, Dict[str, Any]] = {}
+        self._checked_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._probes: Dict[str, Callable[[], Awaitable[str]]] = {
+            'chromadb': self._probe_chromadb,
+            'redis': self._probe_redis,
+            'ollama': self._probe_ollama
+        }
+    
+    @classmethod
+    def get_instance(cls) -> 'HealthMonitor':
+        """Get the monitor configured from config.yaml; it is only used from the API's event loop"""
+        
+        if cls._instance is None:
+            settings = ConfigLoader.get('health', {})
+            cls._instance = cls(
+                timeout=settings.get('timeout', 1.0),
+                ttl=settings.get('ttl', 10.0),
+                refresh_interval=settings.get('refresh_interval', 10.0)
+            )
+        
+        return cls._instance
+    
+    def start(self):
+        """Start refreshing in the background"""
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.ensure_future(self._refresh_loop())
+    
+    async def stop(self):
+        """Stop refreshing and close the probe client"""
+        
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            self._loop_task = None
+        
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def get_services(self) -> Dict[str, str]:
+        """Get the status of every dependency, probing only when there is no snapshot yet"""
+        
+        if not self._services:
+            await self.refresh()
+        elif time.monotonic() - self._checked_at > self.ttl:
+            # Serve the stale snapshot now; the refresh lands for the next caller
+            self._schedule_refresh()
+        
+        return {name: service['status'] for name, service in self._services.items()}
+    
+    def get_details(self) -> Dict[str, Any]:
+        """Get the last snapshot with probe latencies and errors"""
+        return {
+            'checked_at': time.time() - (time.monotonic() - self._checked_at) if self._checked_at else None,
+            'services': dict(self._services)
+        }
+    
+    async def refresh(self):
+        """Run every probe concurrently; concurrent callers share one refresh"""
+        self._schedule_refresh()
+        await asyncio.shield(self._refreshing)
+    
+    def _schedule_refresh(self):
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._run_probes())
+    
+    async def _run_probes(self):
+        names = list(self._probes)
+        results = await asyncio.gather(*(self._probe(name) for name in names))
+        self._services = dict(zip(names, results))
+        self._checked_at = time.monotonic()
+    
+    async def _probe(self, name: str) -> Dict[str, Any]:
+        """Run one probe under the hard timeout"""
+        
+        start_time = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(self._probes[name](), self.timeout)
+            error = None
+        except asyncio.TimeoutError:
+            status, error = UNAVAILABLE, f"timed out after {self.timeout}s"
+        except Exception as e:
+            status, error = UNAVAILABLE, str(e) or type(e).__name__
+        
+        return {'status': status, 'latency': time.perf_counter() - start_time, 'error': error}
+    
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Error refreshing health probes: {e}")
+            await asyncio.sleep(self.refresh_interval)
+    
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+    
+    async def _probe_chromadb(self) -> str:
+        """Check the ChromaDB heartbeat (v2 API, falling back to v1)"""
+        
+        base_url = f"http://{ConfigLoader.get_env('CHROMADB_HOST', 'localhost')}:{ConfigLoader.get_env('CHROMADB_PORT', '8000')}"
+        response = await self._http().get(f"{base_url}/api/v2/heartbeat")
+        if response.status_code == 404:
+            response = await self._http().get(f"{base_url}/api/v1/heartbeat")
+        
+        return HEALTHY if response.status_code == 200 else UNAVAILABLE
+    
+    async def _probe_redis(self) -> str:
+        """Check Redis with PING"""
+        
+        if aioredis is None:
+            return UNAVAILABLE
+        
+        client = aioredis.Redis(
+            host=ConfigLoader.get_env('REDIS_HOST', 'localhost'),
+            port=int(ConfigLoader.get_env('REDIS_PORT', '6379')),
+            socket_connect_timeout=self.timeout,
+            socket_timeout=self.timeout
+        )
+        try:
+            return HEALTHY if await client.ping() else UNAVAILABLE
+        finally:
+            await client.aclose()
+    
+    async def _probe_ollama(self) -> str:
+        """Check that Ollama answers its model list"""
+        
+        host = ConfigLoader.get_env('OLLAMA_HOST') or ConfigLoader.get('llm_providers.ollama.host', 'http://localhost:11434')
+        response = await self._http().get(f"{host.rstrip('/')}/api/tags")
+        
+        return HEALTHY if response.status_code == 200 else UNAVAILABLE
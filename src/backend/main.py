@@ -3,19 +3,29 @@ Backend API for AI Agent Canvas
 Provides REST endpoints for agent execution, project management, and integrations
 """
 
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import json
 import os
 import sys
 from pathlib import Path
 
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+# Add project root to path so the backend shares module state with the agents package
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from agents.agent_executor import AgentExecutor
-from agents.agent_types import AgentConfig, AgentType
+from src.agents.agent_executor import AgentExecutor
+from src.llm.client_pool import ClientPool
+from src.llm.model_catalog import ModelCatalog
+from src.backend.executor_pool import ExecutorPool
+from src.backend.batch import BatchError, parse_items, parse_ndjson, run_batch
+from src.backend.health import HealthMonitor, HEALTHY
+from src.jobs.queue import FINISHED_STATUSES, get_job_queue
+from src.jobs.worker import start_embedded_worker, stop_embedded_worker, get_embedded_worker
+from src.utils.config_loader import ConfigLoader
 
 app = FastAPI(
     title="AI Agent Canvas API",
@@ -33,11 +43,19 @@ app.add_middleware(
 )
 
 # Models
-class AgentExecutionRequest(BaseModel):
-    agent_config: Dict[str, Any]
+class ExecutionTarget(BaseModel):
+    agent_config: Optional[Dict[str, Any]] = None  # a single agent
+    project: Optional[Dict[str, Any]] = None  # or a whole project: runs agent_id, or the workflow without one
+    agent_id: Optional[str] = None
+
+class AgentExecutionRequest(ExecutionTarget):
     input_data: str
     context: Optional[Dict[str, Any]] = None
 
+class BatchExecutionRequest(ExecutionTarget):
+    items: List[Any] = []  # strings, or {"id", "input_data", "context"} objects
+    max_concurrency: Optional[int] = None
+
 class AgentExecutionResponse(BaseModel):
     success: bool
     output: str
@@ -49,43 +67,73 @@ class ProjectRequest(BaseModel):
     description: str
     agent_configs: List[Dict[str, Any]]
 
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    attempts: int = 0
+    worker: Optional[str] = None
+    created_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
 class HealthResponse(BaseModel):
     status: str
     services: Dict[str, str]
 
+# Lifecycle
+@app.on_event("startup")
+async def startup():
+    """Warm up pooled LLM clients and start the background health probes and job worker"""
+    ClientPool.warm_up()
+    HealthMonitor.get_instance().start()
+    ModelCatalog.get_instance().get_models()  # starts model discovery in the background
+    start_embedded_worker()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close pooled LLM clients and stop the health probes and job worker"""
+    await stop_embedded_worker()
+    await HealthMonitor.get_instance().stop()
+    await ClientPool.aclose()
+    ClientPool.close()
+
 # Endpoints
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
-    services = {
-        "api": "healthy",
-        "chromadb": check_chromadb(),
-        "redis": check_redis(),
-        "ollama": check_ollama()
-    }
+    """Health check endpoint, served from the background probe snapshot"""
+    services = {"api": "healthy", **await HealthMonitor.get_instance().get_services()}
     return HealthResponse(status="healthy", services=services)
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the API is serving requests"""
+    return {"status": "healthy"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: every dependency listed in health.required is healthy"""
+    services = await HealthMonitor.get_instance().get_services()
+    required = ConfigLoader.get('health.required', []) or []
+    down = [name for name in required if services.get(name) != HEALTHY]
+    
+    return JSONResponse(
+        status_code=503 if down else 200,
+        content={"status": "unavailable" if down else "healthy", "services": services, "unavailable": down}
+    )
+
+@app.get("/health/details")
+async def health_details():
+    """Last probe results with latencies and errors"""
+    return HealthMonitor.get_instance().get_details()
+
 @app.post("/api/v1/agent/execute", response_model=AgentExecutionResponse)
 async def execute_agent(request: AgentExecutionRequest):
-    """Execute an agent with given configuration and input"""
+    """Execute an agent, or a project's whole workflow, with a pooled executor"""
     try:
-        # Create agent config
-        agent_config = AgentConfig(**request.agent_config)
-        
-        # Initialize executor
-        executor = AgentExecutor(agent_config)
-        
-        # Execute agent
-        result = await executor.execute_async(
-            input_data=request.input_data,
-            context=request.context or {}
-        )
-        
-        return AgentExecutionResponse(
-            success=True,
-            output=result.get("output", ""),
-            metadata=result.get("metadata", {})
-        )
+        executor, agent_id = build_executor(request)
+        result = await run_request(executor, agent_id, request.input_data, request.context)
+        return execution_response(result)
     except Exception as e:
         return AgentExecutionResponse(
             success=False,
@@ -94,24 +142,147 @@ async def execute_agent(request: AgentExecutionRequest):
         )
 
 @app.post("/api/v1/agent/execute/stream")
-async def execute_agent_stream(request: AgentExecutionRequest):
-    """Execute an agent with streaming response"""
-    from fastapi.responses import StreamingResponse
+async def execute_agent_stream(request: AgentExecutionRequest, http_request: Request, format: str = "sse"):
+    """Execute an agent with streaming response (SSE by default, NDJSON with format=ndjson)"""
+    use_ndjson = format == "ndjson" or "application/x-ndjson" in http_request.headers.get("accept", "")
     
     async def generate():
         try:
-            agent_config = AgentConfig(**request.agent_config)
-            executor = AgentExecutor(agent_config)
-            
-            async for chunk in executor.execute_stream(
-                input_data=request.input_data,
-                context=request.context or {}
-            ):
-                yield f"data: {chunk}\n\n"
+            executor, agent_id = build_executor(request)
         except Exception as e:
-            yield f"data: {{\"error\": \"{str(e)}\"}}\n\n"
+            yield encode_stream_event({"type": "error", "error": str(e)}, use_ndjson)
+            return
+        
+        # Frames are produced only as fast as the client reads them, so a slow
+        # client slows the upstream read instead of buffering tokens in memory
+        if agent_id is None:
+            events = executor.stream_workflow(request.input_data)
+        else:
+            events = executor.execute_stream(agent_id, request.input_data, request.context or {})
+        try:
+            async for event in events:
+                if await http_request.is_disconnected():
+                    break
+                yield encode_stream_event(event, use_ndjson)
+        finally:
+            # Closing the generator cancels the provider stream and frees its connection
+            await events.aclose()
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson" if use_ndjson else "text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/v1/agent/execute/batch")
+async def execute_agent_batch(http_request: Request):
+    """Run many inputs through one agent or workflow, streaming NDJSON results in completion order
+    
+    Send JSON (BatchExecutionRequest), or multipart form data with an NDJSON `file` of
+    items and a JSON `config` field with the rest. The last line is a summary with
+    aggregate token and latency stats.
+    """
+    try:
+        request, items = await read_batch_request(http_request)
+        executor, agent_id = build_executor(request)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def run_item(input_data: str, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return await run_request(executor, agent_id, input_data, context)
     
-    return StreamingResponse(generate(), media_type="text/event-stream")
+    async def generate():
+        events = run_batch(run_item, items, request.max_concurrency)
+        try:
+            async for event in events:
+                if await http_request.is_disconnected():
+                    break
+                yield encode_stream_event(event, True)
+        finally:
+            # Stops the workers, so a dropped client does not keep the batch running
+            await events.aclose()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/v1/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(request: AgentExecutionRequest):
+    """Queue a long-running agent or workflow execution for the background workers"""
+    try:
+        build_executor(request)  # rejects invalid targets now rather than in the worker
+        job_id = await asyncio.to_thread(get_job_queue().enqueue, request.model_dump())
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return JobResponse(job_id=job_id, status="queued")
+
+@app.get("/api/v1/jobs/stats")
+async def job_stats():
+    """Job counts by status, and the API process's embedded worker"""
+    stats = await asyncio.to_thread(get_job_queue().get_stats)
+    worker = get_embedded_worker()
+    return {"queue": stats, "embedded_worker": worker.get_stats() if worker else None}
+
+@app.get("/api/v1/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Get a job's status"""
+    return job_response(await find_job(job_id))
+
+@app.get("/api/v1/jobs/{job_id}/result", response_model=AgentExecutionResponse)
+async def get_job_result(job_id: str):
+    """Get a finished job's result; 409 while it is queued or running"""
+    job = await find_job(job_id)
+    if job["status"] not in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']}")
+    
+    return execution_response(job["result"] or {"success": False, "error": job["error"] or f"Job {job['status']}"})
+
+@app.get("/api/v1/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, http_request: Request):
+    """Stream a job's progress as SSE, replaying earlier events first
+    
+    Reconnecting clients send Last-Event-ID to resume after the last event they saw.
+    The stream ends with a job_status event once the job has finished.
+    """
+    job_queue = get_job_queue()
+    await find_job(job_id)
+    poll_interval = ConfigLoader.get('jobs.poll_interval', 0.5)
+    last_seq = int(http_request.headers.get("last-event-id") or 0)
+    
+    async def generate():
+        nonlocal last_seq
+        while True:
+            job = await asyncio.to_thread(job_queue.get, job_id)
+            # Read after the status, so events recorded just before the job finished are not missed
+            for event in await asyncio.to_thread(job_queue.events, job_id, last_seq):
+                last_seq = event["seq"]
+                yield encode_stream_event(event, False, event_id=last_seq)
+            
+            if job is None:
+                yield encode_stream_event({"type": "error", "error": f"Job {job_id} expired"}, False)
+                return
+            if job["status"] in FINISHED_STATUSES:
+                yield encode_stream_event({"type": "job_status", **job_response(job).model_dump()}, False)
+                return
+            if await http_request.is_disconnected():
+                return
+            await asyncio.sleep(poll_interval)
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.delete("/api/v1/jobs/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Cancel a job that has not started; 409 once a worker has claimed it"""
+    job_queue = get_job_queue()
+    await find_job(job_id)
+    if not await asyncio.to_thread(job_queue.cancel, job_id):
+        job = await find_job(job_id)
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']}")
+    
+    return job_response(await find_job(job_id))
 
 @app.post("/api/v1/project/create")
 async def create_project(request: ProjectRequest):
@@ -137,14 +308,40 @@ async def create_project(request: ProjectRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/v1/models/available")
-async def get_available_models():
-    """Get list of available LLM models"""
-    models = {
-        "openai": ["gpt-4", "gpt-4-turbo", "gpt-3.5-turbo"],
-        "azure_openai": ["gpt-4", "gpt-35-turbo"],
-        "ollama": await get_ollama_models(),
+async def get_available_models(provider: Optional[str] = None):
+    """Get available LLM models per provider, with context limits; never waits on a model host"""
+    catalog = ModelCatalog.get_instance()
+    return {
+        "models": catalog.get_models_by_provider(),
+        "catalog": catalog.get_models(provider),
+        "stale": catalog.is_stale()
+    }
+
+@app.get("/api/v1/cache/stats")
+async def get_cache_stats():
+    """Get LLM response cache counters"""
+    return {
+        "response_cache": AgentExecutor.get_cache_stats(),
+        "semantic_cache": AgentExecutor.get_semantic_cache_stats(),
+        "coalescing": AgentExecutor.get_coalescing_stats(),
+        "node_cache": AgentExecutor.get_node_cache_stats(),
+        "executor_pool": ExecutorPool.get_instance().get_stats()
     }
-    return {"models": models}
+
+@app.get("/api/v1/llm/rate-limits")
+async def get_rate_limits():
+    """Get RPM/TPM quota utilization per LLM deployment"""
+    return {"deployments": AgentExecutor.get_rate_limit_stats()}
+
+@app.get("/api/v1/llm/circuit-breakers")
+async def get_circuit_breakers():
+    """Get retry metrics and circuit breaker state per LLM deployment"""
+    return {"deployments": AgentExecutor.get_resilience_stats()}
+
+@app.get("/api/v1/llm/routing")
+async def get_routing():
+    """Get the routing policy and live latency/error rates per LLM deployment"""
+    return AgentExecutor.get_routing_stats()
 
 @app.get("/api/v1/vectordb/collections")
 async def get_vectordb_collections():
@@ -163,57 +360,68 @@ async def get_vectordb_collections():
         return {"collections": [], "error": str(e)}
 
 # Helper functions
-def check_chromadb() -> str:
-    """Check ChromaDB connection"""
-    try:
-        import chromadb
-        client = chromadb.HttpClient(
-            host=os.getenv("CHROMADB_HOST", "localhost"),
-            port=int(os.getenv("CHROMADB_PORT", "8000"))
-        )
-        client.heartbeat()
-        return "healthy"
-    except:
-        return "unavailable"
+def build_executor(request: ExecutionTarget) -> Tuple[AgentExecutor, Optional[str]]:
+    """Get a pooled executor for a request's project or single agent config
+    
+    Returns the agent to run, or None to run the project's whole workflow.
+    """
+    return ExecutorPool.get_instance().resolve(request.project, request.agent_config, request.agent_id)
 
-def check_redis() -> str:
-    """Check Redis connection"""
-    try:
-        import redis
-        r = redis.Redis(
-            host=os.getenv("REDIS_HOST", "localhost"),
-            port=int(os.getenv("REDIS_PORT", "6379"))
-        )
-        r.ping()
-        return "healthy"
-    except:
-        return "unavailable"
+async def run_request(executor: AgentExecutor, agent_id: Optional[str], input_data: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Run one agent, or the whole workflow when no agent is given"""
+    if agent_id is None:
+        return await executor.run_workflow_async(input_data)
+    return await executor.run_agent_async(agent_id, input_data, context or {})
 
-def check_ollama() -> str:
-    """Check Ollama connection"""
-    try:
-        import requests
-        response = requests.get(
-            f"{os.getenv('OLLAMA_HOST', 'http://localhost:11434')}/api/tags",
-            timeout=2
-        )
-        return "healthy" if response.status_code == 200 else "unavailable"
-    except:
-        return "unavailable"
+def execution_response(result: Dict[str, Any]) -> AgentExecutionResponse:
+    """Map an agent or workflow result to the API response"""
+    output = result.get("response", result.get("output")) or ""
+    metadata = {key: value for key, value in result.items() if key not in ("success", "response", "output", "error")}
+    
+    return AgentExecutionResponse(
+        success=bool(result.get("success")),
+        output=output,
+        metadata=metadata,
+        error=result.get("error")
+    )
 
-async def get_ollama_models() -> List[str]:
-    """Get available Ollama models"""
-    try:
-        import requests
-        response = requests.get(
-            f"{os.getenv('OLLAMA_HOST', 'http://localhost:11434')}/api/tags"
-        )
-        if response.status_code == 200:
-            models = response.json().get("models", [])
-            return [model["name"] for model in models]
-    except:
-        pass
-    return []
+async def read_batch_request(http_request: Request) -> Tuple[BatchExecutionRequest, List[Dict[str, Any]]]:
+    """Read a batch from a JSON body or from a multipart NDJSON upload"""
+    if http_request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await http_request.form()
+        upload = form.get("file")
+        if upload is None:
+            raise BatchError("Multipart batch needs an NDJSON 'file'")
+        request = BatchExecutionRequest(**json.loads(form.get("config") or "{}"))
+        return request, parse_ndjson(await upload.read())
+    
+    request = BatchExecutionRequest(**await http_request.json())
+    return request, parse_items(request.items)
+
+async def find_job(job_id: str) -> Dict[str, Any]:
+    """Get a job from the queue, or raise 404"""
+    job = await asyncio.to_thread(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+def job_response(job: Dict[str, Any]) -> JobResponse:
+    """Map a queued job to its status response"""
+    return JobResponse(
+        job_id=job["id"],
+        **{key: job.get(key) for key in ("status", "worker", "created_at", "started_at", "finished_at", "error")},
+        attempts=job.get("attempts") or 0
+    )
+
+def encode_stream_event(event: Dict[str, Any], use_ndjson: bool, event_id: Optional[int] = None) -> str:
+    """Encode a stream event as an NDJSON line or an SSE frame"""
+    payload = json.dumps(event, default=str)
+    
+    if use_ndjson:
+        return f"{payload}\n"
+    
+    frame_id = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{frame_id}event: {event.get('type', 'message')}\ndata: {payload}\n\n"
 
 if __name__ == "__main__":
     import uvicorn
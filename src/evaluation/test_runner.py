@@ -5,6 +5,8 @@ from typing import Dict, Any, List
 from datetime import datetime
 import re
 
+from src.llm.token_counter import TokenCounter
+
 class TestRunner:
     """Run tests against agents"""
     
@@ -31,12 +33,25 @@ class TestRunner:
             
             # Execute conversation
             responses = []
+            token_usage = {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
             
             for turn in test_case['conversation']:
                 if turn['role'] == 'user':
                     # Simulate agent response
                     response = self._simulate_agent_response(agent, turn['content'])
                     responses.append(response)
+                    
+                    # Count tokens the same way the executor does
+                    usage = TokenCounter.usage(
+                        agent.get('llm_model', 'gpt-4'),
+                        [
+                            {"role": "system", "content": agent.get('system_prompt', '')},
+                            {"role": "user", "content": turn['content']}
+                        ],
+                        response
+                    )
+                    for key in token_usage:
+                        token_usage[key] += usage[key]
             
             # Run assertions
             assertion_results = []
@@ -52,6 +67,7 @@ class TestRunner:
                 'passed': passed,
                 'assertion_results': assertion_results,
                 'responses': responses,
+                'token_usage': token_usage,
                 'timestamp': datetime.now().isoformat()
             }
         
@@ -113,6 +129,7 @@ class TestRunner:
             'passed': passed_count,
             'failed': failed_count,
             'pass_rate': (passed_count / len(results) * 100) if results else 0,
+            'total_tokens': sum(r.get('token_usage', {}).get('total_tokens', 0) for r in results),
             'results': results,
             'timestamp': datetime.now().isoformat()
         }
@@ -0,0 +1,436 @@
+"""
+Job queue - Durable queue of agent and workflow runs shared by the API and worker processes
+"""
+from typing import Dict, Any, List, Optional
+from pathlib import Path
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+# Optional imports for production mode
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from src.utils.config_loader import ConfigLoader
+
+JOB_STATUSES = ['queued', 'running', 'succeeded', 'failed', 'cancelled']
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+class JobQueue:
+    """Base class for job queue backends
+    
+    A job moves queued -> running -> succeeded / failed. Workers claim jobs, report
+    progress events and heartbeat while running; a running job whose heartbeat is older
+    than visibility_timeout (its worker died) goes back to the queue.
+    """
+    
+    def __init__(self, visibility_timeout: float = 300, result_ttl: float = 86400):
+        self.visibility_timeout = visibility_timeout
+        self.result_ttl = result_ttl
+    
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        """Add a job and return its id"""
+        raise NotImplementedError("Subclasses must implement enqueue method")
+    
+    def claim(self, worker_id: str, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        """Take the next queued job, waiting up to timeout seconds"""
+        raise NotImplementedError("Subclasses must implement claim method")
+    
+    def add_event(self, job_id: str, event: Dict[str, Any]):
+        """Record a progress event; also counts as a heartbeat"""
+        raise NotImplementedError("Subclasses must implement add_event method")
+    
+    def heartbeat(self, job_id: str):
+        """Mark a running job as still alive"""
+        raise NotImplementedError("Subclasses must implement heartbeat method")
+    
+    def finish(self, job_id: str, worker_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> bool:
+        """Record a job's outcome; False if worker_id no longer owns the job (it was requeued)"""
+        raise NotImplementedError("Subclasses must implement finish method")
+    
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet"""
+        raise NotImplementedError("Subclasses must implement cancel method")
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's status, timestamps and result"""
+        raise NotImplementedError("Subclasses must implement get method")
+    
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """Get a job's progress events with a sequence number greater than after"""
+        raise NotImplementedError("Subclasses must implement events method")
+    
+    def requeue_stale(self) -> int:
+        """Put running jobs of dead workers back on the queue and drop expired results"""
+        raise NotImplementedError("Subclasses must implement requeue_stale method")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get job counts by status"""
+        raise NotImplementedError("Subclasses must implement get_stats method")
+    
+    @staticmethod
+    def new_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'payload': payload,
+            'result': None,
+            'error': None,
+            'worker': None,
+            'attempts': 0,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'heartbeat_at': None
+        }
+
+class SQLiteJobQueue(JobQueue):
+    """Job queue in a local SQLite file; worker processes on the same host share it"""
+    
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._lock = threading.Lock()
+        
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, "
+            "result TEXT, error TEXT, worker TEXT, attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+            "started_at REAL, finished_at REAL, heartbeat_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_events (job_id TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL, "
+            "PRIMARY KEY (job_id, seq))"
+        )
+    
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        job = self.new_job(payload)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, status, payload, created_at) VALUES (?, 'queued', ?, ?)",
+                (job['id'], json.dumps(payload), job['created_at'])
+            )
+        return job['id']
+    
+    def claim(self, worker_id: str, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        
+        while True:
+            with self._lock:
+                # IMMEDIATE takes the write lock up front, so two workers never claim one job
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._db.execute(
+                        "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                    ).fetchone()
+                    if row is not None:
+                        now = time.time()
+                        self._db.execute(
+                            "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                            "started_at = ?, heartbeat_at = ? WHERE id = ?",
+                            (worker_id, now, now, row[0])
+                        )
+                    self._db.execute("COMMIT")
+                except Exception:
+                    self._db.execute("ROLLBACK")
+                    raise
+            
+            if row is not None:
+                return self.get(row[0])
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(min(0.2, max(0.0, deadline - time.monotonic())))
+    
+    def add_event(self, job_id: str, event: Dict[str, Any]):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                seq = self._db.execute(
+                    "SELECT COALESCE(MAX(seq), 0) + 1 FROM job_events WHERE job_id = ?", (job_id,)
+                ).fetchone()[0]
+                self._db.execute(
+                    "INSERT INTO job_events (job_id, seq, event) VALUES (?, ?, ?)",
+                    (job_id, seq, json.dumps(event, default=str))
+                )
+                self._db.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+    
+    def heartbeat(self, job_id: str):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+    
+    def finish(self, job_id: str, worker_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ? AND status = 'running' AND worker = ?",
+                (status, json.dumps(result, default=str) if result is not None else None, error, time.time(), job_id, worker_id)
+            )
+        return cursor.rowcount > 0
+    
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+        return cursor.rowcount > 0
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, payload, result, error, worker, attempts, created_at, started_at, finished_at, heartbeat_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        keys = ('id', 'status', 'payload', 'result', 'error', 'worker', 'attempts', 'created_at', 'started_at', 'finished_at', 'heartbeat_at')
+        job = dict(zip(keys, row))
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+    
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+            ).fetchall()
+        return [{'seq': seq, **json.loads(event)} for seq, event in rows]
+    
+    def requeue_stale(self) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                (now - self.visibility_timeout,)
+            )
+            expired = [row[0] for row in self._db.execute(
+                "SELECT id FROM jobs WHERE status IN ('succeeded', 'failed', 'cancelled') AND finished_at < ?",
+                (now - self.result_ttl,)
+            ).fetchall()]
+            for job_id in expired:
+                self._db.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return cursor.rowcount
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {'backend': 'sqlite', **{status: 0 for status in JOB_STATUSES}, **dict(rows)}
+
+# Pops queued ids until one is still queued, and marks it running in the same step.
+# KEYS: queue, processing; ARGV: job key prefix, worker id, now
+CLAIM_SCRIPT = """
+local job_id = redis.call('RPOP', KEYS[1])
+while job_id do
+    local key = ARGV[1] .. job_id
+    if redis.call('HGET', key, 'status') == 'queued' then
+        redis.call('LPUSH', KEYS[2], job_id)
+        redis.call('HSET', key, 'status', 'running', 'worker', ARGV[2], 'started_at', ARGV[3], 'heartbeat_at', ARGV[3])
+        redis.call('HINCRBY', key, 'attempts', 1)
+        return job_id
+    end
+    job_id = redis.call('RPOP', KEYS[1])
+end
+return false
+"""
+
+# KEYS: job, queue; ARGV: job id, now, result ttl
+CANCEL_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'status') ~= 'queued' then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', 'cancelled', 'finished_at', ARGV[2])
+redis.call('LREM', KEYS[2], 0, ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+# Records the outcome only while the job is still running on the finishing worker.
+# KEYS: job, processing, events; ARGV: job id, worker id, status, result, error, now, result ttl
+FINISH_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'status') ~= 'running' or redis.call('HGET', KEYS[1], 'worker') ~= ARGV[2] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', ARGV[3], 'result', ARGV[4], 'error', ARGV[5], 'finished_at', ARGV[6])
+redis.call('LREM', KEYS[2], 0, ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[7])
+redis.call('EXPIRE', KEYS[3], ARGV[7])
+return 1
+"""
+
+# Requeues a processing entry whose worker stopped heartbeating, or that never became running.
+# KEYS: job, processing, queue; ARGV: job id, heartbeat cutoff
+REQUEUE_SCRIPT = """
+local status = redis.call('HGET', KEYS[1], 'status')
+local heartbeat = tonumber(redis.call('HGET', KEYS[1], 'heartbeat_at'))
+if status == 'queued' or (status == 'running' and (not heartbeat or heartbeat < tonumber(ARGV[2]))) then
+    redis.call('HSET', KEYS[1], 'status', 'queued', 'worker', '')
+    redis.call('LREM', KEYS[2], 0, ARGV[1])
+    redis.call('RPUSH', KEYS[3], ARGV[1])
+    return 1
+end
+if not status then
+    redis.call('LREM', KEYS[2], 0, ARGV[1])
+end
+return 0
+"""
+
+class RedisJobQueue(JobQueue):
+    """Job queue in Redis; worker processes on any host share it
+    
+    Queued job ids sit in a list. Claims, finishes, cancels and requeues run as Lua
+    scripts, so a job moves to the processing list and becomes running in one atomic
+    step, a cancel can never be overwritten by a concurrent claim, and a worker whose
+    job was requeued cannot overwrite the new owner's outcome.
+    """
+    
+    def __init__(self, url: str, prefix: str = 'jobs', **kwargs):
+        super().__init__(**kwargs)
+        if redis is None:
+            raise ImportError("The redis package is required for the redis job queue")
+        
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._claim = self._redis.register_script(CLAIM_SCRIPT)
+        self._finish = self._redis.register_script(FINISH_SCRIPT)
+        self._cancel = self._redis.register_script(CANCEL_SCRIPT)
+        self._requeue = self._redis.register_script(REQUEUE_SCRIPT)
+    
+    def _key(self, *parts: str) -> str:
+        return ':'.join((self.prefix,) + parts)
+    
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        job = self.new_job(payload)
+        pipe = self._redis.pipeline()
+        pipe.hset(self._key('job', job['id']), mapping=self._encode(job))
+        pipe.lpush(self._key('queue'), job['id'])
+        pipe.execute()
+        return job['id']
+    
+    def claim(self, worker_id: str, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        
+        # Polled rather than BLMOVE: a blocking pop cannot mark the job running atomically
+        while True:
+            job_id = self._claim(
+                keys=[self._key('queue'), self._key('processing')],
+                args=[self._key('job', ''), worker_id, time.time()]
+            )
+            if job_id:
+                return self.get(job_id)
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(min(0.2, max(0.0, deadline - time.monotonic())))
+    
+    def add_event(self, job_id: str, event: Dict[str, Any]):
+        pipe = self._redis.pipeline()
+        pipe.rpush(self._key('job', job_id, 'events'), json.dumps(event, default=str))
+        pipe.hset(self._key('job', job_id), 'heartbeat_at', time.time())
+        pipe.execute()
+    
+    def heartbeat(self, job_id: str):
+        self._redis.hset(self._key('job', job_id), 'heartbeat_at', time.time())
+    
+    def finish(self, job_id: str, worker_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> bool:
+        finished = self._finish(
+            keys=[self._key('job', job_id), self._key('processing'), self._key('job', job_id, 'events')],
+            args=[
+                job_id, worker_id, status,
+                json.dumps(result, default=str) if result is not None else '',
+                error or '', time.time(), int(self.result_ttl)
+            ]
+        )
+        return bool(finished)
+    
+    def cancel(self, job_id: str) -> bool:
+        cancelled = self._cancel(
+            keys=[self._key('job', job_id), self._key('queue')],
+            args=[job_id, time.time(), int(self.result_ttl)]
+        )
+        return bool(cancelled)
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        data = self._redis.hgetall(self._key('job', job_id))
+        return self._decode(data) if data else None
+    
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        events = self._redis.lrange(self._key('job', job_id, 'events'), after, -1)
+        return [{'seq': after + i + 1, **json.loads(event)} for i, event in enumerate(events)]
+    
+    def requeue_stale(self) -> int:
+        requeued = 0
+        cutoff = time.time() - self.visibility_timeout
+        
+        for job_id in self._redis.lrange(self._key('processing'), 0, -1):
+            requeued += self._requeue(
+                keys=[self._key('job', job_id), self._key('processing'), self._key('queue')],
+                args=[job_id, cutoff]
+            )
+        
+        return requeued
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'backend': 'redis',
+            'queued': self._redis.llen(self._key('queue')),
+            'running': self._redis.llen(self._key('processing'))
+        }
+    
+    @staticmethod
+    def _encode(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            key: json.dumps(value) if key in ('payload', 'result') else ('' if value is None else value)
+            for key, value in job.items()
+        }
+    
+    @staticmethod
+    def _decode(data: Dict[str, str]) -> Dict[str, Any]:
+        job: Dict[str, Any] = {key: (value if value != '' else None) for key, value in data.items()}
+        job['payload'] = json.loads(job['payload']) if job.get('payload') else None
+        job['result'] = json.loads(job['result']) if job.get('result') else None
+        job['attempts'] = int(job.get('attempts') or 0)
+        for key in ('created_at', 'started_at', 'finished_at', 'heartbeat_at'):
+            job[key] = float(job[key]) if job.get(key) else None
+        return job
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    """Get the process-wide job queue for the configured backend (JOBS_BACKEND overrides config.yaml)"""
+    
+    global _queue
+    
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                settings = ConfigLoader.get('jobs', {}) or {}
+                backend = ConfigLoader.get_env('JOBS_BACKEND') or settings.get('backend', 'sqlite')
+                options = {
+                    'visibility_timeout': settings.get('visibility_timeout', 300),
+                    'result_ttl': settings.get('result_ttl', 86400)
+                }
+                
+                if backend == 'redis':
+                    url = ConfigLoader.get_env('REDIS_URL') or settings.get('redis_url') or (
+                        f"redis://{ConfigLoader.get_env('REDIS_HOST', 'localhost')}:{ConfigLoader.get_env('REDIS_PORT', '6379')}/0"
+                    )
+                    _queue = RedisJobQueue(url, prefix=settings.get('redis_prefix', 'jobs'), **options)
+                elif backend == 'sqlite':
+                    _queue = SQLiteJobQueue(settings.get('sqlite_path', './data/jobs.sqlite'), **options)
+                else:
+                    raise ValueError(f"Unknown job queue backend: {backend}")
+    
+    return _queue
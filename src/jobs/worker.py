@@ -0,0 +1,270 @@
+"""
+Job worker - Worker processes that run queued agent and workflow jobs
+
+Run with: python -m src.jobs.worker --processes 2 --concurrency 4
+"""
+from typing import Dict, Any, Optional, Set
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import uuid
+
+from src.utils.config_loader import ConfigLoader
+from src.llm.client_pool import ClientPool
+from src.agents.checkpoint import CheckpointStore
+from src.backend.executor_pool import ExecutorPool
+from src.jobs.queue import JobQueue, get_job_queue
+
+class JobWorker:
+    """Claims jobs from the queue and runs up to concurrency of them at once on one event loop
+    
+    Agents and workflows are async, so one process serves several jobs; run more processes
+    to use more cores. Progress events and heartbeats go to the queue as the job runs. A
+    requeued workflow job (its worker died) resumes from the workflow checkpoint, which
+    uses the job id as run id.
+    """
+    
+    def __init__(self, queue: JobQueue, concurrency: int = 4, worker_id: Optional[str] = None):
+        settings = ConfigLoader.get('jobs', {}) or {}
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.poll_interval = settings.get('poll_interval', 0.5)
+        self.job_timeout = settings.get('job_timeout', 3600)
+        self.shutdown_timeout = settings.get('shutdown_timeout', 30)
+        self._stopping = asyncio.Event()
+        self._running: Set[asyncio.Task] = set()
+        self._stats = {'succeeded': 0, 'failed': 0, 'stale': 0}
+    
+    async def serve(self):
+        """Claim and run jobs until stop() is called, then let running jobs finish"""
+        
+        slots = asyncio.Semaphore(self.concurrency)
+        last_sweep = 0.0
+        
+        while not self._stopping.is_set():
+            if time.monotonic() - last_sweep > self.queue.visibility_timeout / 2:
+                last_sweep = time.monotonic()
+                try:
+                    await asyncio.to_thread(self.queue.requeue_stale)
+                except Exception as e:
+                    print(f"Error requeueing stale jobs: {e}")
+            
+            # With every slot busy, stop() must not wait for a running job to free one
+            acquire = asyncio.ensure_future(slots.acquire())
+            stopping = asyncio.ensure_future(self._stopping.wait())
+            await asyncio.wait({acquire, stopping}, return_when=asyncio.FIRST_COMPLETED)
+            stopping.cancel()
+            if self._stopping.is_set():
+                if acquire.done() and not acquire.cancelled():
+                    slots.release()
+                else:
+                    acquire.cancel()
+                break
+            
+            try:
+                job = await asyncio.to_thread(self.queue.claim, self.worker_id, self.poll_interval)
+            except Exception as e:
+                print(f"Error claiming job: {e}")
+                job = None
+                await asyncio.sleep(self.poll_interval)
+            
+            if job is None:
+                slots.release()
+                continue
+            
+            task = asyncio.ensure_future(self.run_job(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            task.add_done_callback(lambda _: slots.release())
+        
+        if self._running:
+            # Jobs still running after shutdown_timeout are requeued once their heartbeat expires
+            done, pending = await asyncio.wait(self._running, timeout=self.shutdown_timeout)
+            for task in pending:
+                task.cancel()
+    
+    def stop(self):
+        """Stop claiming new jobs"""
+        self._stopping.set()
+    
+    async def run_job(self, job: Dict[str, Any]):
+        """Run one claimed job and record its outcome"""
+        
+        job_id = job['id']
+        heartbeat = asyncio.ensure_future(self._heartbeat(job_id))
+        
+        try:
+            await self._add_event(job_id, {'type': 'job_started', 'worker': self.worker_id, 'attempt': job['attempts']})
+            result = await asyncio.wait_for(self._execute(job), self.job_timeout)
+            status = 'succeeded' if result.get('success') else 'failed'
+            error = result.get('error')
+        except asyncio.TimeoutError:
+            result, status, error = None, 'failed', f"Timed out after {self.job_timeout}s"
+        except Exception as e:
+            result, status, error = None, 'failed', str(e)
+        finally:
+            heartbeat.cancel()
+        
+        try:
+            await self._add_event(job_id, {'type': 'job_finished', 'status': status, 'error': error})
+            finished = await asyncio.to_thread(self.queue.finish, job_id, self.worker_id, status, result, error)
+        except Exception as e:
+            print(f"Error recording job {job_id}: {e}")
+            return
+        
+        # Requeued while this worker was still running it; the new owner's outcome stands
+        if not finished:
+            self._stats['stale'] += 1
+            print(f"Dropped stale result of job {job_id}; it was requeued to another worker")
+            return
+        
+        self._stats[status] += 1
+    
+    async def _execute(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        payload = job['payload']
+        executor, agent_id = ExecutorPool.get_instance().resolve(
+            payload.get('project'), payload.get('agent_config'), payload.get('agent_id')
+        )
+        
+        if agent_id is not None:
+            return await executor.run_agent_async(agent_id, payload['input_data'], payload.get('context') or {})
+        
+        store = CheckpointStore.get_instance()
+        resumable = job['attempts'] > 1 and store is not None and await asyncio.to_thread(store.load_run, job['id'])
+        if resumable:
+            events = executor.stream_resumed_workflow(job['id'])
+        else:
+            events = executor.stream_workflow(payload['input_data'], run_id=job['id'])
+        
+        try:
+            async for event in events:
+                if event['type'] == 'error':
+                    return {'success': False, 'error': event['error']}
+                if event['type'] == 'done':
+                    return event['result']
+                await self._add_event(job['id'], event)
+        finally:
+            await events.aclose()
+        
+        return {'success': False, 'error': "Workflow ended without a result"}
+    
+    async def _add_event(self, job_id: str, event: Dict[str, Any]):
+        await asyncio.to_thread(self.queue.add_event, job_id, event)
+    
+    async def _heartbeat(self, job_id: str):
+        """Keep a long, quiet job (one slow LLM call) from looking abandoned"""
+        while True:
+            await asyncio.sleep(self.queue.visibility_timeout / 3)
+            try:
+                await asyncio.to_thread(self.queue.heartbeat, job_id)
+            except Exception as e:
+                print(f"Error sending heartbeat for job {job_id}: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get this worker's job counters"""
+        return {**self._stats, 'worker': self.worker_id, 'running': len(self._running), 'concurrency': self.concurrency}
+
+_embedded: Optional[JobWorker] = None
+_embedded_task: Optional[asyncio.Task] = None
+
+def start_embedded_worker() -> Optional[JobWorker]:
+    """Run jobs inside the API process, on its event loop, when jobs.embedded_workers > 0
+    
+    Handy with the SQLite backend on a single host; deployments with worker processes
+    set JOBS_EMBEDDED_WORKERS=0.
+    """
+    global _embedded, _embedded_task
+    
+    concurrency = int(ConfigLoader.get_env('JOBS_EMBEDDED_WORKERS') or ConfigLoader.get('jobs.embedded_workers', 1))
+    if concurrency <= 0 or _embedded is not None:
+        return _embedded
+    
+    _embedded = JobWorker(get_job_queue(), concurrency)
+    _embedded_task = asyncio.ensure_future(_embedded.serve())
+    return _embedded
+
+async def stop_embedded_worker():
+    """Stop the embedded worker, letting its running jobs finish"""
+    global _embedded, _embedded_task
+    
+    if _embedded is not None:
+        _embedded.stop()
+        await _embedded_task
+        _embedded = _embedded_task = None
+
+def get_embedded_worker() -> Optional[JobWorker]:
+    """Get the API process's embedded worker, if one is running"""
+    return _embedded
+
+def run_worker_process(concurrency: int):
+    """Entry point of one worker process"""
+    
+    async def main():
+        worker = JobWorker(get_job_queue(), concurrency)
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, worker.stop)
+        
+        ClientPool.warm_up()
+        print(f"Job worker {worker.worker_id} started with {concurrency} slots")
+        try:
+            await worker.serve()
+        finally:
+            await ClientPool.aclose()
+            ClientPool.close()
+        print(f"Job worker {worker.worker_id} stopped: {worker.get_stats()}")
+    
+    asyncio.run(main())
+
+def main():
+    settings = ConfigLoader.get('jobs', {}) or {}
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument('--processes', type=int, default=settings.get('worker_processes', 2), help="worker processes to start")
+    parser.add_argument('--concurrency', type=int, default=settings.get('worker_concurrency', 4), help="jobs each process runs at once")
+    args = parser.parse_args()
+    
+    if args.processes <= 1:
+        run_worker_process(args.concurrency)
+        return
+    
+    # Spawned, not forked: each process builds its own clients, loops and connections
+    context = multiprocessing.get_context('spawn')
+    processes = {}
+    stopping = False
+    
+    def start(index: int):
+        process = context.Process(target=run_worker_process, args=(args.concurrency,), name=f"job-worker-{index}")
+        process.start()
+        processes[index] = process
+    
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    for index in range(args.processes):
+        start(index)
+    
+    # Restart processes that crash; their jobs are requeued when the heartbeat expires
+    while not stopping:
+        time.sleep(1)
+        for index, process in list(processes.items()):
+            if not process.is_alive() and not stopping:
+                print(f"Job worker process {process.name} exited with {process.exitcode}; restarting")
+                start(index)
+    
+    for process in processes.values():
+        process.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+LLM provider layer
+"""
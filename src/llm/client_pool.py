@@ -0,0 +1,262 @@
+"""
+Client pool - Process-wide, long-lived LLM provider clients
+"""
+from typing import Dict, Any, Optional, Tuple
+import asyncio
+import hashlib
+import threading
+import weakref
+
+# Optional imports for production mode
+try:
+    import openai
+except ImportError:
+    openai = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from src.utils.config_loader import ConfigLoader
+
+class ClientPool:
+    """Shares keep-alive LLM clients keyed by (provider, endpoint, api_version, key)"""
+    
+    _clients: Dict[Tuple[str, str, str, str], Any] = {}
+    # Per event loop; an entry goes away with its loop, so short-lived loops do not accumulate clients
+    _async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str, str, str], Any]]" = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+    _warmed_up = False
+    
+    @classmethod
+    def get_client(cls, provider: str, endpoint: Optional[str] = None, api_version: Optional[str] = None, api_key: Optional[str] = None) -> Any:
+        """Get (or create) the pooled client for the given provider settings"""
+        
+        key = cls._make_key(provider, endpoint, api_version, api_key)
+        client = cls._clients.get(key)
+        
+        if client is None:
+            with cls._lock:
+                client = cls._clients.get(key)
+                if client is None:
+                    client = cls._create_client(provider, endpoint, api_version, api_key)
+                    cls._clients[key] = client
+        
+        return client
+    
+    @classmethod
+    def get_async_client(cls, provider: str, endpoint: Optional[str] = None, api_version: Optional[str] = None, api_key: Optional[str] = None) -> Any:
+        """Get (or create) the pooled async client for the running event loop"""
+        
+        # Async connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        key = cls._make_key(provider, endpoint, api_version, api_key)
+        client = cls._async_clients.get(loop, {}).get(key)
+        
+        if client is None:
+            with cls._lock:
+                cls._drop_closed_loops()
+                clients = cls._async_clients.setdefault(loop, {})
+                client = clients.get(key)
+                if client is None:
+                    client = cls._create_client(provider, endpoint, api_version, api_key, use_async=True)
+                    clients[key] = client
+        
+        return client
+    
+    @classmethod
+    def resolve_settings(cls, provider: str) -> Optional[Dict[str, str]]:
+        """Resolve provider settings from the environment, or None if not configured"""
+        
+        if provider == 'azure_openai':
+            endpoint = ConfigLoader.get_env("AZURE_OPENAI_ENDPOINT")
+            api_key = ConfigLoader.get_env("AZURE_OPENAI_API_KEY")
+            
+            if not endpoint or not api_key or endpoint == "demo-mode":
+                return None
+            
+            return {
+                'endpoint': endpoint,
+                'api_version': ConfigLoader.get_env("AZURE_OPENAI_API_VERSION", "2024-02-15-preview"),
+                'api_key': api_key
+            }
+        
+        elif provider == 'openai':
+            api_key = ConfigLoader.get_env("OPENAI_API_KEY")
+            
+            if not api_key or api_key == "demo-mode":
+                return None
+            
+            return {
+                'endpoint': ConfigLoader.get_env("OPENAI_BASE_URL") or None,
+                'api_version': None,
+                'api_key': api_key
+            }
+        
+        elif provider == 'ollama':
+            if not ConfigLoader.get('llm_providers.ollama.enabled', False):
+                return None
+            
+            return {
+                'endpoint': ConfigLoader.get_env("OLLAMA_HOST") or ConfigLoader.get('llm_providers.ollama.host', 'http://localhost:11434'),
+                'api_version': None,
+                'api_key': None
+            }
+        
+        return None
+    
+    @classmethod
+    def warm_up(cls, background: bool = True):
+        """Create clients for all configured providers and open their connections once"""
+        
+        if cls._warmed_up or not ConfigLoader.get('llm_client_pool.warm_up', True):
+            return
+        cls._warmed_up = True
+        
+        if background:
+            threading.Thread(target=cls._warm_up, name="llm-client-warm-up", daemon=True).start()
+        else:
+            cls._warm_up()
+    
+    @classmethod
+    def close(cls):
+        """Close every pooled client and its connections, including other loops' async clients"""
+        
+        with cls._lock:
+            clients = list(cls._clients.values())
+            cls._clients.clear()
+            async_clients = [(loop, list(loop_clients.values())) for loop, loop_clients in cls._async_clients.items()]
+            cls._async_clients.clear()
+            cls._warmed_up = False
+        
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                print(f"Error closing LLM client: {e}")
+        
+        for loop, loop_clients in async_clients:
+            for client in loop_clients:
+                cls._close_async_client(loop, client)
+    
+    @classmethod
+    async def aclose(cls):
+        """Close the async clients owned by the running event loop"""
+        
+        with cls._lock:
+            clients = list(cls._async_clients.pop(asyncio.get_running_loop(), {}).values())
+        
+        for client in clients:
+            try:
+                await cls._aclose_client(client)
+            except Exception as e:
+                print(f"Error closing async LLM client: {e}")
+    
+    @classmethod
+    def _drop_closed_loops(cls):
+        """Forget clients of loops that have closed; their connections died with the loop"""
+        for loop in [loop for loop in cls._async_clients if loop.is_closed()]:
+            del cls._async_clients[loop]
+    
+    @staticmethod
+    async def _aclose_client(client: Any):
+        # Raw httpx clients close with aclose(), OpenAI clients with close()
+        await (client.aclose() if hasattr(client, 'aclose') else client.close())
+    
+    @classmethod
+    def _close_async_client(cls, loop: asyncio.AbstractEventLoop, client: Any):
+        """Close an async client on its own loop, from outside that loop"""
+        
+        try:
+            if loop.is_closed():
+                return
+            if loop.is_running():
+                # Runs on the owning loop; close() cannot wait for it there
+                asyncio.run_coroutine_threadsafe(cls._aclose_client(client), loop)
+            else:
+                loop.run_until_complete(cls._aclose_client(client))
+        except Exception as e:
+            print(f"Error closing async LLM client: {e}")
+    
+    @classmethod
+    def _warm_up(cls):
+        """Establish TLS connections for configured providers"""
+        
+        for provider in ('azure_openai', 'openai', 'ollama'):
+            settings = cls.resolve_settings(provider)
+            if not settings:
+                continue
+            
+            try:
+                client = cls.get_client(provider, **settings)
+                # Listing models is cheap and leaves a keep-alive connection in the pool
+                if provider == 'ollama':
+                    client.get('/api/tags')
+                else:
+                    client.models.list()
+            except Exception as e:
+                print(f"Error warming up {provider} client: {e}")
+    
+    @staticmethod
+    def _make_key(provider: str, endpoint: Optional[str], api_version: Optional[str], api_key: Optional[str]) -> Tuple[str, str, str, str]:
+        """Build the pool key without keeping the raw API key around"""
+        key_hash = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()
+        return (provider, endpoint or '', api_version or '', key_hash)
+    
+    @staticmethod
+    def _http_client(use_async: bool = False, **kwargs) -> Any:
+        """Create an HTTP client with keep-alive and the configured connection limits"""
+        
+        if httpx is None:
+            return None
+        
+        settings = ConfigLoader.get('llm_client_pool', {})
+        limits = httpx.Limits(
+            max_connections=settings.get('max_connections', 100),
+            max_keepalive_connections=settings.get('max_keepalive_connections', 20),
+            keepalive_expiry=settings.get('keepalive_expiry', 30)
+        )
+        
+        client_class = httpx.AsyncClient if use_async else httpx.Client
+        return client_class(limits=limits, **{'timeout': settings.get('timeout', 60), **kwargs})
+    
+    @classmethod
+    def _create_client(cls, provider: str, endpoint: Optional[str], api_version: Optional[str], api_key: Optional[str], use_async: bool = False) -> Any:
+        """Create a new provider client"""
+        
+        if provider == 'ollama':
+            if httpx is None:
+                raise ImportError("The httpx package is required for the Ollama provider")
+            
+            # Ollama speaks plain HTTP; loading a model from disk can take minutes
+            return cls._http_client(
+                use_async,
+                base_url=endpoint,
+                timeout=ConfigLoader.get('llm_providers.ollama.timeout', 300)
+            )
+        
+        if openai is None:
+            raise ImportError("The openai package is required for LLM providers")
+        
+        if provider == 'azure_openai':
+            client_class = openai.AsyncAzureOpenAI if use_async else openai.AzureOpenAI
+            return client_class(
+                azure_endpoint=endpoint,
+                api_key=api_key,
+                api_version=api_version,
+                http_client=cls._http_client(use_async),
+                max_retries=0  # Retries are handled by the resilience layer
+            )
+        
+        elif provider == 'openai':
+            client_class = openai.AsyncOpenAI if use_async else openai.OpenAI
+            return client_class(
+                api_key=api_key,
+                base_url=endpoint,
+                http_client=cls._http_client(use_async),
+                max_retries=0  # Retries are handled by the resilience layer
+            )
+        
+        else:
+            raise ValueError(f"Unknown LLM provider: {provider}")
@@ -0,0 +1,182 @@
+"""
+Context window manager - Fit conversation history into a model's context window
+"""
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+from src.utils.config_loader import ConfigLoader
+from src.llm.token_counter import TokenCounter, TOKENS_PER_MESSAGE
+
+CONTEXT_STRATEGIES = ("sliding_window", "keep_first_last", "rolling_summary")
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an AI agent. "
+    "Merge the previous summary with the new messages into one concise summary that keeps "
+    "facts, decisions, open questions and user preferences. Reply with the summary only."
+)
+
+# (messages to summarize, previous summary) -> updated summary
+Summarizer = Callable[[List[Dict[str, str]], str], Awaitable[str]]
+
+class ContextWindowManager:
+    """Trims or summarizes history so each request's prompt stays within a fixed budget"""
+    
+    # conversation key -> {'cut': messages folded into the summary, 'prefix_hash': ..., 'summary': ...}
+    _summaries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    _lock = threading.Lock()
+    
+    def __init__(self, strategy: Optional[str] = None):
+        settings = ConfigLoader.get('context_window', {})
+        self.strategy = strategy or settings.get('strategy', 'sliding_window')
+        self.max_history_tokens = settings.get('max_history_tokens', 2000)
+        self.keep_first = settings.get('keep_first_messages', 2)
+        self.summary_max_tokens = settings.get('summary_max_tokens', 300)
+        self.summary_cache_size = settings.get('summary_cache_size', 1000)
+        
+        if self.strategy not in CONTEXT_STRATEGIES:
+            raise ValueError(f"Unknown context strategy: {self.strategy}")
+    
+    async def fit(self, model: str, messages: List[Dict[str, str]], max_tokens: int, summarize: Optional[Summarizer] = None) -> List[Dict[str, str]]:
+        """Return messages whose history fits the history budget for this model"""
+        
+        head, history, tail = self._split(messages)
+        if not history:
+            return messages
+        
+        budget = self._history_budget(model, head + tail, max_tokens)
+        costs = [self._message_tokens(message, model) for message in history]
+        
+        if sum(costs) <= budget:
+            return messages
+        
+        if self.strategy == 'rolling_summary' and summarize is not None:
+            try:
+                return await self._fit_with_summary(model, head, history, tail, costs, budget, summarize)
+            except Exception as e:
+                print(f"Error summarizing conversation, falling back to sliding window: {e}")
+        
+        if self.strategy == 'keep_first_last':
+            first = history[:self.keep_first]
+            first_cost = sum(costs[:self.keep_first])
+            recent = self._take_recent(history[self.keep_first:], costs[self.keep_first:], budget - first_cost)
+            return head + first + recent + tail
+        
+        return head + self._take_recent(history, costs, budget) + tail
+    
+    async def _fit_with_summary(
+        self,
+        model: str,
+        head: List[Dict[str, str]],
+        history: List[Dict[str, str]],
+        tail: List[Dict[str, str]],
+        costs: List[int],
+        budget: int,
+        summarize: Summarizer
+    ) -> List[Dict[str, str]]:
+        """Fold the oldest messages into a rolling summary computed incrementally"""
+        
+        recent_budget = max(0, budget - self.summary_max_tokens - TOKENS_PER_MESSAGE)
+        conversation_key = self._conversation_key(model, head, history)
+        
+        with self._lock:
+            cached = self._summaries.get(conversation_key)
+            if cached is not None:
+                self._summaries.move_to_end(conversation_key)
+        
+        cut, summary = 0, ''
+        if cached and cached['cut'] <= len(history) and cached['prefix_hash'] == self._hash(history[:cached['cut']]):
+            cut, summary = cached['cut'], cached['summary']
+        
+        if sum(costs[cut:]) > recent_budget:
+            # Drop down to half the budget so the next few turns reuse this summary as is
+            new_cut = self._cut_for(costs, recent_budget // 2, start=cut)
+            summary = await summarize(history[cut:new_cut], summary)
+            cut = new_cut
+            
+            with self._lock:
+                self._summaries[conversation_key] = {
+                    'cut': cut,
+                    'prefix_hash': self._hash(history[:cut]),
+                    'summary': summary
+                }
+                self._summaries.move_to_end(conversation_key)
+                while len(self._summaries) > self.summary_cache_size:
+                    self._summaries.popitem(last=False)
+        
+        summary_message = {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+        return head + ([summary_message] if summary else []) + history[cut:] + tail
+    
+    def _history_budget(self, model: str, fixed: List[Dict[str, str]], max_tokens: int) -> int:
+        """Tokens left for history after the fixed messages and the completion"""
+        
+        window = TokenCounter.context_limit(model) - max_tokens - TokenCounter.count_messages(fixed, model)
+        return max(0, min(window, self.max_history_tokens))
+    
+    @staticmethod
+    def _split(messages: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], List[Dict[str, str]], List[Dict[str, str]]]:
+        """Split into leading system messages, history and the final message"""
+        
+        if len(messages) < 2:
+            return messages, [], []
+        
+        head_size = 0
+        while head_size < len(messages) - 1 and messages[head_size].get('role') == 'system':
+            head_size += 1
+        
+        return messages[:head_size], messages[head_size:-1], messages[-1:]
+    
+    @staticmethod
+    def _message_tokens(message: Dict[str, str], model: str) -> int:
+        """Tokens a single history message adds to the prompt"""
+        return TOKENS_PER_MESSAGE + TokenCounter.count_text(message.get('content') or '', model) + TokenCounter.count_text(message.get('role', ''), model)
+    
+    @staticmethod
+    def _take_recent(history: List[Dict[str, str]], costs: List[int], budget: int) -> List[Dict[str, str]]:
+        """Keep the most recent messages that fit in the budget"""
+        
+        total = 0
+        start = len(history)
+        
+        while start > 0 and total + costs[start - 1] <= budget:
+            start -= 1
+            total += costs[start]
+        
+        return history[start:]
+    
+    @staticmethod
+    def _cut_for(costs: List[int], budget: int, start: int = 0) -> int:
+        """First index after start from which the remaining messages fit the budget"""
+        
+        cut = start
+        remaining = sum(costs[start:])
+        
+        while cut < len(costs) and remaining > budget:
+            remaining -= costs[cut]
+            cut += 1
+        
+        return cut
+    
+    @staticmethod
+    def _hash(messages: List[Dict[str, str]]) -> str:
+        """Stable hash of a list of messages"""
+        payload = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def _conversation_key(cls, model: str, head: List[Dict[str, str]], history: List[Dict[str, str]]) -> str:
+        """Identify a conversation by model, system messages and its opening message"""
+        return cls._hash([{"role": "model", "content": model}] + head + history[:1])
+    
+    @staticmethod
+    def summary_messages(messages: List[Dict[str, str]], previous_summary: str) -> List[Dict[str, str]]:
+        """Build the request that folds new messages into the previous summary"""
+        
+        transcript = "\n".join(f"{message.get('role', 'user')}: {message.get('content', '')}" for message in messages)
+        
+        return [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Previous summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"}
+        ]
@@ -0,0 +1,234 @@
+"""
+Model catalog - Configured models merged with models discovered on the Ollama host
+"""
+from typing import Dict, Any, List, Optional
+import asyncio
+import threading
+import time
+
+import httpx
+
+from src.utils.config_loader import ConfigLoader
+from src.utils.async_runner import AsyncRunner
+from src.llm.client_pool import ClientPool
+
+class ModelCatalog:
+    """Cached list of the models each enabled provider offers, with their context limits
+    
+    Lookups never wait on the network. Discovered models are fresh for ttl seconds and
+    are then served stale while a background refresh runs, for up to stale_ttl seconds.
+    Until the first discovery lands, the catalog lists the configured models only.
+    """
+    
+    _instance: Optional['ModelCatalog'] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, ttl: float = 300, stale_ttl: float = 3600, timeout: float = 2.0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self._discovered: Optional[List[Dict[str, Any]]] = None
+        self._discovered_at = 0.0
+        self._refreshing = None
+        self._lock = threading.Lock()
+        self._stats = {'refreshes': 0, 'errors': 0, 'stale_served': 0}
+    
+    @classmethod
+    def get_instance(cls) -> 'ModelCatalog':
+        """Get the process-wide catalog configured from config.yaml"""
+        
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    settings = ConfigLoader.get('model_catalog', {})
+                    cls._instance = cls(
+                        ttl=settings.get('ttl', 300),
+                        stale_ttl=settings.get('stale_ttl', 3600),
+                        timeout=settings.get('timeout', 2.0)
+                    )
+        
+        return cls._instance
+    
+    def get_models(self, provider: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get catalog entries (name, display_name, provider, context_limit, source, available)"""
+        
+        models = self._configured_models() + self._current_discovered()
+        models = self._merge(models)
+        
+        if provider:
+            models = [model for model in models if model['provider'] == provider]
+        
+        return models
+    
+    def get_models_by_provider(self) -> Dict[str, List[str]]:
+        """Get model names grouped by provider"""
+        
+        grouped: Dict[str, List[str]] = {}
+        for model in self.get_models():
+            grouped.setdefault(model['provider'], []).append(model['name'])
+        
+        return grouped
+    
+    def context_limit(self, model: str) -> Optional[int]:
+        """Get a model's context window, or None when the catalog does not know the model"""
+        
+        for entry in self.get_models():
+            if entry['name'] == model or entry['name'] == f"{model}:latest":
+                return entry['context_limit']
+        
+        return None
+    
+    def discovered_context_limit(self, model: str) -> Optional[int]:
+        """Get a discovered model's context window without triggering a refresh"""
+        
+        for entry in self._discovered or []:
+            if entry['name'] == model or entry['name'] == f"{model}:latest":
+                return entry['context_limit']
+        
+        return None
+    
+    def is_stale(self) -> bool:
+        """Whether discovered models are missing or older than ttl"""
+        return self._discovered is None or time.monotonic() - self._discovered_at > self.ttl
+    
+    async def refresh(self):
+        """Discover models now, sharing a refresh that is already running"""
+        await asyncio.wrap_future(self._schedule_refresh())
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get refresh counters and the age of the discovered models"""
+        return {
+            **self._stats,
+            'discovered': len(self._discovered or []),
+            'age': time.monotonic() - self._discovered_at if self._discovered is not None else None
+        }
+    
+    def _current_discovered(self) -> List[Dict[str, Any]]:
+        """Discovered models still within stale_ttl; schedules a refresh once they pass ttl"""
+        
+        if self.is_stale():
+            self._schedule_refresh()
+            if self._discovered is not None:
+                self._stats['stale_served'] += 1
+        
+        if self._discovered is None or time.monotonic() - self._discovered_at > self.stale_ttl:
+            return []
+        
+        return self._discovered
+    
+    def _schedule_refresh(self):
+        """Start one background discovery on the shared async loop"""
+        
+        with self._lock:
+            if self._refreshing is None or self._refreshing.done():
+                self._refreshing = AsyncRunner.submit(self._discover())
+            return self._refreshing
+    
+    async def _discover(self):
+        """List the Ollama host's models and read each one's context length"""
+        
+        settings = ClientPool.resolve_settings('ollama')
+        if not settings:
+            self._discovered, self._discovered_at = [], time.monotonic()
+            return
+        
+        try:
+            async with httpx.AsyncClient(base_url=settings['endpoint'], timeout=self.timeout) as client:
+                response = await client.get('/api/tags')
+                response.raise_for_status()
+                names = [model['name'] for model in response.json().get('models', [])]
+                
+                limits = await asyncio.gather(*(self._ollama_context_length(client, name) for name in names))
+            
+            self._discovered = [
+                {
+                    'name': name,
+                    'display_name': f"{name} (Ollama)",
+                    'provider': 'ollama',
+                    'context_limit': limit,
+                    'source': 'discovered',
+                    'available': True
+                }
+                for name, limit in zip(names, limits)
+            ]
+            self._discovered_at = time.monotonic()
+            self._stats['refreshes'] += 1
+        except Exception as e:
+            # Keep serving the previous list; the next lookup past ttl tries again
+            self._stats['errors'] += 1
+            if self._discovered is None:
+                self._discovered, self._discovered_at = [], time.monotonic()
+            print(f"Error discovering Ollama models: {e}")
+    
+    @staticmethod
+    async def _ollama_context_length(client: httpx.AsyncClient, name: str) -> Optional[int]:
+        """Read '<architecture>.context_length' from /api/show"""
+        
+        try:
+            response = await client.post('/api/show', json={'model': name})
+            response.raise_for_status()
+            for key, value in (response.json().get('model_info') or {}).items():
+                if key.endswith('.context_length'):
+                    return int(value)
+        except Exception:
+            pass
+        
+        return None
+    
+    @staticmethod
+    def _configured_models() -> List[Dict[str, Any]]:
+        """Models of the enabled providers in config.yaml"""
+        
+        default_limit = ConfigLoader.get('token_accounting.default_context_limit', 4096)
+        models = []
+        
+        for provider, settings in (ConfigLoader.get('llm_providers', {}) or {}).items():
+            if not settings.get('enabled'):
+                continue
+            for model in settings.get('models', []):
+                models.append({
+                    'name': model['name'],
+                    'display_name': model.get('display_name', model['name']),
+                    'provider': provider,
+                    'context_limit': model.get('max_tokens', default_limit),
+                    'source': 'config',
+                    'available': True
+                })
+        
+        return models
+    
+    def _merge(self, models: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Combine configured and discovered entries of the same model
+        
+        A configured Ollama model matches a discovered '<name>:latest'. Once discovery has
+        succeeded, configured Ollama models the host does not have are marked unavailable.
+        """
+        
+        default_limit = ConfigLoader.get('token_accounting.default_context_limit', 4096)
+        merged: Dict[tuple, Dict[str, Any]] = {}
+        discovered_names = {model['name'] for model in models if model['source'] == 'discovered'}
+        
+        for model in models:
+            name = model['name']
+            if model['source'] == 'discovered' and name.endswith(':latest'):
+                base = name[:-len(':latest')]
+                if (model['provider'], base) in merged:
+                    name = base
+            
+            key = (model['provider'], name)
+            if key not in merged:
+                merged[key] = dict(model)
+                continue
+            
+            # Configured display names and limits win; discovery confirms availability
+            entry = merged[key]
+            entry['source'] = 'config+discovered'
+            entry['context_limit'] = entry['context_limit'] or model['context_limit']
+        
+        for (provider, name), entry in merged.items():
+            if entry['context_limit'] is None:
+                entry['context_limit'] = default_limit
+            if provider == 'ollama' and entry['source'] == 'config' and discovered_names:
+                entry['available'] = name in discovered_names or f"{name}:latest" in discovered_names
+        
+        return list(merged.values())
@@ -0,0 +1,351 @@
+"""
+LLM providers - Async provider layer shared by the executor and agent implementations
+"""
+from typing import Dict, Any, List, Optional, AsyncIterator
+import asyncio
+import json
+import time
+
+from src.utils.config_loader import ConfigLoader
+from src.utils.async_runner import AsyncRunner
+from src.llm.client_pool import ClientPool
+from src.llm.router import Deployment, ModelRouter
+from src.llm.stub import StubGenerator, StubSettings
+
+class LLMProvider:
+    """Base class for LLM providers"""
+    
+    name = "base"
+    
+    async def complete(self, deployment: Deployment, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """Run a chat completion and return content, tokens and finish reason"""
+        raise NotImplementedError("Subclasses must implement complete method")
+    
+    async def stream(self, deployment: Deployment, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a chat completion as 'delta' events followed by one 'done' event"""
+        
+        # Providers without native streaming deliver the whole response as one delta
+        result = await self.complete(deployment, messages, temperature, max_tokens)
+        
+        yield {'type': 'delta', 'content': result['content']}
+        yield {
+            'type': 'done',
+            'tokens': result['tokens'],
+            'usage': result.get('usage'),
+            'finish_reason': result.get('finish_reason')
+        }
+
+class StubProvider(LLMProvider):
+    """Seeded stub responses played back with configurable TTFT, token rate and failures"""
+    
+    name = "stub"
+    
+    def __init__(self, generator: Optional[StubGenerator] = None):
+        self._generator = generator
+    
+    @property
+    def generator(self) -> StubGenerator:
+        """Get the generator, reading config.yaml on first use"""
+        if self._generator is None:
+            self._generator = StubGenerator()
+        return self._generator
+    
+    async def complete(self, deployment: Deployment, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """Return the whole stub response after the time a real deployment would take"""
+        
+        response = self.generator.plan(deployment.model, messages, max_tokens)
+        
+        if response.error:
+            await asyncio.sleep(response.ttft)
+            raise response.error
+        
+        await asyncio.sleep(response.duration)
+        
+        return {
+            'content': response.content,
+            'tokens': response.usage['total_tokens'],
+            'usage': response.usage,
+            'finish_reason': response.finish_reason
+        }
+    
+    async def stream(self, deployment: Deployment, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the stub response token by token"""
+        
+        response = self.generator.plan(deployment.model, messages, max_tokens)
+        await asyncio.sleep(response.ttft)
+        
+        if response.error:
+            raise response.error
+        
+        for i, token in enumerate(response.tokens):
+            if i:
+                await asyncio.sleep(response.interval)
+            yield {'type': 'delta', 'content': token}
+        
+        yield {
+            'type': 'done',
+            'tokens': response.usage['total_tokens'],
+            'usage': response.usage,
+            'finish_reason': response.finish_reason
+        }
+
+# Contextual demo responses; {message} and {model} are filled in per request
+DEMO_RESPONSES = [
+    "Thank you for your question about '{message}...'. Based on my understanding, here's what I can help you with:\n\n1. I've analyzed your request carefully\n2. I can provide detailed information on this topic\n3. Let me guide you through the solution step by step\n\nThis is a demo response showing how the agent would interact with you. In production, this would be powered by {model}.",
+    
+    "I understand you're asking about: '{message}...'\n\nHere's my analysis:\n- This is an interesting question that requires careful consideration\n- Based on the context, I recommend the following approach\n- Let's break this down into manageable steps\n\nNote: This is a demonstration response. The actual agent would use {model} to provide real-time, intelligent responses.",
+    
+    "Great question! Regarding '{message}...', I can help with that.\n\nKey points to consider:\n• Understanding the requirements\n• Evaluating different approaches\n• Implementing the best solution\n• Testing and validation\n\nThis demo showcases the agent's capabilities. In production mode, responses would be generated by {model} with real-time intelligence."
+]
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI or Azure OpenAI through pooled native async clients"""
+    
+    name = "openai"
+    
+    async def complete(self, deployment: Deployment, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """Call OpenAI or Azure OpenAI"""
+        
+        client = ClientPool.get_async_client(deployment.provider, **deployment.settings)
+        
+        response = await client.chat.completions.create(
+            model=deployment.name,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        
+        return {
+            'content': response.choices[0].message.content,
+            'tokens': response.usage.total_tokens,
+            'usage': {
+                'prompt_tokens': response.usage.prompt_tokens,
+                'completion_tokens': response.usage.completion_tokens,
+                'total_tokens': response.usage.total_tokens
+            },
+            'finish_reason': response.choices[0].finish_reason
+        }
+    
+    async def stream(self, deployment: Deployment, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> AsyncIterator[Dict[str, Any]]:
+        """Stream OpenAI or Azure OpenAI token deltas"""
+        
+        client = ClientPool.get_async_client(deployment.provider, **deployment.settings)
+        
+        extra_args = {}
+        if deployment.provider == 'openai':
+            # Older Azure API versions reject stream_options
+            extra_args['stream_options'] = {'include_usage': True}
+        
+        response = await client.chat.completions.create(
+            model=deployment.name,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            **extra_args
+        )
+        
+        finish_reason = None
+        usage = None
+        
+        try:
+            async for chunk in response:
+                if getattr(chunk, 'usage', None):
+                    usage = {
+                        'prompt_tokens': chunk.usage.prompt_tokens,
+                        'completion_tokens': chunk.usage.completion_tokens,
+                        'total_tokens': chunk.usage.total_tokens
+                    }
+                
+                if not chunk.choices:
+                    continue
+                
+                choice = chunk.choices[0]
+                if choice.delta and choice.delta.content:
+                    yield {'type': 'delta', 'content': choice.delta.content}
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+        finally:
+            # Closing releases the connection back to the pool, also when the consumer cancels
+            await response.close()
+        
+        yield {
+            'type': 'done',
+            'tokens': usage['total_tokens'] if usage else 0,
+            'usage': usage,
+            'finish_reason': finish_reason
+        }
+
+class OllamaProvider(LLMProvider):
+    """Local models through Ollama's native chat API on pooled async HTTP connections"""
+    
+    name = "ollama"
+    
+    def __init__(self):
+        self._preloaded: Dict[str, float] = {}
+    
+    async def complete(self, deployment: Deployment, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """Call Ollama /api/chat"""
+        
+        client = ClientPool.get_async_client('ollama', **deployment.settings)
+        
+        response = await client.post('/api/chat', json=self._payload(deployment, messages, temperature, max_tokens, stream=False))
+        response.raise_for_status()
+        data = response.json()
+        
+        usage = self._usage(data)
+        return {
+            'content': data.get('message', {}).get('content', ''),
+            'tokens': usage['total_tokens'],
+            'usage': usage,
+            'finish_reason': data.get('done_reason', 'stop')
+        }
+    
+    async def stream(self, deployment: Deployment, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> AsyncIterator[Dict[str, Any]]:
+        """Stream Ollama's newline-delimited JSON chunks as token deltas"""
+        
+        client = ClientPool.get_async_client('ollama', **deployment.settings)
+        payload = self._payload(deployment, messages, temperature, max_tokens, stream=True)
+        
+        # Leaving the context manager releases the connection, also when the consumer cancels
+        async with client.stream('POST', '/api/chat', json=payload) as response:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise RuntimeError(f"Ollama error: {chunk['error']}")
+                
+                content = chunk.get('message', {}).get('content')
+                if content:
+                    yield {'type': 'delta', 'content': content}
+                
+                if chunk.get('done'):
+                    usage = self._usage(chunk)
+                    yield {
+                        'type': 'done',
+                        'tokens': usage['total_tokens'],
+                        'usage': usage,
+                        'finish_reason': chunk.get('done_reason', 'stop')
+                    }
+    
+    async def preload(self, deployment: Deployment):
+        """Load a model into memory and pin it for keep_alive, so the first request skips the cold load"""
+        
+        keep_alive = self._keep_alive()
+        loaded_at = self._preloaded.get(deployment.key)
+        if loaded_at is not None and time.monotonic() - loaded_at < self._keep_alive_seconds(keep_alive):
+            return
+        
+        client = ClientPool.get_async_client('ollama', **deployment.settings)
+        
+        try:
+            # A generate request without a prompt only loads the model
+            response = await client.post('/api/generate', json={'model': deployment.name, 'keep_alive': keep_alive})
+            response.raise_for_status()
+            self._preloaded[deployment.key] = time.monotonic()
+        except Exception as e:
+            print(f"Error preloading Ollama model {deployment.name}: {e}")
+    
+    def _payload(self, deployment: Deployment, messages: List[Dict[str, str]], temperature: float, max_tokens: int, stream: bool) -> Dict[str, Any]:
+        """Build an /api/chat request"""
+        return {
+            'model': deployment.name,
+            'messages': messages,
+            'stream': stream,
+            'keep_alive': self._keep_alive(),
+            'options': {'temperature': temperature, 'num_predict': max_tokens}
+        }
+    
+    def _usage(self, data: Dict[str, Any]) -> Dict[str, int]:
+        """Map Ollama's eval counters to OpenAI-style usage"""
+        prompt_tokens = data.get('prompt_eval_count', 0)
+        completion_tokens = data.get('eval_count', 0)
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+    
+    def _keep_alive(self) -> Any:
+        """How long Ollama keeps a model loaded after a request; -1 pins it"""
+        return ConfigLoader.get('llm_providers.ollama.keep_alive', '30m')
+    
+    def _keep_alive_seconds(self, keep_alive: Any) -> float:
+        """Convert an Ollama keep_alive ("30m", "1h", 300, -1) to seconds"""
+        
+        if isinstance(keep_alive, (int, float)):
+            return float('inf') if keep_alive < 0 else float(keep_alive)
+        
+        units = {'s': 1, 'm': 60, 'h': 3600}
+        value = str(keep_alive).strip()
+        try:
+            if value and value[-1] in units:
+                seconds = float(value[:-1]) * units[value[-1]]
+            else:
+                seconds = float(value)
+        except ValueError:
+            return 0.0
+        
+        return float('inf') if seconds < 0 else seconds
+
+# Demo mode answers instantly and never fails
+_demo_provider = StubProvider(StubGenerator(StubSettings(ttft=0, tokens_per_second=0), DEMO_RESPONSES))
+_stub_provider = StubProvider()
+_openai_provider = OpenAIProvider()
+_ollama_provider = OllamaProvider()
+
+def is_demo_mode() -> bool:
+    """Check if in demo mode"""
+    api_key = ConfigLoader.get_env("OPENAI_API_KEY")
+    return api_key == "demo-mode" or ConfigLoader.get_env("APP_ENV") == "demo"
+
+_providers: Dict[str, LLMProvider] = {
+    'demo': _demo_provider,
+    'stub': _stub_provider,
+    'azure_openai': _openai_provider,
+    'openai': _openai_provider,
+    'ollama': _ollama_provider
+}
+
+def get_provider(name: str) -> LLMProvider:
+    """Get the provider implementation for a deployment's provider name"""
+    
+    if name not in _providers:
+        raise ValueError(f"Unsupported provider: {name}")
+    
+    return _providers[name]
+
+async def complete(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+    """Run a chat completion on the deployment the router picks for the model"""
+    return await ModelRouter.get_instance().complete(model, messages, temperature, max_tokens)
+
+async def stream(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> AsyncIterator[Dict[str, Any]]:
+    """Stream a chat completion from the deployment the router picks for the model"""
+    async for event in ModelRouter.get_instance().stream(model, messages, temperature, max_tokens):
+        yield event
+
+def preload_models(models: List[str]):
+    """Load the local models among these into Ollama in the background"""
+    
+    router = ModelRouter.get_instance()
+    deployments = []
+    
+    for model in dict.fromkeys(models):
+        try:
+            deployments.extend(d for d in router.deployments_for(model) if d.provider == 'ollama')
+        except ValueError:
+            continue
+    
+    if not deployments:
+        return
+    
+    async def preload_all():
+        await asyncio.gather(*(_ollama_provider.preload(deployment) for deployment in deployments))
+    
+    AsyncRunner.submit(preload_all())
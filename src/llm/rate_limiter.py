@@ -0,0 +1,171 @@
+"""
+Rate limiter - Client-side token buckets for per-deployment RPM/TPM quotas
+"""
+from typing import Dict, Any, Optional, Tuple
+from collections import deque
+import asyncio
+import threading
+import time
+
+from src.utils.config_loader import ConfigLoader
+
+WINDOW_SECONDS = 60.0
+
+class DeploymentLimiter:
+    """Requests-per-minute and tokens-per-minute buckets for one deployment"""
+    
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._recent: deque = deque()
+        self._stats = {'requests': 0, 'tokens': 0, 'throttled': 0, 'wait_seconds': 0.0, 'queued': 0}
+    
+    async def acquire(self, cost: int):
+        """Wait until one request costing cost tokens fits the quotas"""
+        
+        wait = self.reserve(cost)
+        if wait <= 0:
+            return
+        
+        # Queue instead of failing with a 429 from the provider
+        with self._lock:
+            self._stats['queued'] += 1
+        
+        try:
+            await asyncio.sleep(wait)
+        finally:
+            with self._lock:
+                self._stats['queued'] -= 1
+    
+    def reserve(self, cost: int) -> float:
+        """Take one request and cost tokens from the buckets; return seconds to wait
+        
+        Buckets may go negative: each caller reserves its share immediately and
+        waits out the deficit, so waiting requests are served in arrival order.
+        """
+        
+        now = time.monotonic()
+        
+        with self._lock:
+            self._refill(now)
+            wait = 0.0
+            
+            if self.rpm:
+                self._requests -= 1
+                if self._requests < 0:
+                    wait = max(wait, -self._requests / (self.rpm / WINDOW_SECONDS))
+            
+            if self.tpm:
+                # A request larger than the whole quota could never be admitted
+                self._tokens -= min(cost, self.tpm)
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / (self.tpm / WINDOW_SECONDS))
+            
+            self._recent.append((now + wait, cost))
+            self._stats['requests'] += 1
+            self._stats['tokens'] += cost
+            if wait > 0:
+                self._stats['throttled'] += 1
+                self._stats['wait_seconds'] += wait
+            
+            return wait
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get current utilization of the quotas over the last minute"""
+        
+        now = time.monotonic()
+        
+        with self._lock:
+            while self._recent and self._recent[0][0] < now - WINDOW_SECONDS:
+                self._recent.popleft()
+            
+            requests_last_minute = sum(1 for sent_at, _ in self._recent if sent_at <= now)
+            tokens_last_minute = sum(cost for sent_at, cost in self._recent if sent_at <= now)
+            stats = dict(self._stats)
+        
+        stats.update({
+            'rpm_limit': self.rpm,
+            'tpm_limit': self.tpm,
+            'requests_last_minute': requests_last_minute,
+            'tokens_last_minute': tokens_last_minute,
+            'rpm_utilization': requests_last_minute / self.rpm if self.rpm else None,
+            'tpm_utilization': tokens_last_minute / self.tpm if self.tpm else None
+        })
+        
+        return stats
+    
+    def _refill(self, now: float):
+        """Refill both buckets for the time elapsed since the last update"""
+        
+        elapsed = now - self._updated
+        self._updated = now
+        
+        if self.rpm:
+            self._requests = min(float(self.rpm), self._requests + elapsed * self.rpm / WINDOW_SECONDS)
+        if self.tpm:
+            self._tokens = min(float(self.tpm), self._tokens + elapsed * self.tpm / WINDOW_SECONDS)
+
+class RateLimiter:
+    """Queues LLM requests so each (provider, deployment) stays within its quota"""
+    
+    _instance: Optional['RateLimiter'] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self):
+        self._limiters: Dict[Tuple[str, str], DeploymentLimiter] = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def get_instance(cls) -> 'RateLimiter':
+        """Get the process-wide rate limiter"""
+        
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        
+        return cls._instance
+    
+    async def acquire(self, provider: str, deployment: str, cost: int):
+        """Wait until a request costing cost tokens may be sent"""
+        
+        if not ConfigLoader.get('rate_limits.enabled', True):
+            return
+        
+        limiter = self._get_limiter(provider, deployment)
+        if not limiter.rpm and not limiter.tpm:
+            return
+        
+        await limiter.acquire(cost)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get utilization per deployment"""
+        
+        with self._lock:
+            limiters = dict(self._limiters)
+        
+        return {f"{provider}/{deployment}": limiter.get_stats() for (provider, deployment), limiter in limiters.items()}
+    
+    def _get_limiter(self, provider: str, deployment: str) -> DeploymentLimiter:
+        """Get (or create) the limiter for a deployment from config.yaml"""
+        
+        key = (provider, deployment)
+        limiter = self._limiters.get(key)
+        
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(key)
+                if limiter is None:
+                    settings = ConfigLoader.get('rate_limits', {})
+                    quota = {
+                        **settings.get('default', {}),
+                        **settings.get('deployments', {}).get(f"{provider}/{deployment}", {})
+                    }
+                    limiter = DeploymentLimiter(rpm=quota.get('rpm', 0), tpm=quota.get('tpm', 0))
+                    self._limiters[key] = limiter
+        
+        return limiter
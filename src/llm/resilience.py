@@ -0,0 +1,327 @@
+"""
+Resilience - Retries with jittered backoff and per-deployment circuit breakers for LLM calls
+"""
+from typing import Dict, Any, Optional, Callable, Awaitable, AsyncIterator
+from email.utils import parsedate_to_datetime
+import threading
+import time
+
+# Optional imports for production mode
+try:
+    import tenacity
+except ImportError:
+    tenacity = None
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from src.utils.config_loader import ConfigLoader
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a deployment whose circuit breaker is open"""
+    pass
+
+def _connection_errors() -> tuple:
+    """Exception types that mean the request never got a response"""
+    
+    errors = [ConnectionError, TimeoutError]
+    if openai is not None:
+        errors.append(openai.APIConnectionError)
+    if httpx is not None:
+        errors.append(httpx.TransportError)
+    
+    return tuple(errors)
+
+CONNECTION_ERRORS = _connection_errors()
+
+def status_code_of(error: BaseException) -> Optional[int]:
+    """Get the HTTP status code of a provider error, if it has one"""
+    
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None and getattr(error, 'response', None) is not None:
+        status_code = getattr(error.response, 'status_code', None)
+    
+    return status_code
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient errors: rate limits, server errors, timeouts and dropped connections"""
+    
+    if isinstance(error, CircuitOpenError):
+        return False
+    
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    
+    return status_code_of(error) in RETRYABLE_STATUS_CODES
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Read the server's requested delay from Retry-After / retry-after-ms headers"""
+    
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000.0
+        
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open trial after a cool-down"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {'attempts': 0, 'retries': 0, 'successes': 0, 'failures': 0, 'short_circuited': 0, 'opened': 0, 'cancelled': 0}
+    
+    def before_call(self):
+        """Allow a call or fail fast while the deployment is unhealthy"""
+        
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            
+            # Half-open lets exactly one trial request through
+            if self.state == self.OPEN or (self.state == self.HALF_OPEN and self._trial_in_flight):
+                self._stats['short_circuited'] += 1
+                raise CircuitOpenError("Circuit breaker is open; deployment marked unhealthy")
+            
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = True
+            
+            self._stats['attempts'] += 1
+    
+    def is_available(self) -> bool:
+        """Check whether a call would be let through, without counting one"""
+        
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self._opened_at >= self.recovery_timeout
+            
+            return not (self.state == self.HALF_OPEN and self._trial_in_flight)
+    
+    def record_success(self):
+        """Close the circuit after a successful call"""
+        
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self.state = self.CLOSED
+            self._stats['successes'] += 1
+    
+    def record_failure(self, error: BaseException):
+        """Count a failure; only transient errors count towards opening the circuit"""
+        
+        with self._lock:
+            self._stats['failures'] += 1
+            self._trial_in_flight = False
+            
+            if not is_retryable(error):
+                return
+            
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self._stats['opened'] += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+    
+    def record_cancelled(self):
+        """Release a call that was cancelled before it finished; it says nothing about the deployment"""
+        
+        with self._lock:
+            self._trial_in_flight = False
+            self._stats['cancelled'] += 1
+    
+    def record_retry(self):
+        """Count a retry"""
+        with self._lock:
+            self._stats['retries'] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state and retry counters"""
+        with self._lock:
+            return {**self._stats, 'state': self.state, 'consecutive_failures': self._failures}
+
+if tenacity is not None:
+    class wait_retry_after(tenacity.wait.wait_base):
+        """Jittered exponential backoff that never waits less than the server's Retry-After"""
+        
+        def __init__(self, base: float, maximum: float):
+            self.backoff = tenacity.wait_random_exponential(multiplier=base, max=maximum)
+            self.maximum = maximum
+        
+        def __call__(self, retry_state) -> float:
+            delay = self.backoff(retry_state)
+            outcome = retry_state.outcome
+            
+            if outcome is not None and outcome.failed:
+                requested = retry_after(outcome.exception())
+                if requested is not None:
+                    delay = max(delay, min(requested, self.maximum))
+            
+            return delay
+
+class Resilience:
+    """Runs LLM calls with retries and a circuit breaker per provider/deployment"""
+    
+    _instance: Optional['Resilience'] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self):
+        settings = ConfigLoader.get('resilience', {})
+        breaker_settings = settings.get('circuit_breaker', {})
+        self.max_attempts = settings.get('max_attempts', 4)
+        self.backoff_base = settings.get('backoff_base', 0.5)
+        self.backoff_max = settings.get('backoff_max', 20)
+        self.failure_threshold = breaker_settings.get('failure_threshold', 5)
+        self.recovery_timeout = breaker_settings.get('recovery_timeout', 30)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def get_instance(cls) -> 'Resilience':
+        """Get the process-wide resilience layer"""
+        
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        
+        return cls._instance
+    
+    def get_breaker(self, key: str) -> CircuitBreaker:
+        """Get (or create) the circuit breaker for a provider/deployment"""
+        
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+                    self._breakers[key] = breaker
+        
+        return breaker
+    
+    async def call(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Call fn with retries, failing fast while the breaker for key is open"""
+        
+        breaker = self.get_breaker(key)
+        
+        async def attempt() -> Any:
+            breaker.before_call()
+            try:
+                result = await fn()
+            except Exception as e:
+                breaker.record_failure(e)
+                raise
+            except BaseException:
+                # Cancelled (e.g. by a caller's wait_for); a half-open trial must not stay in flight
+                breaker.record_cancelled()
+                raise
+            breaker.record_success()
+            return result
+        
+        if tenacity is None:
+            return await attempt()
+        
+        retrying = self._retrying(breaker)
+        return await retrying(attempt)
+    
+    async def stream(self, key: str, fn: Callable[[], AsyncIterator[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+        """Stream fn with retries until the first event arrives
+        
+        Once tokens have been delivered a failure is raised instead of retried,
+        since the caller has already seen part of the response.
+        """
+        
+        breaker = self.get_breaker(key)
+        
+        async def open_stream():
+            breaker.before_call()
+            events = fn()
+            try:
+                first = await events.__anext__()
+            except StopAsyncIteration:
+                breaker.record_success()
+                return events, None
+            except Exception as e:
+                breaker.record_failure(e)
+                raise
+            except BaseException:
+                breaker.record_cancelled()
+                await events.aclose()
+                raise
+            return events, first
+        
+        if tenacity is None:
+            events, first = await open_stream()
+        else:
+            events, first = await self._retrying(breaker)(open_stream)
+        
+        if first is None:
+            return
+        
+        failed = False
+        
+        try:
+            yield first
+            async for event in events:
+                yield event
+        except Exception as e:
+            failed = True
+            breaker.record_failure(e)
+            raise
+        finally:
+            await events.aclose()
+            # An abandoned stream still proves the deployment is answering
+            if not failed:
+                breaker.record_success()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get retry and breaker metrics per provider/deployment"""
+        
+        with self._lock:
+            breakers = dict(self._breakers)
+        
+        return {key: breaker.get_stats() for key, breaker in breakers.items()}
+    
+    def _retrying(self, breaker: CircuitBreaker) -> Any:
+        """Build the tenacity retry policy for one call"""
+        return tenacity.AsyncRetrying(
+            stop=tenacity.stop_after_attempt(self.max_attempts),
+            wait=wait_retry_after(self.backoff_base, self.backoff_max),
+            retry=tenacity.retry_if_exception(is_retryable),
+            before_sleep=lambda retry_state: breaker.record_retry(),
+            reraise=True
+        )
@@ -0,0 +1,264 @@
+"""
+Response cache - Exact-match LLM response cache with an in-memory LRU and optional disk tier
+"""
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from pathlib import Path
+import asyncio
+import atexit
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+from src.utils.config_loader import ConfigLoader
+
+CACHE_POLICIES = ("always", "deterministic", "never")
+
+class ResponseCache:
+    """LRU + TTL cache of LLM responses keyed by (model, messages, temperature, max_tokens)
+    
+    The memory tier is read inline. Disk reads from async callers (aget) run in a thread,
+    and disk writes are queued for a background writer, so the event loop never waits
+    on SQLite.
+    """
+    
+    _instance: Optional['ResponseCache'] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600, disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writes: "queue.Queue[tuple]" = queue.Queue()
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'sets': 0}
+        
+        if disk_path:
+            self._open_disk_tier(disk_path)
+    
+    @classmethod
+    def get_instance(cls) -> 'ResponseCache':
+        """Get the process-wide cache configured from config.yaml"""
+        
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    settings = ConfigLoader.get('response_cache', {})
+                    disk = settings.get('disk', {})
+                    cls._instance = cls(
+                        max_entries=settings.get('max_entries', 1000),
+                        ttl=settings.get('ttl', 3600),
+                        disk_path=disk.get('path') if disk.get('enabled') else None
+                    )
+        
+        return cls._instance
+    
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        """Build a stable cache key for a request"""
+        payload = json.dumps(
+            {'model': model, 'messages': messages, 'temperature': temperature, 'max_tokens': max_tokens},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def should_cache(policy: Optional[str], temperature: float) -> bool:
+        """Check whether a request may be served from and stored in the cache"""
+        
+        if not ConfigLoader.get('response_cache.enabled', True):
+            return False
+        
+        policy = policy or ConfigLoader.get('response_cache.default_policy', 'deterministic')
+        
+        if policy == 'always':
+            return True
+        elif policy == 'deterministic':
+            return temperature == 0
+        else:
+            return False
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached response, or None on a miss"""
+        
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        
+        return self._disk_lookup(key, now)
+    
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached response without blocking the event loop on the disk tier"""
+        
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        if self._db is None:
+            return self._disk_lookup(key, now)  # only counts the miss
+        
+        return await asyncio.to_thread(self._disk_lookup, key, now)
+    
+    def set(self, key: str, value: Dict[str, Any]):
+        """Store a response; the disk write happens in the background"""
+        
+        now = time.time()
+        
+        with self._lock:
+            self._store(key, value, now)
+            self._stats['sets'] += 1
+        
+        if self._db is not None:
+            self._writes.put((
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl)
+            ))
+    
+    def clear(self):
+        """Remove all entries from both tiers"""
+        
+        with self._lock:
+            self._entries.clear()
+        
+        if self._db is not None:
+            self._writes.put(("DELETE FROM responses", ()))
+            self.flush()
+    
+    def flush(self, timeout: Optional[float] = None):
+        """Wait until every queued disk write has been committed"""
+        
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self._writes.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.01)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit, miss and eviction counters"""
+        
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        stats['disk_enabled'] = self._db is not None
+        stats['disk_pending'] = self._writes.qsize()
+        
+        return stats
+    
+    def _memory_get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        """Read an unexpired entry from the memory tier"""
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            value, expires_at = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return value
+            
+            del self._entries[key]
+            self._stats['expirations'] += 1
+            return None
+    
+    def _disk_lookup(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        """Read the disk tier after a memory miss and count the outcome"""
+        
+        value = self._disk_get(key, now)
+        
+        with self._lock:
+            if value is not None:
+                # Promote to memory so the next lookup skips the disk
+                self._store(key, value, now)
+                self._stats['disk_hits'] += 1
+            else:
+                self._stats['misses'] += 1
+        
+        return value
+    
+    def _store(self, key: str, value: Dict[str, Any], now: float):
+        """Insert into the memory tier, evicting least recently used entries"""
+        
+        self._entries[key] = (value, now + self.ttl)
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+    
+    def _open_disk_tier(self, disk_path: str):
+        """Open the SQLite tier that survives restarts"""
+        
+        try:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+        except Exception as e:
+            print(f"Error opening response cache at {disk_path}: {e}")
+            self._db = None
+            return
+        
+        self._writer = threading.Thread(target=self._write_loop, name="response-cache-writer", daemon=True)
+        self._writer.start()
+        
+        # The writer is a daemon thread; give queued writes a chance to land on exit
+        atexit.register(self.flush, 2.0)
+    
+    def _disk_get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        """Read an unexpired entry from the disk tier"""
+        
+        if self._db is None:
+            return None
+        
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        if row[1] <= now:
+            self._writes.put(("DELETE FROM responses WHERE key = ? AND expires_at <= ?", (key, now)))
+            with self._lock:
+                self._stats['expirations'] += 1
+            return None
+        
+        return json.loads(row[0])
+    
+    def _write_loop(self):
+        """Commit queued disk writes, batching those that arrive together"""
+        
+        while True:
+            batch = [self._writes.get()]
+            while True:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                with self._db_lock:
+                    with self._db:
+                        for statement, params in batch:
+                            self._db.execute(statement, params)
+            except Exception as e:
+                print(f"Error writing response cache: {e}")
+            finally:
+                for _ in batch:
+                    self._writes.task_done()
@@ -0,0 +1,405 @@
+"""
+Model router - Spreads logical models across deployments by live latency and error rate
+"""
+from typing import Dict, Any, List, Optional, AsyncIterator
+from dataclasses import dataclass, field
+import random
+import threading
+import time
+
+from src.utils.config_loader import ConfigLoader
+from src.llm.client_pool import ClientPool
+from src.llm.token_counter import TokenCounter
+from src.llm.rate_limiter import RateLimiter
+from src.llm.resilience import Resilience
+from src.llm.stub import stub_mode
+
+ROUTING_POLICIES = ['least_outstanding', 'weighted']
+
+# Providers that speak the OpenAI chat completions API
+OPENAI_COMPATIBLE = ('azure_openai', 'openai')
+
+@dataclass
+class Deployment:
+    """One endpoint that serves a logical model"""
+    id: str
+    provider: str
+    model: str
+    name: str
+    settings: Dict[str, Any] = field(default_factory=dict)
+    region: Optional[str] = None
+    weight: float = 1.0
+    
+    @property
+    def key(self) -> str:
+        """Key used for rate limits, circuit breakers and routing stats"""
+        return f"{self.provider}/{self.id}"
+
+class DeploymentStats:
+    """Exponentially weighted latency and error rate of one deployment"""
+    
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+    
+    def record(self, latency: Optional[float], failed: bool):
+        """Fold one finished request into the moving averages"""
+        
+        self.requests += 1
+        self.error_rate += self.alpha * ((1.0 if failed else 0.0) - self.error_rate)
+        
+        if failed:
+            self.errors += 1
+        elif latency is not None:
+            self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            'ewma_latency': round(self.latency, 4) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 4),
+            'outstanding': self.outstanding,
+            'requests': self.requests,
+            'errors': self.errors
+        }
+
+class ModelRouter:
+    """Picks a deployment per request and falls back to alternate models"""
+    
+    _instance: Optional['ModelRouter'] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self):
+        settings = ConfigLoader.get('llm_routing', {})
+        self.policy = settings.get('policy', 'least_outstanding')
+        self.alpha = settings.get('ewma_alpha', 0.3)
+        self.error_penalty = settings.get('error_penalty', 4.0)
+        
+        if self.policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown routing policy: {self.policy}")
+        
+        self._stats: Dict[str, DeploymentStats] = {}
+        self._deployments: Dict[str, Deployment] = {}
+        self._failovers = 0
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def get_instance(cls) -> 'ModelRouter':
+        """Get the process-wide model router"""
+        
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        
+        return cls._instance
+    
+    def route(self, model: str) -> List[Deployment]:
+        """Get the deployments to try for a model, best first, then its fallback models"""
+        
+        candidates = self._rank(self.deployments_for(model))
+        
+        for fallback in self._model_config(model).get('fallbacks', []):
+            try:
+                candidates.extend(self._rank(self.deployments_for(fallback)))
+            except ValueError as e:
+                print(f"Error resolving fallback model {fallback}: {e}")
+        
+        # A fallback served by the same deployment would only repeat the failure
+        unique = {}
+        for deployment in candidates:
+            unique.setdefault(deployment.key, deployment)
+        
+        return list(unique.values())
+    
+    def deployments_for(self, model: str) -> List[Deployment]:
+        """Get every configured deployment that serves a model"""
+        
+        # Imported here, since providers depends on this module
+        from src.llm.providers import is_demo_mode
+        
+        provider = self._provider_of(model)
+        if provider is None:
+            raise ValueError(f"Unsupported model: {model}")
+        
+        if provider in OPENAI_COMPATIBLE:
+            mode = stub_mode()
+            if mode == 'in_process':
+                return [Deployment(id='stub', provider='stub', model=model, name=model)]
+            if mode == 'http':
+                # The OpenAI client against a local stub server exercises the full HTTP path
+                settings = {
+                    'endpoint': ConfigLoader.get_env("STUB_LLM_BASE_URL") or ConfigLoader.get('stub_llm.base_url', 'http://localhost:8100/v1'),
+                    'api_version': None,
+                    'api_key': 'stub'
+                }
+                return [Deployment(id='stub-http', provider='openai', model=model, name=model, settings=settings)]
+            if is_demo_mode():
+                return [Deployment(id='demo', provider='demo', model=model, name=model)]
+        
+        deployments = []
+        
+        for entry in ConfigLoader.get(f'llm_providers.{provider}.deployments', None) or []:
+            if model not in entry.get('models', [entry.get('model')]):
+                continue
+            
+            settings = self._deployment_settings(provider, entry)
+            if settings is None:
+                continue
+            
+            name = entry.get('deployment', model)
+            deployments.append(Deployment(
+                id=entry.get('id', name),
+                provider=provider,
+                model=model,
+                name=name,
+                settings=settings,
+                region=entry.get('region'),
+                weight=entry.get('weight', 1.0)
+            ))
+        
+        if deployments:
+            return deployments
+        
+        # No deployment list for this model: the single deployment from the environment
+        if provider in OPENAI_COMPATIBLE:
+            azure_settings = ClientPool.resolve_settings('azure_openai')
+            if azure_settings:
+                name = ConfigLoader.get_env("AZURE_OPENAI_DEPLOYMENT_NAME", model)
+                return [Deployment(id=name, provider='azure_openai', model=model, name=name, settings=azure_settings)]
+            
+            openai_settings = ClientPool.resolve_settings('openai')
+            if not openai_settings:
+                raise ValueError("No OpenAI API key configured")
+            
+            return [Deployment(id=model, provider='openai', model=model, name=model, settings=openai_settings)]
+        
+        settings = ClientPool.resolve_settings(provider)
+        if settings is None:
+            raise ValueError(f"Provider {provider} is not configured")
+        
+        return [Deployment(id=model, provider=provider, model=model, name=model, settings=settings)]
+    
+    async def complete(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """Run a chat completion on the best deployment, failing over down the route"""
+        
+        # Imported here, since providers depends on this module
+        from src.llm.providers import get_provider
+        
+        last_error: Optional[Exception] = None
+        
+        for attempt, deployment in enumerate(self.route(model)):
+            provider = get_provider(deployment.provider)
+            
+            async def send() -> Dict[str, Any]:
+                # Quota is taken per attempt, since every retry is a new request
+                await self._acquire_quota(deployment, messages, max_tokens)
+                return await provider.complete(deployment, messages, temperature, max_tokens)
+            
+            stats = self._begin(deployment, attempt)
+            start_time = time.perf_counter()
+            
+            try:
+                result = await Resilience.get_instance().call(deployment.key, send)
+            except Exception as e:
+                self._finish(stats, None, failed=True)
+                last_error = e
+                print(f"Error calling {deployment.key}: {e}")
+                continue
+            
+            self._finish(stats, time.perf_counter() - start_time, failed=False)
+            return {**result, 'deployment': deployment.key}
+        
+        raise last_error or ValueError(f"No deployment available for {model}")
+    
+    async def stream(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> AsyncIterator[Dict[str, Any]]:
+        """Stream from the best deployment; failover is only possible before the first token"""
+        
+        from src.llm.providers import get_provider
+        
+        last_error: Optional[Exception] = None
+        
+        for attempt, deployment in enumerate(self.route(model)):
+            provider = get_provider(deployment.provider)
+            
+            async def open_stream() -> AsyncIterator[Dict[str, Any]]:
+                await self._acquire_quota(deployment, messages, max_tokens)
+                async for event in provider.stream(deployment, messages, temperature, max_tokens):
+                    yield event
+            
+            stats = self._begin(deployment, attempt)
+            start_time = time.perf_counter()
+            events = Resilience.get_instance().stream(deployment.key, open_stream)
+            started = False
+            failed = False
+            
+            try:
+                async for event in events:
+                    if not started:
+                        # Streams are ranked by time to first token
+                        started = True
+                        latency = time.perf_counter() - start_time
+                    
+                    if event['type'] == 'done':
+                        event = {**event, 'deployment': deployment.key}
+                    
+                    yield event
+            except Exception as e:
+                failed = True
+                if started:
+                    raise
+                last_error = e
+                print(f"Error streaming from {deployment.key}: {e}")
+            finally:
+                await events.aclose()
+                self._finish(stats, latency if started else None, failed)
+            
+            if not failed:
+                return
+        
+        raise last_error or ValueError(f"No deployment available for {model}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing policy and live stats per deployment"""
+        
+        with self._lock:
+            deployments = {
+                key: {
+                    'model': self._deployments[key].model,
+                    'region': self._deployments[key].region,
+                    'weight': self._deployments[key].weight,
+                    **stats.to_dict()
+                }
+                for key, stats in self._stats.items()
+            }
+            
+            return {
+                'policy': self.policy,
+                'failovers': self._failovers,
+                'deployments': deployments
+            }
+    
+    def _rank(self, deployments: List[Deployment]) -> List[Deployment]:
+        """Order deployments by the routing policy, unhealthy ones last"""
+        
+        resilience = Resilience.get_instance()
+        healthy = [d for d in deployments if resilience.get_breaker(d.key).is_available()]
+        unhealthy = [d for d in deployments if d not in healthy]
+        
+        with self._lock:
+            stats = {d.key: self._stats.get(d.key) or DeploymentStats(self.alpha) for d in healthy}
+        
+        # Unmeasured deployments look as fast as the fastest known one, so they get a sample
+        measured = [s.latency for s in stats.values() if s.latency is not None]
+        baseline = min(measured) if measured else 1e-3
+        cost = {key: self._cost(s, baseline) for key, s in stats.items()}
+        
+        if self.policy == 'weighted':
+            ranked = self._rank_weighted(healthy, cost)
+        else:
+            ranked = sorted(healthy, key=lambda d: (stats[d.key].outstanding, cost[d.key]))
+        
+        return ranked + unhealthy
+    
+    def _rank_weighted(self, deployments: List[Deployment], cost: Dict[str, float]) -> List[Deployment]:
+        """Draw the first deployment at random by weight / cost, the rest by descending score"""
+        
+        remaining = list(deployments)
+        scores = {d.key: d.weight / cost[d.key] for d in deployments}
+        
+        if len(remaining) < 2 or sum(scores.values()) <= 0:
+            return remaining
+        
+        first = random.choices(remaining, weights=[scores[d.key] for d in remaining])[0]
+        remaining.remove(first)
+        
+        return [first] + sorted(remaining, key=lambda d: scores[d.key], reverse=True)
+    
+    def _cost(self, stats: DeploymentStats, baseline: float) -> float:
+        """Expected cost of a request: latency inflated by the recent error rate"""
+        latency = stats.latency if stats.latency is not None else baseline
+        return max(latency, 1e-3) * (1 + self.error_penalty * stats.error_rate)
+    
+    def _begin(self, deployment: Deployment, attempt: int) -> DeploymentStats:
+        """Count an outstanding request on a deployment"""
+        
+        with self._lock:
+            stats = self._stats.get(deployment.key)
+            if stats is None:
+                stats = DeploymentStats(self.alpha)
+                self._stats[deployment.key] = stats
+            
+            self._deployments[deployment.key] = deployment
+            stats.outstanding += 1
+            if attempt > 0:
+                self._failovers += 1
+            
+            return stats
+    
+    def _finish(self, stats: DeploymentStats, latency: Optional[float], failed: bool):
+        """Record the outcome of a request"""
+        with self._lock:
+            stats.outstanding -= 1
+            stats.record(latency, failed)
+    
+    async def _acquire_quota(self, deployment: Deployment, messages: List[Dict[str, str]], max_tokens: int):
+        """Wait for RPM/TPM quota; the cost is counted the way Azure does, prompt + max_tokens"""
+        cost = TokenCounter.count_messages(messages, deployment.model) + max_tokens
+        await RateLimiter.get_instance().acquire(deployment.provider, deployment.id, cost)
+    
+    def _provider_of(self, model: str) -> Optional[str]:
+        """Find the provider whose models in config.yaml include a model"""
+        
+        for provider, settings in (ConfigLoader.get('llm_providers', {}) or {}).items():
+            if any(entry.get('name') == model for entry in settings.get('models', [])):
+                return provider
+        
+        # Unlisted GPT models keep working through OpenAI or Azure OpenAI
+        return 'openai' if 'gpt' in model.lower() else None
+    
+    def _model_config(self, model: str) -> Dict[str, Any]:
+        """Get a model's entry from llm_providers in config.yaml"""
+        
+        for settings in (ConfigLoader.get('llm_providers', {}) or {}).values():
+            for entry in settings.get('models', []):
+                if entry.get('name') == model:
+                    return entry
+        
+        return {}
+    
+    def _deployment_settings(self, provider: str, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Resolve a configured deployment's endpoint and key, or None if its env vars are unset"""
+        
+        if provider == 'azure_openai':
+            endpoint = ConfigLoader.get_env(entry.get('endpoint_env', 'AZURE_OPENAI_ENDPOINT'))
+            api_key = ConfigLoader.get_env(entry.get('api_key_env', 'AZURE_OPENAI_API_KEY'))
+            
+            if not endpoint or not api_key or endpoint == "demo-mode":
+                return None
+            
+            return {
+                'endpoint': endpoint,
+                'api_version': entry.get('api_version') or ConfigLoader.get_env("AZURE_OPENAI_API_VERSION", "2024-02-15-preview"),
+                'api_key': api_key
+            }
+        
+        if provider == 'openai':
+            api_key = ConfigLoader.get_env(entry.get('api_key_env', 'OPENAI_API_KEY'))
+            if not api_key or api_key == "demo-mode":
+                return None
+        else:
+            api_key = ConfigLoader.get_env(entry['api_key_env']) if entry.get('api_key_env') else None
+        
+        endpoint = ConfigLoader.get_env(entry['endpoint_env']) if entry.get('endpoint_env') else entry.get('endpoint')
+        if not endpoint and provider != 'openai':
+            endpoint = (ClientPool.resolve_settings(provider) or {}).get('endpoint')
+        
+        return {
+            'endpoint': endpoint,
+            'api_version': entry.get('api_version'),
+            'api_key': api_key
+        }
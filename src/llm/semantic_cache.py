@@ -0,0 +1,311 @@
+"""
+Semantic cache - Reuse responses for paraphrased prompts via embeddings and a FAISS index
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import re
+import threading
+
+# Optional imports for semantic caching
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+from src.utils.config_loader import ConfigLoader
+from src.llm.client_pool import ClientPool
+from src.llm import providers
+
+class Embedder:
+    """Embeds text with the configured provider, falling back to a local CPU model"""
+    
+    def __init__(self, model: str, local_model: Optional[str] = None, dimensions: int = 512):
+        self.model = model
+        self.local_model_name = local_model
+        self.dimensions = dimensions
+        self._local_model = None
+        self._local_lock = threading.Lock()
+    
+    async def embed(self, text: str) -> Tuple[str, Any]:
+        """Return (embedder name, normalized float32 vector)"""
+        
+        target = self._provider_target()
+        
+        if target:
+            provider, settings, model = target
+            try:
+                client = ClientPool.get_async_client(provider, **settings)
+                response = await client.embeddings.create(model=model, input=text)
+                return f"{provider}:{model}", self._normalize(np.asarray(response.data[0].embedding, dtype='float32'))
+            except Exception as e:
+                print(f"Error embedding with {provider}, using local embeddings: {e}")
+        
+        return await self._embed_local(text)
+    
+    def _provider_target(self) -> Optional[Tuple[str, Dict[str, str], str]]:
+        """Resolve the remote embedding deployment, or None to embed locally"""
+        
+        if providers.is_demo_mode():
+            return None
+        
+        azure_settings = ClientPool.resolve_settings('azure_openai')
+        azure_deployment = ConfigLoader.get_env("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+        if azure_settings and azure_deployment:
+            return 'azure_openai', azure_settings, azure_deployment
+        
+        openai_settings = ClientPool.resolve_settings('openai')
+        if openai_settings and not azure_settings:
+            return 'openai', openai_settings, self.model
+        
+        return None
+    
+    async def _embed_local(self, text: str) -> Tuple[str, Any]:
+        """Embed on the local CPU"""
+        
+        if SentenceTransformer is not None and self.local_model_name:
+            model = self._get_local_model()
+            vector = await asyncio.to_thread(model.encode, text)
+            return f"local:{self.local_model_name}", self._normalize(np.asarray(vector, dtype='float32'))
+        
+        return f"hashing:{self.dimensions}", self._hashing_embedding(text)
+    
+    def _get_local_model(self) -> Any:
+        """Load the sentence-transformers model once"""
+        
+        if self._local_model is None:
+            with self._local_lock:
+                if self._local_model is None:
+                    self._local_model = SentenceTransformer(self.local_model_name, device='cpu')
+        
+        return self._local_model
+    
+    def _hashing_embedding(self, text: str) -> Any:
+        """Dependency-free embedding from hashed word and character trigram features"""
+        
+        vector = np.zeros(self.dimensions, dtype='float32')
+        normalized = text.lower()
+        words = re.findall(r"\w+", normalized)
+        padded = f" {' '.join(words)} "
+        
+        features = words + [padded[i:i + 3] for i in range(len(padded) - 2)]
+        for feature in features:
+            digest = hashlib.md5(feature.encode('utf-8')).digest()
+            index = int.from_bytes(digest[:4], 'little') % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        
+        return self._normalize(vector)
+    
+    @staticmethod
+    def _normalize(vector: Any) -> Any:
+        """Scale a vector to unit length so inner product equals cosine similarity"""
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+class _Namespace:
+    """Index and cached responses for one agent, model and conversation prefix"""
+    
+    def __init__(self, dimensions: int, index_type: str):
+        self.dimensions = dimensions
+        self.index_type = index_type
+        self.vectors: List[Any] = []
+        self.responses: List[Dict[str, Any]] = []
+        self.index = self._new_index()
+    
+    def _new_index(self) -> Any:
+        """Create an empty FAISS index, or None to fall back to numpy search"""
+        
+        if faiss is None:
+            return None
+        
+        if self.index_type == 'IndexFlatIP':
+            return faiss.IndexFlatIP(self.dimensions)
+        return faiss.IndexFlatL2(self.dimensions)
+    
+    def search(self, vector: Any) -> Tuple[float, Optional[Dict[str, Any]]]:
+        """Return (cosine similarity, response) of the nearest neighbour"""
+        
+        if not self.responses:
+            return 0.0, None
+        
+        if self.index is not None:
+            distances, ids = self.index.search(vector.reshape(1, -1), 1)
+            position = int(ids[0][0])
+            if position < 0:
+                return 0.0, None
+            
+            score = float(distances[0][0])
+            # Vectors are unit length, so squared L2 distance maps to cosine as 1 - d/2
+            similarity = score if self.index_type == 'IndexFlatIP' else 1.0 - score / 2.0
+            return similarity, self.responses[position]
+        
+        similarities = np.stack(self.vectors) @ vector
+        position = int(np.argmax(similarities))
+        return float(similarities[position]), self.responses[position]
+    
+    def add(self, vector: Any, response: Dict[str, Any], max_entries: int):
+        """Add a response, dropping the oldest half once the namespace is full"""
+        
+        if len(self.responses) >= max_entries:
+            keep = max_entries // 2
+            self.vectors = self.vectors[-keep:] if keep else []
+            self.responses = self.responses[-keep:] if keep else []
+            self.index = self._new_index()
+            if self.index is not None and self.vectors:
+                self.index.add(np.stack(self.vectors))
+        
+        self.vectors.append(vector)
+        self.responses.append(response)
+        if self.index is not None:
+            self.index.add(vector.reshape(1, -1))
+
+class SemanticCache:
+    """Nearest-neighbour response cache for paraphrased user messages
+    
+    Every conversation prefix gets its own namespace, so namespaces are kept in LRU
+    order and evicted once there are more than max_namespaces of them or more than
+    max_entries responses across all of them.
+    """
+    
+    _instance: Optional['SemanticCache'] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, similarity_threshold: float = 0.92, max_entries: int = 10000, max_namespaces: int = 1000, index_type: str = 'IndexFlatL2', embedder: Optional[Embedder] = None):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.max_namespaces = max_namespaces
+        self.index_type = index_type
+        self.embedder = embedder or Embedder('text-embedding-3-small')
+        self._namespaces: "OrderedDict[str, _Namespace]" = OrderedDict()
+        self._entries = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+    
+    @classmethod
+    def get_instance(cls) -> 'SemanticCache':
+        """Get the process-wide semantic cache configured from config.yaml"""
+        
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    settings = ConfigLoader.get('semantic_cache', {})
+                    cls._instance = cls(
+                        similarity_threshold=settings.get('similarity_threshold', 0.92),
+                        max_entries=settings.get('max_entries', 10000),
+                        max_namespaces=settings.get('max_namespaces', 1000),
+                        index_type=ConfigLoader.get('vector_databases.faiss.index_type', 'IndexFlatL2'),
+                        embedder=Embedder(
+                            settings.get('embedding_model', 'text-embedding-3-small'),
+                            local_model=settings.get('local_embedding_model'),
+                            dimensions=settings.get('hashing_dimensions', 512)
+                        )
+                    )
+        
+        return cls._instance
+    
+    @staticmethod
+    def is_enabled(metadata: Optional[Dict[str, Any]]) -> bool:
+        """Check whether an agent uses the semantic cache"""
+        
+        if np is None:
+            return False
+        
+        default = ConfigLoader.get('semantic_cache.enabled', False)
+        return bool((metadata or {}).get('semantic_cache', default))
+    
+    async def lookup(self, agent_key: str, model: str, messages: List[Dict[str, str]], threshold: Optional[float] = None) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, Any]]]:
+        """Find a cached response for a paraphrase of the last user message
+        
+        Returns (response or None, embedding) so a miss can be stored without re-embedding.
+        """
+        
+        embedding = await self.embedder.embed(messages[-1]['content'] if messages else '')
+        namespace_key = self._namespace_key(agent_key, model, messages, embedding[0])
+        threshold = self.similarity_threshold if threshold is None else threshold
+        
+        with self._lock:
+            namespace = self._namespaces.get(namespace_key)
+            if namespace is not None:
+                self._namespaces.move_to_end(namespace_key)
+            similarity, response = namespace.search(embedding[1]) if namespace else (0.0, None)
+            
+            stats = self._stats.setdefault(agent_key, {'lookups': 0, 'hits': 0, 'misses': 0})
+            stats['lookups'] += 1
+            
+            if response is not None and similarity >= threshold:
+                stats['hits'] += 1
+                return {**response, 'semantic_similarity': similarity}, embedding
+            
+            stats['misses'] += 1
+            return None, embedding
+    
+    def add(self, agent_key: str, model: str, messages: List[Dict[str, str]], embedding: Tuple[str, Any], response: Dict[str, Any]):
+        """Store a response under the embedding returned by lookup"""
+        
+        namespace_key = self._namespace_key(agent_key, model, messages, embedding[0])
+        
+        with self._lock:
+            namespace = self._namespaces.get(namespace_key)
+            if namespace is None:
+                namespace = _Namespace(len(embedding[1]), self.index_type)
+                self._namespaces[namespace_key] = namespace
+            self._namespaces.move_to_end(namespace_key)
+            
+            before = len(namespace.responses)
+            namespace.add(embedding[1], response, self.max_entries)
+            self._entries += len(namespace.responses) - before
+            
+            # Drop least recently used conversations, never the one just stored
+            while len(self._namespaces) > 1 and (len(self._namespaces) > self.max_namespaces or self._entries > self.max_entries):
+                _, evicted = self._namespaces.popitem(last=False)
+                self._entries -= len(evicted.responses)
+                self._evictions += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-agent and overall hit rates"""
+        
+        with self._lock:
+            agents = {agent_key: dict(stats) for agent_key, stats in self._stats.items()}
+            entries = self._entries
+            namespaces = len(self._namespaces)
+            evictions = self._evictions
+        
+        for stats in agents.values():
+            stats['hit_rate'] = stats['hits'] / stats['lookups'] if stats['lookups'] else 0.0
+        
+        lookups = sum(stats['lookups'] for stats in agents.values())
+        hits = sum(stats['hits'] for stats in agents.values())
+        
+        return {
+            'lookups': lookups,
+            'hits': hits,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'namespaces': namespaces,
+            'evictions': evictions,
+            'agents': agents
+        }
+    
+    @staticmethod
+    def _namespace_key(agent_key: str, model: str, messages: List[Dict[str, str]], embedder_name: str) -> str:
+        """Key the index by agent, model, embedder and everything before the last message
+        
+        Only the final user message is compared semantically; the system prompt and
+        history must match exactly for a cached answer to be reused.
+        """
+        prefix = json.dumps(messages[:-1], sort_keys=True, ensure_ascii=False)
+        payload = f"{agent_key}\0{model}\0{embedder_name}\0{prefix}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
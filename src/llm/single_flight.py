@@ -0,0 +1,142 @@
+"""
+Single-flight - Coalesce identical in-flight LLM requests into one upstream call
+"""
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable, AsyncIterator
+import asyncio
+import threading
+
+class _StreamFlight:
+    """One upstream stream whose events are replayed to every subscriber"""
+    
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+    
+    def publish(self, event: Optional[Dict[str, Any]] = None):
+        """Append an event (if any) and wake every waiting subscriber"""
+        
+        if event is not None:
+            self.events.append(event)
+        
+        changed = self.changed
+        self.changed = asyncio.Event()
+        changed.set()
+    
+    async def subscribe(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield all events from the start, then new ones as they arrive"""
+        
+        position = 0
+        
+        while True:
+            while position < len(self.events):
+                yield self.events[position]
+                position += 1
+            
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            
+            await self.changed.wait()
+
+class SingleFlight:
+    """Shares one upstream call between concurrent identical requests"""
+    
+    _instance: Optional['SingleFlight'] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self):
+        # Keys include the event loop because tasks cannot be awaited across loops
+        self._calls: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._streams: Dict[Tuple[int, str], _StreamFlight] = {}
+        self._stats = {'calls': 0, 'coalesced': 0, 'streams': 0, 'streams_coalesced': 0}
+    
+    @classmethod
+    def get_instance(cls) -> 'SingleFlight':
+        """Get the process-wide single-flight group"""
+        
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        
+        return cls._instance
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn once for all concurrent callers with the same key"""
+        
+        flight_key = (id(asyncio.get_running_loop()), key)
+        task = self._calls.get(flight_key)
+        
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[flight_key] = task
+            task.add_done_callback(lambda done: self._finish_call(flight_key, done))
+            self._stats['calls'] += 1
+        else:
+            self._stats['coalesced'] += 1
+        
+        # Shielded so one caller timing out does not cancel the call for the others
+        return await asyncio.shield(task)
+    
+    async def stream(self, key: str, fn: Callable[[], AsyncIterator[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+        """Stream fn once, fanning its events out to all concurrent callers with the same key"""
+        
+        flight_key = (id(asyncio.get_running_loop()), key)
+        flight = self._streams.get(flight_key)
+        
+        if flight is None:
+            flight = _StreamFlight()
+            self._streams[flight_key] = flight
+            flight.task = asyncio.ensure_future(self._produce(flight_key, flight, fn))
+            self._stats['streams'] += 1
+        else:
+            self._stats['streams_coalesced'] += 1
+        
+        flight.subscribers += 1
+        
+        try:
+            async for event in flight.subscribe():
+                yield event
+        finally:
+            flight.subscribers -= 1
+            # Stop the upstream request once nobody is listening
+            if flight.subscribers == 0 and not flight.done:
+                flight.task.cancel()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing counters"""
+        return {
+            **self._stats,
+            'in_flight': len(self._calls),
+            'streams_in_flight': len(self._streams)
+        }
+    
+    async def _produce(self, flight_key: Tuple[int, str], flight: _StreamFlight, fn: Callable[[], AsyncIterator[Dict[str, Any]]]):
+        """Read the upstream stream into the flight"""
+        
+        try:
+            async for event in fn():
+                flight.publish(event)
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            self._streams.pop(flight_key, None)
+            flight.publish()
+    
+    def _finish_call(self, flight_key: Tuple[int, str], task: asyncio.Task):
+        """Forget a finished call so the next request starts a new one"""
+        
+        self._calls.pop(flight_key, None)
+        
+        # Mark the exception as retrieved even if every caller has gone away
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,145 @@
+"""
+Stub LLM - Deterministic, network-free completions with realistic timing for load tests
+"""
+from typing import Dict, List, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+import hashlib
+import json
+import random
+import re
+import threading
+
+from src.utils.config_loader import ConfigLoader
+from src.llm.token_counter import TokenCounter
+
+STUB_MODES = ['off', 'in_process', 'http']
+
+# Requests whose retries are still being counted; the oldest are forgotten past this
+MAX_TRACKED_ATTEMPTS = 10000
+
+STUB_VOCABULARY = (
+    "the agent reviewed request and prepared a short answer with several steps "
+    "first analyze context then compare options select approach implement solution "
+    "validate results report findings data model service latency throughput cache "
+    "queue token budget deployment region fallback retry summary plan task team"
+).split()
+
+class StubError(Exception):
+    """Injected failure that the retry layer treats like an OpenAI API error"""
+    
+    class _Response:
+        def __init__(self, status_code: int, headers: Dict[str, str]):
+            self.status_code = status_code
+            self.headers = headers
+    
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        headers = {'retry-after-ms': str(int(retry_after * 1000))} if retry_after else {}
+        self.response = self._Response(status_code, headers)
+
+@dataclass
+class StubSettings:
+    """Timing and failure profile of the stub"""
+    seed: int = 42
+    ttft: float = 0.2
+    tokens_per_second: float = 50.0
+    response_tokens: int = 64
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    
+    @classmethod
+    def from_config(cls) -> 'StubSettings':
+        """Read the stub_llm section of config.yaml"""
+        settings = ConfigLoader.get('stub_llm', {}) or {}
+        return cls(**{f.name: settings[f.name] for f in fields(cls) if f.name in settings})
+
+@dataclass
+class StubResponse:
+    """One planned response: an injected error, or tokens with the delays to play them back at"""
+    ttft: float
+    interval: float
+    tokens: List[str]
+    usage: Dict[str, int]
+    finish_reason: str
+    error: Optional[StubError] = None
+    
+    @property
+    def content(self) -> str:
+        """The whole response text"""
+        return ''.join(self.tokens)
+    
+    @property
+    def duration(self) -> float:
+        """Time a non-streaming call takes"""
+        return self.ttft + self.interval * max(0, len(self.tokens) - 1)
+
+class StubGenerator:
+    """Plans seeded stub responses
+    
+    The content depends only on the seed and the request, so a repeated prompt gets the
+    same answer. Failures are drawn per attempt of a request, so a retry can succeed and
+    a run with the same seed and request order fails in the same places.
+    """
+    
+    def __init__(self, settings: Optional[StubSettings] = None, responses: Optional[List[str]] = None):
+        self.settings = settings or StubSettings.from_config()
+        self.responses = responses
+        self._attempts: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def plan(self, model: str, messages: List[Dict[str, str]], max_tokens: int) -> StubResponse:
+        """Decide the outcome, content and timing of one request"""
+        
+        settings = self.settings
+        request_hash = hashlib.sha256(
+            json.dumps({'model': model, 'messages': messages}, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        
+        attempt = 0
+        if settings.error_rate or settings.rate_limit_rate:
+            with self._lock:
+                attempt = self._attempts.pop(request_hash, 0)
+                self._attempts[request_hash] = attempt + 1
+                while len(self._attempts) > MAX_TRACKED_ATTEMPTS:
+                    self._attempts.popitem(last=False)
+        
+        interval = 1.0 / settings.tokens_per_second if settings.tokens_per_second else 0.0
+        
+        outcome = random.Random(f"{settings.seed}:{request_hash}:{attempt}").random()
+        if outcome < settings.rate_limit_rate:
+            error = StubError(429, "Stub rate limit exceeded", settings.retry_after)
+            return StubResponse(settings.ttft, interval, [], {}, 'error', error)
+        if outcome < settings.rate_limit_rate + settings.error_rate:
+            return StubResponse(settings.ttft, interval, [], {}, 'error', StubError(500, "Stub server error"))
+        
+        # Retries are over once a request succeeds; a later repeat starts from attempt 0
+        if settings.error_rate or settings.rate_limit_rate:
+            with self._lock:
+                self._attempts.pop(request_hash, None)
+        
+        rng = random.Random(f"{settings.seed}:{request_hash}")
+        
+        if self.responses:
+            user_message = messages[-1]['content'] if messages else ""
+            text = rng.choice(self.responses).format(model=model, message=user_message[:50])
+            tokens = re.findall(r"\S+\s*", text)
+            finish_reason = 'stop'
+        else:
+            length = min(settings.response_tokens, max_tokens)
+            tokens = [rng.choice(STUB_VOCABULARY) + ' ' for _ in range(length)]
+            finish_reason = 'length' if length >= max_tokens else 'stop'
+        
+        usage = TokenCounter.usage(model, messages, ''.join(tokens))
+        return StubResponse(settings.ttft, interval, tokens, usage, finish_reason)
+
+def stub_mode() -> str:
+    """Get where stubbed requests go: off, in_process or http (STUB_LLM_MODE overrides config.yaml)"""
+    
+    mode = ConfigLoader.get_env("STUB_LLM_MODE") or ConfigLoader.get('stub_llm.mode', 'off')
+    if mode not in STUB_MODES:
+        raise ValueError(f"Unknown stub LLM mode: {mode}")
+    
+    return mode
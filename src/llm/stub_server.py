@@ -0,0 +1,156 @@
+"""
+Stub LLM server - Local OpenAI-compatible chat completions endpoint backed by the stub generator
+
+Run with: python -m src.llm.stub_server --port 8100 --ttft 0.3 --tokens-per-second 40
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Dict, Any, Optional, AsyncIterator
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from src.llm.stub import StubGenerator, StubSettings, StubResponse
+
+def create_app(settings: Optional[StubSettings] = None) -> FastAPI:
+    """Build the stub server; OpenAI and Azure OpenAI request paths are both accepted"""
+    
+    app = FastAPI(title="Stub LLM", description="Deterministic OpenAI-compatible stub for load tests")
+    generator = StubGenerator(settings)
+    
+    async def chat_completions(request: Request, model: Optional[str] = None):
+        body = await request.json()
+        model = model or body.get('model', 'stub')
+        messages = body.get('messages', [])
+        response = generator.plan(model, messages, body.get('max_tokens') or 4096)
+        
+        if response.error:
+            await asyncio.sleep(response.ttft)
+            return error_response(response)
+        
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        
+        if body.get('stream'):
+            include_usage = (body.get('stream_options') or {}).get('include_usage', False)
+            return StreamingResponse(
+                stream_chunks(completion_id, model, response, include_usage),
+                media_type="text/event-stream"
+            )
+        
+        await asyncio.sleep(response.duration)
+        
+        return {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': response.content},
+                'finish_reason': response.finish_reason
+            }],
+            'usage': response.usage
+        }
+    
+    @app.post("/v1/chat/completions")
+    async def openai_chat_completions(request: Request):
+        """OpenAI chat completions"""
+        return await chat_completions(request)
+    
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def azure_chat_completions(deployment: str, request: Request):
+        """Azure OpenAI chat completions; the deployment name is the model"""
+        return await chat_completions(request, deployment)
+    
+    @app.get("/v1/models")
+    async def list_models():
+        """Models list, so client warm-up succeeds"""
+        return {'object': 'list', 'data': [{'id': 'stub', 'object': 'model', 'owned_by': 'stub'}]}
+    
+    return app
+
+def error_response(response: StubResponse) -> JSONResponse:
+    """Injected failure in the OpenAI error format"""
+    
+    error = response.error
+    headers = dict(error.response.headers)
+    if 'retry-after-ms' in headers:
+        headers['retry-after'] = str(max(1, round(int(headers['retry-after-ms']) / 1000)))
+    
+    return JSONResponse(
+        status_code=error.status_code,
+        headers=headers,
+        content={'error': {
+            'message': str(error),
+            'type': 'rate_limit_error' if error.status_code == 429 else 'server_error',
+            'code': str(error.status_code)
+        }}
+    )
+
+async def stream_chunks(completion_id: str, model: str, response: StubResponse, include_usage: bool) -> AsyncIterator[str]:
+    """Play the response back as chat.completion.chunk server-sent events"""
+    
+    created = int(time.time())
+    
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+        payload = {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': created,
+            'model': model,
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+    
+    await asyncio.sleep(response.ttft)
+    yield chunk({'role': 'assistant', 'content': ''})
+    
+    for i, token in enumerate(response.tokens):
+        if i:
+            await asyncio.sleep(response.interval)
+        yield chunk({'content': token})
+    
+    yield chunk({}, response.finish_reason)
+    
+    if include_usage:
+        payload = {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': created,
+            'model': model,
+            'choices': [],
+            'usage': response.usage
+        }
+        yield f"data: {json.dumps(payload)}\n\n"
+    
+    yield "data: [DONE]\n\n"
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    defaults = StubSettings.from_config()
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible stub LLM server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--ttft", type=float, default=defaults.ttft, help="seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--response-tokens", type=int, default=defaults.response_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="share of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate, help="share of requests failing with 429")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    args = parser.parse_args()
+    
+    settings = StubSettings(
+        seed=args.seed,
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after
+    )
+    
+    uvicorn.run(create_app(settings), host=args.host, port=args.port)
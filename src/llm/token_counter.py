@@ -0,0 +1,161 @@
+"""
+Token counter - Tokenizer-based token accounting and pre-flight budget checks
+"""
+from typing import Dict, Any, List, Optional
+from functools import lru_cache
+
+# Optional imports for exact token counts
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+from src.utils.config_loader import ConfigLoader
+
+# Chat formatting overhead per message and for priming the reply (OpenAI chat format)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+class TokenBudgetExceeded(ValueError):
+    """Raised when a request cannot fit in the model's context window"""
+    pass
+
+class TokenCounter:
+    """Counts prompt and completion tokens with the model's tiktoken encoding"""
+    
+    @staticmethod
+    def get_model_config(model: str) -> Dict[str, Any]:
+        """Find a model's entry under llm_providers in config.yaml"""
+        return _model_configs().get(model, {})
+    
+    @staticmethod
+    def context_limit(model: str) -> int:
+        """Get the model's context window (llm_providers.*.models[].max_tokens, else as discovered on the Ollama host)"""
+        
+        configured = TokenCounter.get_model_config(model).get('max_tokens')
+        if configured:
+            return configured
+        
+        from src.llm.model_catalog import ModelCatalog
+        
+        discovered = ModelCatalog.get_instance().discovered_context_limit(model)
+        return discovered or ConfigLoader.get('token_accounting.default_context_limit', 4096)
+    
+    @staticmethod
+    def count_text(text: str, model: str) -> int:
+        """Count the tokens in a piece of text"""
+        return _count(_encoding_name(model), text or '')
+    
+    @staticmethod
+    def count_messages(messages: List[Dict[str, str]], model: str) -> int:
+        """Count the prompt tokens of a chat request"""
+        
+        encoding_name = _encoding_name(model)
+        total = TOKENS_PER_REPLY
+        
+        for message in messages:
+            content = message.get('content') or ''
+            total += TOKENS_PER_MESSAGE + _count(encoding_name, message.get('role', ''))
+            
+            if message.get('role') == 'system':
+                # System prompts repeat on every call, so they are tokenized once
+                total += _count_static(encoding_name, content)
+            else:
+                total += _count(encoding_name, content)
+        
+        return total
+    
+    @staticmethod
+    def usage(model: str, messages: List[Dict[str, str]], completion: str) -> Dict[str, int]:
+        """Build a usage record for a request and its completion"""
+        
+        prompt_tokens = TokenCounter.count_messages(messages, model)
+        completion_tokens = TokenCounter.count_text(completion, model)
+        
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+    
+    @staticmethod
+    def enforce_budget(model: str, messages: List[Dict[str, str]], max_tokens: int, policy: Optional[str] = None) -> int:
+        """Check a request against the context window before it is sent
+        
+        Returns the max_tokens to request. With the 'trim' policy the completion
+        budget is reduced to what is left of the window; with 'reject' (or when
+        the prompt alone does not fit) TokenBudgetExceeded is raised.
+        """
+        
+        policy = policy or ConfigLoader.get('token_accounting.budget_policy', 'trim')
+        limit = TokenCounter.context_limit(model)
+        prompt_tokens = TokenCounter.count_messages(messages, model)
+        available = limit - prompt_tokens
+        
+        if prompt_tokens + max_tokens <= limit:
+            return max_tokens
+        
+        min_completion = ConfigLoader.get('token_accounting.min_completion_tokens', 64)
+        
+        if policy == 'trim' and available >= min_completion:
+            return available
+        
+        raise TokenBudgetExceeded(
+            f"Request needs {prompt_tokens} prompt + {max_tokens} completion tokens, "
+            f"but {model} allows {limit}"
+        )
+
+@lru_cache(maxsize=1)
+def _model_configs() -> Dict[str, Dict[str, Any]]:
+    """Index model entries from all providers by name"""
+    
+    models = {}
+    for provider in ConfigLoader.get('llm_providers', {}).values():
+        for model in provider.get('models', []):
+            models[model['name']] = model
+    
+    return models
+
+@lru_cache(maxsize=None)
+def _encoding_name(model: str) -> str:
+    """Resolve the tiktoken encoding for a model"""
+    
+    configured = TokenCounter.get_model_config(model).get('encoding')
+    if configured:
+        return configured
+    
+    if tiktoken is not None:
+        try:
+            return tiktoken.encoding_for_model(model).name
+        except KeyError:
+            pass
+    
+    return ConfigLoader.get('token_accounting.default_encoding', 'cl100k_base')
+
+@lru_cache(maxsize=None)
+def _get_encoder(encoding_name: str) -> Any:
+    """Load an encoder once per process"""
+    
+    if tiktoken is None:
+        return None
+    
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        # tiktoken downloads encodings on first use, which fails on offline hosts
+        print(f"Error loading tiktoken encoding {encoding_name}, estimating tokens: {e}")
+        return None
+
+def _count(encoding_name: str, text: str) -> int:
+    """Count tokens, estimating ~4 characters per token without tiktoken"""
+    
+    encoder = _get_encoder(encoding_name)
+    if encoder is None:
+        return (len(text) + 3) // 4
+    
+    return len(encoder.encode(text, disallowed_special=()))
+
+@lru_cache(maxsize=1024)
+def _count_static(encoding_name: str, text: str) -> int:
+    """Count tokens for text that repeats across requests"""
+    return _count(encoding_name, text)
@@ -7,6 +7,7 @@ import json
 from typing import Dict, Any, List
 from src.utils.config_loader import ConfigLoader
 from src.agents.agent_types import AgentFactory
+from src.llm.model_catalog import ModelCatalog
 
 def show():
     """Display canvas studio page"""
@@ -428,18 +429,16 @@ def show_agent_properties(node: Dict[str, Any]):
         # LLM Configuration
         st.markdown("##### 🤖 LLM Configuration")
         
-        config = ConfigLoader.load_config()
-        available_models = []
-        
-        for provider in config.get('llm_providers', {}).values():
-            if provider.get('enabled'):
-                for model in provider.get('models', []):
-                    available_models.append(model['display_name'])
+        # Served from the model catalog cache; discovery never blocks the page
+        catalog = [model for model in ModelCatalog.get_instance().get_models() if model['available']]
+        available_models = [model['name'] for model in catalog]
+        labels = {model['name']: f"{model['display_name']} · {model['context_limit']:,} ctx" for model in catalog}
         
         node['llm_model'] = st.selectbox(
             "Model",
             available_models,
-            index=available_models.index(node.get('llm_model', available_models[0])) if node.get('llm_model') in available_models else 0
+            index=available_models.index(node.get('llm_model', available_models[0])) if node.get('llm_model') in available_models else 0,
+            format_func=lambda name: labels.get(name, name)
         )
         
         node['temperature'] = st.slider(
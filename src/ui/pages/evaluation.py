@@ -213,7 +213,8 @@ def run_tests(test_names: List[str], parallel: bool, stop_on_fail: bool):
         'results': results,
         'total': len(results),
         'passed': len([r for r in results if r['passed']]),
-        'failed': len([r for r in results if not r['passed']])
+        'failed': len([r for r in results if not r['passed']]),
+        'total_tokens': sum(r.get('token_usage', {}).get('total_tokens', 0) for r in results)
     }
     
     st.session_state.test_results.append(test_run)
@@ -222,13 +223,15 @@ def run_tests(test_names: List[str], parallel: bool, stop_on_fail: bool):
     st.markdown("---")
     st.markdown("### Summary")
     
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("Total Tests", test_run['total'])
     with col2:
         st.metric("Passed", test_run['passed'])
     with col3:
         st.metric("Failed", test_run['failed'])
+    with col4:
+        st.metric("Total Tokens", f"{test_run['total_tokens']:,}")
 
 def show_test_results():
     """Display test results and history"""
@@ -270,6 +273,10 @@ def show_test_results():
                 st.markdown("**Error:**")
                 st.code(result.get('error', 'Unknown error'))
             
+            if 'token_usage' in result:
+                st.markdown(f"**Tokens:** {result['token_usage']['total_tokens']:,} "
+                            f"({result['token_usage']['prompt_tokens']:,} prompt / {result['token_usage']['completion_tokens']:,} completion)")
+            
             if 'details' in result:
                 st.markdown("**Details:**")
                 st.json(result['details'])
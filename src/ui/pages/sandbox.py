@@ -7,6 +7,8 @@ from typing import List, Dict, Any
 from datetime import datetime
 from src.agents.agent_executor import AgentExecutor
 
+WORKFLOW_OPTION = "🔗 Entire workflow"
+
 def show():
     """Display sandbox page"""
     
@@ -48,6 +50,11 @@ def show_chat_interface():
         return
     
     agent_names = [agent['name'] for agent in agents]
+    
+    # Projects with connections can also run end to end
+    if st.session_state.project.get('connections'):
+        agent_names = [WORKFLOW_OPTION] + agent_names
+    
     selected_agent = st.selectbox(
         "Select Agent to Test",
         agent_names
@@ -69,18 +76,46 @@ def show_chat_interface():
     # Input area
     user_input = st.chat_input("Type your message...")
     
-    if user_input:
+    if user_input and selected_agent == WORKFLOW_OPTION:
+        st.session_state.sandbox_messages.append({
+            "role": "user",
+            "content": user_input,
+            "timestamp": datetime.now().isoformat(),
+            "agent": WORKFLOW_OPTION
+        })
+        
+        with st.spinner("Running workflow..."):
+            response = execute_workflow(user_input)
+            
+            st.session_state.sandbox_messages.append({
+                "role": "assistant",
+                "content": response['content'],
+                "timestamp": datetime.now().isoformat(),
+                "metadata": {
+                    "agent": WORKFLOW_OPTION,
+                    "tokens": response.get('tokens', 0),
+                    "duration": response.get('duration', 0),
+                    "nodes": response.get('nodes', {})
+                }
+            })
+        
+        st.rerun()
+    
+    elif user_input:
+        agent = next(a for a in agents if a['name'] == selected_agent)
+        history = build_history(agent)
+        
         # Add user message
         st.session_state.sandbox_messages.append({
             "role": "user",
             "content": user_input,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now().isoformat(),
+            "agent": agent['name']
         })
         
         # Get agent response
         with st.spinner("Agent thinking..."):
-            agent = next(a for a in agents if a['name'] == selected_agent)
-            response = execute_agent(agent, user_input)
+            response = execute_agent(agent, user_input, history)
             
             # Add assistant message
             st.session_state.sandbox_messages.append({
@@ -102,7 +137,19 @@ def show_chat_interface():
         st.session_state.sandbox_messages = []
         st.rerun()
 
-def execute_agent(agent: Dict[str, Any], user_input: str) -> Dict[str, Any]:
+def build_history(agent: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Build the conversation history with an agent from the sandbox messages"""
+    
+    history = []
+    
+    for message in st.session_state.sandbox_messages:
+        message_agent = message.get('agent') or message.get('metadata', {}).get('agent')
+        if message_agent == agent['name']:
+            history.append({"role": message["role"], "content": message["content"]})
+    
+    return history
+
+def execute_agent(agent: Dict[str, Any], user_input: str, history: List[Dict[str, str]] = None) -> Dict[str, Any]:
     """Execute agent with user input"""
     
     executor = st.session_state.sandbox_executor
@@ -110,8 +157,8 @@ def execute_agent(agent: Dict[str, Any], user_input: str) -> Dict[str, Any]:
     try:
         start_time = datetime.now()
         
-        # Execute agent
-        result = executor.run_agent(agent['id'], user_input)
+        # Execute agent; the executor fits the history into the model's context window
+        result = executor.run_agent(agent['id'], user_input, {'history': history or []})
         
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
@@ -131,6 +178,40 @@ def execute_agent(agent: Dict[str, Any], user_input: str) -> Dict[str, Any]:
             'success': False
         }
 
+def execute_workflow(user_input: str) -> Dict[str, Any]:
+    """Run every agent in the project along its connections"""
+    
+    executor = st.session_state.sandbox_executor
+    
+    try:
+        result = executor.run_workflow(user_input)
+        
+        return {
+            'content': result['output'] or 'No response',
+            'tokens': result['total_tokens'],
+            'duration': result['duration'],
+            'nodes': {
+                node['agent_name']: {
+                    'status': node['status'],
+                    'started_at': round(node['started_at'], 2) if node['started_at'] is not None else None,
+                    'duration': round(node['duration'], 2) if node['duration'] is not None else None,
+                    'tokens': node['tokens'],
+                    'cached': node['cached'],
+                    'error': node['error']
+                }
+                for node in result['nodes'].values()
+            },
+            'success': result['success']
+        }
+    
+    except Exception as e:
+        return {
+            'content': f"Error: {str(e)}",
+            'tokens': 0,
+            'duration': 0,
+            'success': False
+        }
+
 def show_execution_panel():
     """Display execution metrics and controls"""
     
@@ -187,6 +268,11 @@ def show_execution_panel():
                 'project_id': st.session_state.project.get('id'),
                 'agents_count': len(st.session_state.project.get('agents', []))
             })
+        with st.expander("View Response Cache"):
+            st.json({
+                'response_cache': AgentExecutor.get_cache_stats(),
+                'semantic_cache': AgentExecutor.get_semantic_cache_stats()
+            })
 
 def export_conversation():
     """Export conversation to file"""
@@ -0,0 +1,47 @@
+"""
+Async runner - Run coroutines from synchronous callers such as Streamlit pages
+"""
+from typing import Any, Awaitable, Optional
+import asyncio
+import concurrent.futures
+import threading
+
+class AsyncRunner:
+    """Runs coroutines on one long-lived background event loop"""
+    
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _thread: Optional[threading.Thread] = None
+    _lock = threading.Lock()
+    
+    @classmethod
+    def get_loop(cls) -> asyncio.AbstractEventLoop:
+        """Get the background event loop, starting it on first use"""
+        
+        if cls._loop is None:
+            with cls._lock:
+                if cls._loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name="async-runner", daemon=True)
+                    thread.start()
+                    cls._thread = thread
+                    cls._loop = loop
+        
+        return cls._loop
+    
+    @classmethod
+    def run(cls, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine to completion and return its result"""
+        
+        # Async clients are bound to the loop that created them, so every sync
+        # caller shares the same loop instead of spinning up a new one per call
+        future = asyncio.run_coroutine_threadsafe(coro, cls.get_loop())
+        return future.result(timeout)
+    
+    @classmethod
+    def submit(cls, coro: Awaitable[Any]) -> 'concurrent.futures.Future':
+        """Schedule a coroutine in the background without waiting for it"""
+        return asyncio.run_coroutine_threadsafe(coro, cls.get_loop())
+
+def run_sync(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine from synchronous code"""
+    return AsyncRunner.run(coro, timeout)
@@ -0,0 +1,39 @@
+"""
+Shared fixtures for the test suite
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Run from any directory, importing the project the way the backend does
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.agents.checkpoint import CheckpointStore
+
+@pytest.fixture
+def checkpoint_store(tmp_path, monkeypatch):
+    """A checkpoint store in a temporary file, used as the process-wide instance"""
+    store = CheckpointStore(str(tmp_path / "workflow_runs.sqlite"), flush_interval=0.01)
+    monkeypatch.setattr(CheckpointStore, '_instance', store)
+    return store
+
+@pytest.fixture
+def make_project():
+    """Build a project of agents wired by (source, target, type[, condition]) connections"""
+    
+    def build(*connections, agents=None):
+        ids = agents or sorted({node for connection in connections for node in connection[:2]})
+        return {
+            'id': 'test_project',
+            'agents': [
+                {'id': agent_id, 'name': f"Agent {agent_id}", 'type': 'assistant', 'system_prompt': f"You are {agent_id}."}
+                for agent_id in ids
+            ],
+            'connections': [
+                {'from': source, 'to': target, 'type': edge_type, **({'condition': rest[0]} if rest else {})}
+                for source, target, edge_type, *rest in connections
+            ]
+        }
+    
+    return build
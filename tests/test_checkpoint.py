@@ -0,0 +1,79 @@
+"""
+Tests for checkpointed workflow runs and resuming them
+"""
+from src.agents.agent_executor import AgentExecutor
+
+def flaky_runner(executor, fail):
+    """Replace the executor's agent runner; agents in fail answer with an error"""
+    
+    calls = []
+    
+    async def run_agent_async(agent_id, message, context=None, budget=None):
+        calls.append(agent_id)
+        if agent_id in fail:
+            return {'success': False, 'error': f"{agent_id} failed"}
+        return {'success': True, 'response': f"{agent_id} output", 'tokens_used': 10}
+    
+    executor.run_agent_async = run_agent_async
+    return calls
+
+def test_resume_restores_completed_nodes(checkpoint_store, make_project):
+    executor = AgentExecutor(make_project(('a', 'b', 'sequential'), ('b', 'c', 'sequential')))
+    
+    calls = flaky_runner(executor, fail={'c'})
+    first = executor.run_workflow("review this", memoize=False, run_id="run-1")
+    assert not first['success']
+    assert calls == ['a', 'b', 'c']
+    assert checkpoint_store.load_run("run-1")['status'] == 'failed'
+    
+    calls = flaky_runner(executor, fail=set())
+    resumed = executor.resume_workflow("run-1", memoize=False)
+    
+    assert resumed['success']
+    assert calls == ['c']
+    assert resumed['restored_nodes'] == ['a', 'b']
+    assert resumed['total_tokens'] == 10
+    assert resumed['output'] == "c output"
+    assert checkpoint_store.load_run("run-1")['status'] == 'completed'
+
+def test_resume_reruns_nodes_whose_agent_changed(checkpoint_store, make_project):
+    project = make_project(('a', 'b', 'sequential'))
+    executor = AgentExecutor(project)
+    flaky_runner(executor, fail={'b'})
+    executor.run_workflow("review this", memoize=False, run_id="run-2")
+    
+    project['agents'][0]['system_prompt'] = "You are a different a."
+    edited = AgentExecutor(project)
+    calls = flaky_runner(edited, fail=set())
+    resumed = edited.resume_workflow("run-2", memoize=False)
+    
+    assert resumed['success']
+    assert calls == ['a', 'b']
+    assert resumed['restored_nodes'] == []
+
+def test_resume_unknown_run_fails(checkpoint_store, make_project):
+    executor = AgentExecutor(make_project(('a', 'b', 'sequential')))
+    
+    result = executor.resume_workflow("missing", memoize=False)
+    
+    assert not result['success']
+    assert "not found" in result['error']
+
+def test_unbuildable_agent_fails_its_node_without_aborting_the_run(checkpoint_store, make_project):
+    project = make_project(('a', 'b', 'sequential'))
+    project['agents'][1]['type'] = 'no_such_type'
+    executor = AgentExecutor(project)
+    run_real_agent = executor.run_agent_async
+    
+    async def run_agent_async(agent_id, message, context=None, budget=None):
+        if agent_id == 'a':
+            return {'success': True, 'response': "a output", 'tokens_used': 10}
+        return await run_real_agent(agent_id, message, context, budget)
+    
+    executor.run_agent_async = run_agent_async
+    result = executor.run_workflow("review this", memoize=False, run_id="run-3")
+    
+    assert not result['success']
+    assert result['nodes']['a']['status'] == 'completed'
+    assert result['nodes']['b']['status'] == 'failed'
+    assert checkpoint_store.load_run("run-3")['nodes']['b']['status'] == 'failed'
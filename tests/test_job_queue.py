@@ -0,0 +1,175 @@
+"""
+Tests for the SQLite job queue and the job worker
+"""
+import asyncio
+import time
+
+import pytest
+
+from src.jobs.queue import SQLiteJobQueue
+from src.jobs.worker import JobWorker
+
+@pytest.fixture
+def job_queue(tmp_path):
+    return SQLiteJobQueue(str(tmp_path / "jobs.sqlite"), visibility_timeout=0.2, result_ttl=60)
+
+def test_claims_jobs_in_order_once(job_queue):
+    first = job_queue.enqueue({'input_data': "one"})
+    second = job_queue.enqueue({'input_data': "two"})
+    
+    claimed = job_queue.claim('worker-1', timeout=0)
+    assert claimed['id'] == first
+    assert claimed['status'] == 'running'
+    assert claimed['worker'] == 'worker-1'
+    assert claimed['attempts'] == 1
+    assert claimed['payload'] == {'input_data': "one"}
+    
+    assert job_queue.claim('worker-2', timeout=0)['id'] == second
+    assert job_queue.claim('worker-3', timeout=0) is None
+
+def test_concurrent_claims_never_share_a_job(job_queue):
+    job_ids = {job_queue.enqueue({'input_data': str(i)}) for i in range(40)}
+    # Separate connections, as separate worker processes would have
+    queues = [SQLiteJobQueue(job_queue.path) for _ in range(4)]
+    
+    def drain(queue, worker_id):
+        claimed = []
+        while (job := queue.claim(worker_id, timeout=0)) is not None:
+            claimed.append(job['id'])
+        return claimed
+    
+    async def drain_all():
+        return await asyncio.gather(*(asyncio.to_thread(drain, queue, f"worker-{i}") for i, queue in enumerate(queues)))
+    
+    claimed = [job_id for batch in asyncio.run(drain_all()) for job_id in batch]
+    
+    assert sorted(claimed) == sorted(job_ids)
+
+def test_claim_waits_up_to_timeout(job_queue):
+    start = time.monotonic()
+    
+    assert job_queue.claim('worker-1', timeout=0.3) is None
+    assert time.monotonic() - start >= 0.3
+
+def test_requeue_stale_recovers_jobs_of_dead_workers(job_queue):
+    job_id = job_queue.enqueue({'input_data': "x"})
+    job_queue.claim('dead-worker', timeout=0)
+    
+    # A fresh heartbeat keeps the job with its worker
+    job_queue.heartbeat(job_id)
+    assert job_queue.requeue_stale() == 0
+    
+    time.sleep(0.3)
+    assert job_queue.requeue_stale() == 1
+    assert job_queue.get(job_id)['status'] == 'queued'
+    
+    reclaimed = job_queue.claim('worker-2', timeout=0)
+    assert reclaimed['id'] == job_id
+    assert reclaimed['attempts'] == 2
+
+def test_stale_worker_cannot_finish_a_requeued_job(job_queue):
+    job_id = job_queue.enqueue({'input_data': "x"})
+    job_queue.claim('slow-worker', timeout=0)
+    time.sleep(0.3)
+    job_queue.requeue_stale()
+    
+    # Requeued but not yet claimed again
+    assert not job_queue.finish(job_id, 'slow-worker', 'failed', error="late")
+    assert job_queue.get(job_id)['status'] == 'queued'
+    
+    job_queue.claim('worker-2', timeout=0)
+    assert not job_queue.finish(job_id, 'slow-worker', 'failed', error="late")
+    assert job_queue.finish(job_id, 'worker-2', 'succeeded', {'success': True})
+    
+    job = job_queue.get(job_id)
+    assert job['status'] == 'succeeded'
+    assert job['error'] is None
+
+def test_requeue_stale_drops_expired_results(tmp_path):
+    job_queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite"), result_ttl=0)
+    job_id = job_queue.enqueue({'input_data': "x"})
+    job_queue.claim('worker-1', timeout=0)
+    job_queue.add_event(job_id, {'type': 'progress'})
+    job_queue.finish(job_id, 'worker-1', 'succeeded', {'success': True})
+    
+    time.sleep(0.01)
+    job_queue.requeue_stale()
+    
+    assert job_queue.get(job_id) is None
+    assert job_queue.events(job_id) == []
+
+def test_cancel_only_applies_to_queued_jobs(job_queue):
+    queued = job_queue.enqueue({'input_data': "queued"})
+    running = job_queue.enqueue({'input_data': "running"})
+    
+    assert job_queue.cancel(queued)
+    assert not job_queue.cancel(queued)
+    assert job_queue.get(queued)['status'] == 'cancelled'
+    
+    # The cancelled job is never handed out
+    assert job_queue.claim('worker-1', timeout=0)['id'] == running
+    assert not job_queue.cancel(running)
+    assert job_queue.get(running)['status'] == 'running'
+
+def test_events_and_results(job_queue):
+    job_id = job_queue.enqueue({'input_data': "x"})
+    job_queue.claim('worker-1', timeout=0)
+    job_queue.add_event(job_id, {'type': 'node_started', 'node_id': 'a'})
+    job_queue.add_event(job_id, {'type': 'node_completed', 'node_id': 'a'})
+    assert job_queue.finish(job_id, 'worker-1', 'succeeded', {'success': True, 'output': "done"})
+    
+    assert [event['seq'] for event in job_queue.events(job_id)] == [1, 2]
+    assert job_queue.events(job_id, after=1) == [{'seq': 2, 'type': 'node_completed', 'node_id': 'a'}]
+    
+    job = job_queue.get(job_id)
+    assert job['status'] == 'succeeded'
+    assert job['result'] == {'success': True, 'output': "done"}
+    assert job_queue.get_stats()['succeeded'] == 1
+
+def test_worker_runs_jobs_and_records_failures(job_queue):
+    succeeded = job_queue.enqueue({'input_data': "ok"})
+    failed = job_queue.enqueue({'input_data': "bad"})
+    worker = JobWorker(job_queue, concurrency=2)
+    
+    async def execute(job):
+        if job['payload']['input_data'] == "bad":
+            raise RuntimeError("agent crashed")
+        return {'success': True, 'response': "ok"}
+    
+    worker._execute = execute
+    
+    async def serve():
+        task = asyncio.ensure_future(worker.serve())
+        while job_queue.get_stats()['running'] or job_queue.get_stats()['queued']:
+            await asyncio.sleep(0.05)
+        worker.stop()
+        await task
+    
+    asyncio.run(asyncio.wait_for(serve(), 10))
+    
+    assert job_queue.get(succeeded)['status'] == 'succeeded'
+    assert job_queue.get(failed)['status'] == 'failed'
+    assert job_queue.get(failed)['error'] == "agent crashed"
+    assert [event['type'] for event in job_queue.events(succeeded)] == ['job_started', 'job_finished']
+
+def test_stop_does_not_wait_for_busy_slots(job_queue):
+    job_queue.enqueue({'input_data': "slow"})
+    worker = JobWorker(job_queue, concurrency=1)
+    worker.shutdown_timeout = 0.2
+    
+    async def execute(job):
+        await asyncio.sleep(60)
+    
+    worker._execute = execute
+    
+    async def serve():
+        task = asyncio.ensure_future(worker.serve())
+        while not job_queue.get_stats()['running']:
+            await asyncio.sleep(0.05)
+        
+        start = time.monotonic()
+        worker.stop()
+        await task
+        return time.monotonic() - start
+    
+    assert asyncio.run(asyncio.wait_for(serve(), 10)) < 2
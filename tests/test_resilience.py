@@ -0,0 +1,60 @@
+"""
+Tests for circuit breakers around LLM calls
+"""
+import asyncio
+
+from src.llm.resilience import Resilience
+
+def half_open(resilience, key):
+    """Put a breaker where its next call is the half-open trial"""
+    breaker = resilience.get_breaker(key)
+    breaker.state = breaker.OPEN
+    breaker._opened_at = 0.0
+    return breaker
+
+def test_cancelled_trial_call_releases_the_breaker():
+    resilience = Resilience()
+    breaker = half_open(resilience, 'deployment')
+    
+    async def slow():
+        await asyncio.sleep(5)
+    
+    async def fast():
+        return "ok"
+    
+    async def run():
+        try:
+            await asyncio.wait_for(resilience.call('deployment', slow), 0.05)
+        except asyncio.TimeoutError:
+            pass
+        
+        assert breaker.state == breaker.HALF_OPEN
+        assert breaker.is_available()
+        return await resilience.call('deployment', fast)
+    
+    assert asyncio.run(run()) == "ok"
+    assert breaker.state == breaker.CLOSED
+    assert breaker.get_stats()['cancelled'] == 1
+
+def test_cancelled_trial_stream_releases_the_breaker():
+    resilience = Resilience()
+    breaker = half_open(resilience, 'deployment')
+    
+    async def slow_stream():
+        await asyncio.sleep(5)
+        yield {'type': 'delta', 'content': "late"}
+    
+    async def consume():
+        async for _ in resilience.stream('deployment', slow_stream):
+            pass
+    
+    async def run():
+        try:
+            await asyncio.wait_for(consume(), 0.05)
+        except asyncio.TimeoutError:
+            pass
+    
+    asyncio.run(run())
+    
+    assert breaker.is_available()
+    assert breaker.get_stats()['failures'] == 0
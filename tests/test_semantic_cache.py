@@ -0,0 +1,53 @@
+"""
+Tests for the semantic cache's namespace eviction
+"""
+import asyncio
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from src.llm.semantic_cache import Embedder, SemanticCache
+
+class LocalEmbedder(Embedder):
+    """Hashing embeddings only, whatever providers are configured"""
+    
+    async def embed(self, text):
+        return f"hashing:{self.dimensions}", self._hashing_embedding(text)
+
+def conversation(turn, message="what is the capital of france"):
+    return [{'role': 'system', 'content': "You answer questions."}, {'role': 'user', 'content': f"turn {turn}"}, {'role': 'user', 'content': message}]
+
+def store(cache, messages, answer):
+    response, embedding = asyncio.run(cache.lookup('agent', 'gpt-4', messages))
+    assert response is None
+    cache.add('agent', 'gpt-4', messages, embedding, {'content': answer})
+
+def test_paraphrase_in_the_same_conversation_hits():
+    cache = SemanticCache(similarity_threshold=0.8, embedder=LocalEmbedder('unused', dimensions=256))
+    store(cache, conversation(1), "Paris")
+    
+    response, _ = asyncio.run(cache.lookup('agent', 'gpt-4', conversation(1, "what is the capital of france?")))
+    
+    assert response['content'] == "Paris"
+
+def test_least_recently_used_namespaces_are_evicted():
+    cache = SemanticCache(max_namespaces=2, embedder=LocalEmbedder('unused', dimensions=256))
+    store(cache, conversation(1), "first")
+    store(cache, conversation(2), "second")
+    asyncio.run(cache.lookup('agent', 'gpt-4', conversation(1)))  # turn 1 is now the most recent
+    store(cache, conversation(3), "third")
+    
+    assert asyncio.run(cache.lookup('agent', 'gpt-4', conversation(2)))[0] is None
+    assert asyncio.run(cache.lookup('agent', 'gpt-4', conversation(1)))[0]['content'] == "first"
+    assert cache.get_stats()['namespaces'] == 2
+    assert cache.get_stats()['evictions'] == 1
+
+def test_max_entries_applies_across_namespaces():
+    cache = SemanticCache(max_entries=3, embedder=LocalEmbedder('unused', dimensions=256))
+    for turn in range(5):
+        store(cache, conversation(turn), f"answer {turn}")
+    
+    stats = cache.get_stats()
+    assert stats['entries'] == 3
+    assert stats['namespaces'] == 3
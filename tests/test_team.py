@@ -0,0 +1,163 @@
+"""
+Tests for team delegation and the budget a team shares
+"""
+import asyncio
+import json
+
+import pytest
+
+from src.agents.agent_types import AgentConfig
+from src.agents.implementations.team_manager_agent import TeamManagerAgent
+from src.agents.team import Team, TeamBudget, TeamMember
+from src.agents.workflow import Workflow, WorkflowError
+
+MEMBERS = [TeamMember('writer', 'Writer'), TeamMember('editor', 'Editor')]
+
+def manager(max_tokens=1000):
+    return TeamManagerAgent(AgentConfig(
+        id='lead', name='Lead', type='team_manager', system_prompt="You lead a team.", llm_model='gpt-4', max_tokens=max_tokens
+    ))
+
+def fake_llm(plan, tokens=10):
+    """LLM that answers the plan prompt with plan and anything else with a synthesis"""
+    
+    calls = []
+    
+    async def llm(model, messages, temperature, max_tokens, agent=None):
+        calls.append(max_tokens)
+        content = json.dumps(plan) if len(calls) == 1 else "final answer"
+        return {'content': content, 'tokens': tokens}
+    
+    return llm, calls
+
+def fake_members(tokens=20):
+    runs = []
+    
+    async def run_member(member_id, task, budget):
+        runs.append((member_id, task))
+        return {'success': True, 'response': f"{member_id} result", 'tokens_used': tokens}
+    
+    return run_member, runs
+
+def test_budget_tracks_tokens_and_time():
+    budget = TeamBudget(max_tokens=100, timeout=60)
+    budget.charge(30)
+    budget.charge(None)
+    
+    assert budget.remaining_tokens == 70
+    assert not budget.exhausted
+    
+    budget.charge(80)
+    assert budget.remaining_tokens == 0
+    assert budget.exhausted
+    assert TeamBudget(max_tokens=100, timeout=0).exhausted
+
+def test_manager_delegates_and_synthesizes():
+    plan = [{'member': 'writer', 'task': "draft"}, {'member': 'Editor', 'task': "edit"}]
+    llm, llm_calls = fake_llm(plan)
+    run_member, runs = fake_members()
+    budget = TeamBudget(max_tokens=1000, timeout=60)
+    
+    result = asyncio.run(manager().execute("write a post", llm=llm, team=Team(MEMBERS, run_member, budget)))
+    
+    assert result['success'] and result['synthesized']
+    assert result['response'] == "final answer"
+    assert sorted(runs) == [('editor', "edit"), ('writer', "draft")]
+    assert [delegation['status'] for delegation in result['delegations']] == ['completed', 'completed']
+    assert budget.tokens_used == 10 + 20 + 20 + 10
+    assert result['tokens_used'] == budget.tokens_used
+
+def test_llm_calls_are_capped_by_the_remaining_budget():
+    llm, llm_calls = fake_llm([])
+    run_member, _ = fake_members()
+    budget = TeamBudget(max_tokens=100, timeout=60)
+    budget.charge(40)
+    
+    asyncio.run(manager().execute("write a post", llm=llm, team=Team(MEMBERS, run_member, budget)))
+    
+    assert llm_calls[0] == 60
+
+def test_exhausted_budget_stops_before_planning():
+    llm, llm_calls = fake_llm([])
+    run_member, runs = fake_members()
+    budget = TeamBudget(max_tokens=100, timeout=60)
+    budget.charge(100)
+    
+    result = asyncio.run(manager().execute("write a post", llm=llm, team=Team(MEMBERS, run_member, budget)))
+    
+    assert not result['success']
+    assert result['skipped']
+    assert result['error'] == "Team budget exhausted"
+    assert llm_calls == [] and runs == []
+    assert budget.tokens_used == 100
+
+def test_slow_plan_is_bounded_by_the_time_budget():
+    run_member, runs = fake_members()
+    budget = TeamBudget(max_tokens=100, timeout=0.05)
+    
+    async def llm(model, messages, temperature, max_tokens, agent=None):
+        await asyncio.sleep(5)
+    
+    result = asyncio.run(manager().execute("write a post", llm=llm, team=Team(MEMBERS, run_member, budget)))
+    
+    assert not result['success']
+    assert result['timed_out']
+    assert result['error'] == "Team time budget exceeded"
+    assert runs == []
+
+def test_budget_spent_by_the_plan_skips_members_and_synthesis():
+    llm, llm_calls = fake_llm([], tokens=100)
+    run_member, runs = fake_members()
+    budget = TeamBudget(max_tokens=100, timeout=60)
+    
+    result = asyncio.run(manager().execute("write a post", llm=llm, team=Team(MEMBERS, run_member, budget)))
+    
+    assert not result['success']
+    assert not result['synthesized']
+    assert runs == []
+    assert len(llm_calls) == 1
+    assert [delegation['status'] for delegation in result['delegations']] == ['skipped', 'skipped']
+
+def test_exhausted_sub_manager_does_not_plan():
+    llm, _ = fake_llm([{'member': 'sub', 'task': "handle it"}])
+    sub = TeamManagerAgent(AgentConfig(id='sub', name='Sub', type='team_manager', system_prompt="", llm_model='gpt-4'))
+    sub_llm, sub_calls = fake_llm([])
+    
+    async def run_member(member_id, task, budget):
+        budget.charge(budget.remaining_tokens)  # a sibling branch spent the rest
+        return await sub.execute(task, llm=sub_llm, team=Team(MEMBERS, fake_members()[0], budget))
+    
+    budget = TeamBudget(max_tokens=100, timeout=60)
+    result = asyncio.run(manager().execute("big job", llm=llm, team=Team([TeamMember('sub', 'Sub')], run_member, budget)))
+    
+    assert sub_calls == []
+    assert result['delegations'][0]['status'] == 'skipped'
+    assert budget.tokens_used == 100
+
+def test_sub_manager_without_a_team_is_charged():
+    llm, _ = fake_llm([{'member': 'sub', 'task': "handle it"}])
+    sub = TeamManagerAgent(AgentConfig(id='sub', name='Sub', type='team_manager', system_prompt="", llm_model='gpt-4'))
+    
+    async def sub_llm(model, messages, temperature, max_tokens, agent=None):
+        return {'content': "done alone", 'tokens': 25}
+    
+    async def run_member(member_id, task, budget):
+        return await sub.execute(task, llm=sub_llm)
+    
+    budget = TeamBudget(max_tokens=1000, timeout=60)
+    result = asyncio.run(manager().execute("big job", llm=llm, team=Team([TeamMember('sub', 'Sub')], run_member, budget)))
+    
+    assert result['delegations'][0]['status'] == 'completed'
+    assert budget.tokens_used == 10 + 25 + 10
+
+def test_delegation_cycles_are_rejected(make_project):
+    project = make_project(('a', 'b', 'delegation'), ('b', 'c', 'delegation'), ('c', 'a', 'delegation'))
+    
+    with pytest.raises(WorkflowError, match="cycle"):
+        Workflow.delegates_of(project)
+
+def test_delegates_are_not_workflow_nodes(make_project):
+    workflow = Workflow.compile(make_project(('lead', 'writer', 'delegation'), ('lead', 'editor', 'delegation')))
+    
+    assert list(workflow.nodes) == ['lead']
+    assert workflow.delegates == {'lead': ['writer', 'editor']}
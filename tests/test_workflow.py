@@ -0,0 +1,86 @@
+"""
+Tests for compiling projects into workflows and routing between their nodes
+"""
+import asyncio
+
+import pytest
+
+from src.agents.workflow import Workflow, WorkflowEngine, WorkflowError
+
+def run_engine(workflow, outputs, message="request"):
+    """Run a workflow with agents that answer from outputs; returns (result, agents that ran)"""
+    
+    calls = []
+    
+    async def run_agent(agent_id, node_input):
+        calls.append(agent_id)
+        return {'success': True, 'response': outputs.get(agent_id, f"{agent_id} done"), 'tokens_used': 1}
+    
+    result = asyncio.run(WorkflowEngine(workflow, run_agent).run(message))
+    return result, calls
+
+def test_compile_orders_nodes_after_their_inputs(make_project):
+    workflow = Workflow.compile(make_project(('c', 'b', 'sequential'), ('b', 'a', 'sequential')))
+    
+    assert workflow.order == ['c', 'b', 'a']
+
+def test_compile_rejects_cycles(make_project):
+    project = make_project(('a', 'b', 'sequential'), ('b', 'c', 'sequential'), ('c', 'a', 'sequential'))
+    
+    with pytest.raises(WorkflowError, match="cycle"):
+        Workflow.compile(project)
+
+def test_compile_rejects_unknown_agents_and_types(make_project):
+    project = make_project(('a', 'b', 'sequential'))
+    project['connections'].append({'from': 'a', 'to': 'missing', 'type': 'sequential'})
+    with pytest.raises(WorkflowError, match="unknown agent"):
+        Workflow.compile(project)
+    
+    with pytest.raises(WorkflowError, match="Unknown connection type"):
+        Workflow.compile(make_project(('a', 'b', 'broadcast')))
+
+def test_parallel_target_shares_its_source_inputs(make_project):
+    workflow = Workflow.compile(make_project(('a', 'b', 'sequential'), ('b', 'c', 'parallel')))
+    result, calls = run_engine(workflow, {})
+    
+    assert [edge.source for edge in workflow.nodes['c'].inputs] == ['a']
+    assert sorted(calls) == ['a', 'b', 'c']
+    assert sorted(result['final_nodes']) == ['b', 'c']
+
+def test_conditional_edges_follow_matching_conditions(make_project):
+    workflow = Workflow.compile(make_project(
+        ('a', 'approve', 'conditional', 'approved'),
+        ('a', 'reject', 'conditional', r're:\breject(ed)?\b'),
+        ('approve', 'notify', 'sequential'),
+        ('reject', 'notify', 'sequential')
+    ))
+    result, calls = run_engine(workflow, {'a': "The change is APPROVED."})
+    
+    assert calls == ['a', 'approve', 'notify']
+    assert result['nodes']['reject']['status'] == 'skipped'
+    assert result['nodes']['notify']['status'] == 'completed'
+    assert result['success']
+
+def test_unconditioned_routes_let_the_agent_pick_a_target(make_project):
+    workflow = Workflow.compile(make_project(('triage', 'billing', 'conditional'), ('triage', 'support', 'conditional')))
+    
+    _, calls = run_engine(workflow, {'triage': "Billing could, but Support should handle this."})
+    assert calls == ['triage', 'support']
+    
+    # Without a named target the first route is the default
+    _, calls = run_engine(workflow, {'triage': "No preference."})
+    assert calls == ['triage', 'billing']
+
+def test_failed_node_skips_its_downstream_nodes(make_project):
+    workflow = Workflow.compile(make_project(('a', 'b', 'sequential'), ('b', 'c', 'sequential')))
+    
+    async def run_agent(agent_id, node_input):
+        if agent_id == 'b':
+            return {'success': False, 'error': "boom"}
+        return {'success': True, 'response': agent_id}
+    
+    result = asyncio.run(WorkflowEngine(workflow, run_agent).run("request"))
+    
+    assert not result['success']
+    assert result['nodes']['b']['status'] == 'failed'
+    assert result['nodes']['c']['status'] == 'skipped'